@@ -0,0 +1,91 @@
+import re
+from typing import Dict, List, Optional, Sequence
+
+import polars as pl
+
+DEFAULT_STATS = ("count", "mean", "std")
+
+_STATS = {
+    "count": lambda c: pl.col(c).count(),
+    "nulls": lambda c: pl.col(c).null_count(),
+    "mean": lambda c: pl.col(c).mean(),
+    "std": lambda c: pl.col(c).std(),
+    "min": lambda c: pl.col(c).min(),
+    "max": lambda c: pl.col(c).max(),
+    "median": lambda c: pl.col(c).median(),
+    "sum": lambda c: pl.col(c).sum(),
+}
+_QUANTILE = re.compile(r"^q(\d{1,2})$")
+
+
+def _stat_expr(column: str, stat: str) -> pl.Expr:
+    if stat in _STATS:
+        return _STATS[stat](column).alias(f"{column}_{stat}")
+    match = _QUANTILE.match(stat)
+    if match:
+        return pl.col(column).quantile(int(match.group(1)) / 100, "linear").alias(f"{column}_{stat}")
+    raise ValueError(f"Unknown statistic: {stat} (use {sorted(_STATS)} or qNN)")
+
+
+def with_derived(lf: pl.LazyFrame, derived: Dict[str, pl.Expr], needed: Sequence[str]) -> pl.LazyFrame:
+    """Add the derived columns among ``needed`` and check the rest exist."""
+    schema = lf.collect_schema()
+    missing = sorted(c for c in needed if c not in schema and c not in derived)
+    if missing:
+        raise ValueError(f"Unknown columns: {missing}")
+    extra = [derived[c].alias(c) for c in dict.fromkeys(needed) if c not in schema]
+    return lf.with_columns(extra) if extra else lf
+
+
+def group_stats(
+    lf: pl.LazyFrame,
+    group_by: Sequence[str],
+    columns: Sequence[str],
+    stats: Sequence[str] = DEFAULT_STATS,
+) -> pl.DataFrame:
+    """Per-group statistics of ``columns`` (every group when ``group_by`` is
+    empty), computed as one lazy query."""
+    exprs = [pl.len().alias("rows")] + [_stat_expr(c, s) for c in columns for s in stats]
+    if group_by:
+        return lf.group_by(group_by).agg(exprs).sort(group_by).collect(engine="streaming")
+    return lf.select(exprs).collect(engine="streaming")
+
+
+def histogram(
+    lf: pl.LazyFrame,
+    column: str,
+    bins: int = 50,
+    lower: Optional[float] = None,
+    upper: Optional[float] = None,
+    group_by: Optional[str] = None,
+) -> dict:
+    """Fixed-width histogram of ``column``, optionally one per group. Values
+    outside ``[lower, upper]`` (default: the column's range) are dropped."""
+    if lower is None or upper is None:
+        bounds = lf.select(pl.col(column).min().alias("lo"), pl.col(column).max().alias("hi")).collect()
+        lower = bounds["lo"][0] if lower is None else lower
+        upper = bounds["hi"][0] if upper is None else upper
+    if lower is None or upper is None:
+        return {"column": column, "edges": [], "groups": {}}
+    width = (upper - lower) / bins if upper > lower else 1.0
+
+    keys = [group_by] if group_by else []
+    counts = (
+        lf.filter(pl.col(column).is_between(lower, upper))
+        .with_columns(
+            ((pl.col(column) - lower) / width).floor().cast(pl.Int64).clip(0, bins - 1).alias("bin")
+        )
+        .group_by(keys + ["bin"])
+        .agg(pl.len().alias("count"))
+        .collect(engine="streaming")
+    )
+
+    groups: Dict[str, List[int]] = {}
+    for row in counts.iter_rows(named=True):
+        key = str(row[group_by]) if group_by else "all"
+        groups.setdefault(key, [0] * bins)[row["bin"]] = row["count"]
+    return {
+        "column": column,
+        "edges": [lower + i * width for i in range(bins + 1)],
+        "groups": dict(sorted(groups.items())),
+    }
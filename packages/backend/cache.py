@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable, Tuple
+
+
+@dataclass(frozen=True)
+class FileVersion:
+    """Identity of a file on disk: any write changes mtime or size."""
+
+    path: str
+    mtime_ns: int
+    size: int
+
+    @classmethod
+    def of(cls, path: str | Path) -> "FileVersion":
+        st = os.stat(path)
+        return cls(str(Path(path).resolve()), st.st_mtime_ns, st.st_size)
+
+
+class VersionedCache:
+    """Thread-safe LRU whose keys start with a FileVersion.
+
+    Concurrent misses for the same key are collapsed into a single call to
+    ``compute`` (the other callers wait for its result), and storing a value
+    for a new version of a file evicts every entry of the older versions. A
+    slow computation that finishes after a newer version of its file is
+    cached returns its value without storing it.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Tuple[FileVersion, ...], compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``(value, hit)`` for ``key``, computing it at most once."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], True
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            self.misses += 1
+
+        if not owner:
+            return future.result(), False
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if not self._has_newer(key[0]):
+                self._evict_stale(key[0])
+                self._entries[key] = value
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value, False
+
+    def _has_newer(self, version: FileVersion) -> bool:
+        return any(k[0].path == version.path and k[0].mtime_ns > version.mtime_ns
+                   for k in self._entries)
+
+    def _evict_stale(self, version: FileVersion) -> None:
+        stale = [k for k in self._entries
+                 if k[0].path == version.path and k[0] != version
+                 and k[0].mtime_ns <= version.mtime_ns]
+        for k in stale:
+            del self._entries[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _put(self, event: dict) -> None:
+        # Runs on the subscriber's loop; a slow client loses the oldest events
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class EventBus:
+    """In-process publish/subscribe of progress events by topic.
+
+    ``publish`` may be called from any thread (request handlers, the job
+    manager's pump thread, pipeline code); events are handed to each
+    subscriber's event loop. Listeners are called synchronously for every
+    topic and must be cheap.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listeners: List[Callable[[str, dict], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[str, dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def publish(self, topic: str, event: dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(topic, event)
+            except Exception as e:
+                logging.error(f"EventBus: listener failed on {topic}: {e}")
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # Loop already closed: the subscriber is going away
+                pass
+
+    def subscribe(self, topic: str) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self.maxsize)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, topic: str, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[topic]
+
+
+def coalesce(events: List[dict]) -> List[dict]:
+    """Collapse per-file events: only the latest ``file`` event of each stage
+    is kept, annotated with how many it stands for. Other events pass through
+    in order."""
+    last: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    for i, event in enumerate(events):
+        if event.get("event") == "file":
+            stage = event.get("stage", "")
+            last[stage] = i
+            counts[stage] = counts.get(stage, 0) + 1
+
+    out = []
+    for i, event in enumerate(events):
+        if event.get("event") != "file":
+            out.append(event)
+        elif last[event.get("stage", "")] == i:
+            out.append({**event, "batched": counts[event.get("stage", "")]})
+    return out
+
+
+async def stream_sse(
+    bus: EventBus,
+    topic: str,
+    interval: float = 0.25,
+    keepalive: float = 15.0,
+    until: Callable[[dict], bool] = lambda event: False,
+    snapshot: Optional[Callable[[], Optional[dict]]] = None,
+) -> AsyncIterator[str]:
+    """Server-Sent Events for ``topic``: events are batched, per-file events
+    coalesced, and at most one message is sent every ``interval`` seconds.
+
+    ``snapshot`` is called once subscribed and its event (the current state)
+    is sent first, so nothing that happened before subscribing is missed.
+    The stream ends after a batch containing an event for which ``until``
+    is true."""
+    sub = bus.subscribe(topic)
+    if snapshot is not None and (current := snapshot()) is not None:
+        sub._put(current)
+    try:
+        while True:
+            try:
+                first = await asyncio.wait_for(sub.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            # Let the batch fill up for the rest of the interval
+            started = time.monotonic()
+            batch = [first]
+            while (remaining := interval - (time.monotonic() - started)) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(sub.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            while not sub.queue.empty():
+                batch.append(sub.queue.get_nowait())
+
+            payload = {"events": coalesce(batch)}
+            if sub.dropped:
+                payload["dropped"], sub.dropped = sub.dropped, 0
+            yield f"data: {json.dumps(payload)}\n\n"
+            if any(until(event) for event in batch):
+                return
+    finally:
+        bus.unsubscribe(topic, sub)
@@ -0,0 +1,241 @@
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+MD_ANALYSIS_DIR = Path(__file__).resolve().parent / "services" / "MD_Analysis"
+
+# Module name -> (script module, summary file), in execution order
+MODULES: Dict[str, Tuple[str, str]] = {
+    "rmsd": ("script.mean_std_rmsd", "rmsd_summary.csv"),
+    "rmsf": ("script.mean_std_rmsf", "rmsf_summary.csv"),
+    "mmpbsa": ("script.mean_std_mmpbsa", "mmpbsa_summary.csv"),
+    "merge": ("script.data_merge", "data_summary.csv"),
+}
+
+# Modules whose summaries another module reads from the job's results dir
+DEPENDENCIES: Dict[str, Tuple[str, ...]] = {"merge": ("rmsd", "rmsf", "mmpbsa")}
+
+
+def missing_dependencies(modules: Sequence[str]) -> Dict[str, List[str]]:
+    """Selected modules whose dependencies were not selected with them.
+
+    Every job has its own results dir, so a dependency cannot come from an
+    earlier job.
+    """
+    missing = {}
+    for name in modules:
+        absent = [dep for dep in DEPENDENCIES.get(name, ()) if dep not in modules]
+        if absent:
+            missing[name] = absent
+    return missing
+
+
+def input_fingerprint(input_dir: str | Path, modules: Sequence[str]) -> str:
+    """Hash of every file's path, size and mtime under ``input_dir`` plus the
+    selected modules: identical submissions map to the same fingerprint."""
+    digest = hashlib.sha256()
+    root = Path(input_dir).resolve()
+    digest.update(str(root).encode())
+    digest.update(",".join(sorted(modules)).encode())
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        st = path.stat()
+        digest.update(f"{path.relative_to(root)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def run_job(input_dir: str, results_dir: str, modules: List[str], job_id: str = "",
+            events=None) -> Dict[str, str]:
+    """Run the selected MD_Analysis modules; executed in a worker process.
+
+    Progress events of the modules are forwarded to ``events`` (a managed
+    queue shared with the parent) tagged with ``job_id``.
+    """
+    for path in (MD_ANALYSIS_DIR, MD_ANALYSIS_DIR / "script"):
+        if str(path) not in sys.path:
+            sys.path.append(str(path))
+
+    # Pool workers are reused across jobs: the subscription must not
+    # outlive this job, or later jobs would publish on its topic too
+    callback = None
+    if events is not None:
+        import progress
+
+        def callback(event):
+            events.put((job_id, event))
+
+        progress.subscribe(callback)
+
+    os.makedirs(results_dir, exist_ok=True)
+    outputs = {}
+    try:
+        for name, (module_name, summary) in MODULES.items():
+            if name not in modules:
+                continue
+            module = importlib.import_module(module_name)
+            if name == "merge":
+                module.main(results_dir=results_dir)
+            else:
+                module.main(data_dir=input_dir, results_dir=results_dir)
+            output = os.path.join(results_dir, summary)
+            if not os.path.exists(output) or os.path.getsize(output) == 0:
+                raise RuntimeError(f"Module '{name}' did not produce {output}")
+            outputs[name] = output
+    finally:
+        if callback is not None:
+            progress.unsubscribe(callback)
+    return outputs
+
+
+@dataclass
+class Job:
+    id: str
+    fingerprint: str
+    input_dir: str
+    modules: List[str]
+    results_dir: str
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    outputs: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class JobManager:
+    """Runs MD_Analysis jobs in a bounded process pool.
+
+    Jobs are deduplicated by input fingerprint: resubmitting the same inputs
+    returns the queued/running job or the finished result (also across
+    restarts, via the job.json written next to the outputs) instead of
+    computing it again. Failed jobs are retried on resubmission.
+
+    ``on_event(job_id, event)`` receives the modules' progress events and
+    the job's own status changes.
+    """
+
+    def __init__(self, jobs_dir: str | Path, max_workers: Optional[int] = None,
+                 on_event: Optional[Callable[[str, dict], None]] = None):
+        self.jobs_dir = Path(jobs_dir)
+        self.on_event = on_event
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        self._jobs: Dict[str, Job] = {}
+        self._by_fingerprint: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self._events = None
+        if on_event is not None:
+            self._manager = context.Manager()
+            self._events = self._manager.Queue()
+            threading.Thread(target=self._pump_events, name="job-events", daemon=True).start()
+
+    def submit(self, input_dir: str, modules: List[str]) -> Tuple[Job, bool]:
+        """Return ``(job, reused)`` for the given inputs."""
+        modules = [m for m in MODULES if m in modules]
+        missing = missing_dependencies(modules)
+        if missing:
+            raise ValueError(f"Modules selected without their dependencies: {missing}")
+        fingerprint = input_fingerprint(input_dir, modules)
+        with self._lock:
+            job = self._by_fingerprint.get(fingerprint) or self._load_finished(fingerprint)
+            if job is not None and job.status != "failed":
+                return job, True
+
+            job = Job(
+                id=uuid.uuid4().hex,
+                fingerprint=fingerprint,
+                input_dir=str(Path(input_dir).resolve()),
+                modules=modules,
+                results_dir=str(self.jobs_dir / fingerprint),
+            )
+            self._jobs[job.id] = job
+            self._by_fingerprint[fingerprint] = job
+            future = self._executor.submit(
+                run_job, job.input_dir, job.results_dir, job.modules, job.id, self._events
+            )
+            self._futures[job.id] = future
+        self._publish_status(job)
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == "queued":
+            future = self._futures.get(job_id)
+            if future is not None and future.running():
+                job.status = "running"
+                self._publish_status(job)
+        return job
+
+    def status_event(self, job: Job) -> dict:
+        return {"stage": "job", "event": "status", "time": time.time(), "status": job.status,
+                "error": job.error}
+
+    def _publish_status(self, job: Job) -> None:
+        if self.on_event is not None:
+            self.on_event(job.id, self.status_event(job))
+
+    def _pump_events(self) -> None:
+        while True:
+            try:
+                item = self._events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, event = item
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            if event is None:
+                # Sent by _finish behind the job's last progress event
+                self._publish_status(job)
+                continue
+            if job.status == "queued":
+                job.status = "running"
+                self._publish_status(job)
+            self.on_event(job_id, event)
+
+    def _finish(self, job: Job, future: Future) -> None:
+        job.finished_at = time.time()
+        try:
+            job.outputs = future.result()
+            job.status = "done"
+            Path(job.results_dir, "job.json").write_text(json.dumps(asdict(job)))
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logging.error(f"JobManager: job {job.id} failed: {e}")
+        self._futures.pop(job.id, None)
+        if self._events is not None:
+            # Route the final status through the event queue so it is
+            # published after every progress event of the job
+            self._events.put((job.id, None))
+
+    def _load_finished(self, fingerprint: str) -> Optional[Job]:
+        path = self.jobs_dir / fingerprint / "job.json"
+        if not path.exists():
+            return None
+        job = Job(**json.loads(path.read_text()))
+        if not all(os.path.exists(p) for p in job.outputs.values()):
+            return None
+        self._jobs[job.id] = job
+        self._by_fingerprint[fingerprint] = job
+        return job
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._events is not None:
+            self._events.put(None)
+            self._manager.shutdown()
@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import json
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+from rdkit import Chem, RDLogger
+
+from .cache import FileVersion
+from .store import ColumnarStore
+
+RDLogger.DisableLog("rdApp.*")  # type: ignore
+
+KEY_COLUMNS = {"uid": "uid", "smiles": "SMILES"}
+
+_EMPTY = -1
+
+
+def canonical_smiles(smiles: str) -> str:
+    """RDKit canonical form, or the input unchanged if it does not parse."""
+    mol = Chem.MolFromSmiles(smiles) if smiles else None
+    return Chem.MolToSmiles(mol) if mol is not None else smiles
+
+
+def hash_keys(keys: Iterable[str]) -> np.ndarray:
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b((k or "").encode(), digest_size=8).digest(), "little") for k in keys),
+        dtype=np.uint64,
+    )
+
+
+class HashTable:
+    """Open-addressing hash table from 64-bit key hashes to row offsets.
+
+    The table is two flat arrays (hashes and rows, row -1 marking an empty
+    slot) sized to a power of two at most half full, so a probe touches one
+    or two slots on average no matter how many keys are stored. Lookups are
+    vectorised over the whole batch of keys.
+    """
+
+    def __init__(self, hashes: np.ndarray, rows: np.ndarray):
+        self.hashes = hashes
+        self.rows = rows
+        self.mask = np.uint64(len(rows) - 1)
+
+    @classmethod
+    def build(cls, hashes: np.ndarray) -> "HashTable":
+        # Only the first row of a repeated key is indexed
+        unique, first = np.unique(hashes, return_index=True)
+        size = 1 << max(int(2 * len(unique) - 1).bit_length(), 1)
+        table = cls(np.zeros(size, dtype=np.uint64), np.full(size, _EMPTY, dtype=np.int64))
+
+        pending_hashes, pending_rows = unique, first.astype(np.int64)
+        slots = pending_hashes & table.mask
+        while len(pending_hashes):
+            free = table.rows[slots] == _EMPTY
+            # Several keys may land on the same free slot: the first one wins
+            _, winners = np.unique(slots[free], return_index=True)
+            placed = np.flatnonzero(free)[winners]
+            table.hashes[slots[placed]] = pending_hashes[placed]
+            table.rows[slots[placed]] = pending_rows[placed]
+
+            left = np.ones(len(pending_hashes), dtype=bool)
+            left[placed] = False
+            pending_hashes, pending_rows = pending_hashes[left], pending_rows[left]
+            slots = (slots[left] + np.uint64(1)) & table.mask
+        return table
+
+    def probe(self, hashes: np.ndarray) -> np.ndarray:
+        """Row offset of every hash, or -1 where the key is absent."""
+        found = np.full(len(hashes), _EMPTY, dtype=np.int64)
+        pending = np.arange(len(hashes))
+        slots = hashes & self.mask
+        while len(pending):
+            rows = self.rows[slots]
+            hit = (rows != _EMPTY) & (self.hashes[slots] == hashes[pending])
+            found[pending[hit]] = rows[hit]
+            more = (rows != _EMPTY) & ~hit
+            pending = pending[more]
+            slots = (slots[more] + np.uint64(1)) & self.mask
+        return found
+
+    def save(self, prefix: Path) -> None:
+        np.save(f"{prefix}.hashes.npy", self.hashes)
+        np.save(f"{prefix}.rows.npy", self.rows)
+
+    @classmethod
+    def load(cls, prefix: Path) -> "HashTable":
+        return cls(np.load(f"{prefix}.hashes.npy", mmap_mode="r"), np.load(f"{prefix}.rows.npy", mmap_mode="r"))
+
+
+class LookupIndex:
+    """Exact uid / canonical-SMILES -> row offset index of the columnar store."""
+
+    def __init__(self, index_dir: Path, tables: Dict[str, HashTable], source: dict):
+        self.index_dir = index_dir
+        self.tables = tables
+        self.source = source
+
+    @classmethod
+    def load(cls, index_dir: str | Path) -> "LookupIndex":
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / "meta.json").read_text())
+        tables = {kind: HashTable.load(index_dir / kind) for kind in meta["kinds"]}
+        return cls(index_dir, tables, meta["source"])
+
+    @staticmethod
+    def build(store: ColumnarStore, index_dir: str | Path) -> None:
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        version = store.version()
+        lf = store.scan()
+        kinds = [kind for kind, column in KEY_COLUMNS.items() if column in lf.collect_schema()]
+        for kind in kinds:
+            column = KEY_COLUMNS[kind]
+            values = (v for batch in lf.select(column).collect_batches() for v in batch[column])
+            if kind == "smiles":
+                values = (canonical_smiles(v) for v in values)
+            HashTable.build(hash_keys(values)).save(index_dir / kind)
+        (index_dir / "meta.json").write_text(json.dumps({"kinds": kinds, "source": asdict(version)}))
+        logging.info(f"LookupIndex: indexed {kinds} of {store.csv_path} into {index_dir}")
+
+    def is_current(self, source: FileVersion) -> bool:
+        return self.source == asdict(source)
+
+    @property
+    def kinds(self) -> List[str]:
+        return list(self.tables)
+
+    def lookup(self, kind: str, keys: List[str]) -> np.ndarray:
+        if kind == "smiles":
+            keys = [canonical_smiles(k) for k in keys]
+        return self.tables[kind].probe(hash_keys(keys))
+
+    @staticmethod
+    def matches(kind: str, key: str, record: dict) -> bool:
+        """Hashes are 64-bit, so every hit is confirmed against the stored value."""
+        stored = record.get(KEY_COLUMNS[kind])
+        if kind == "smiles":
+            return stored is not None and canonical_smiles(stored) == canonical_smiles(key)
+        return stored == key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the uid / canonical-SMILES lookup index")
+    parser.add_argument("csv", type=Path, help="Processed CSV (merged_selected.csv)")
+    parser.add_argument("--index-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    index_dir = args.index_dir or args.csv.parent / "indexes" / "lookup"
+    LookupIndex.build(ColumnarStore(args.csv), index_dir)
+    print(f"Lookup index written to {index_dir}")
+
+
+if __name__ == "__main__":
+    main()
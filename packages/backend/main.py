@@ -1,9 +1,27 @@
-from fastapi import FastAPI
+import os
+import time
+from dataclasses import asdict
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from fastapi import FastAPI, Header, Query, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import polars as pl
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+from pydantic import BaseModel, Field, field_validator
 
-app = FastAPI(title="ML Nova API")
+from .aggregations import DEFAULT_STATS, group_stats, histogram, with_derived
+from .cache import FileVersion, VersionedCache
+from .events import EventBus, stream_sse
+from .jobs import MD_ANALYSIS_DIR, MODULES, JobManager, missing_dependencies
+from .lookup import LookupIndex
+from .metrics import HttpMetrics, Registry, StageMetrics
+from .pipeline import ML_STAGES, TOPIC as ML_TOPIC, PipelineRunner
+from .query import MEDIA_TYPES, build_query, iter_arrow_stream, iter_ndjson
+from .results import MEDIA_TYPES as RESULT_MEDIA_TYPES
+from .results import ResultFiles, etag, is_not_modified, last_modified, negotiate_encoding
+from .similarity import FingerprintIndex, fingerprint
+from .store import ColumnarStore
 
 # Build a robust path to the data file
 try:
@@ -14,6 +32,60 @@ except NameError:
     # Fallback for environments where __file__ is not defined
     DATA_FILE_PATH = "packages/machine-learning/data/processed/merged_selected.csv"
 
+# Memory-mapped Arrow copy of the CSV, reconverted when the CSV is newer
+store = ColumnarStore(DATA_FILE_PATH)
+
+# Dataset metadata, keyed on (file version, ...) so a rewritten file is re-read
+metadata_cache = VersionedCache(maxsize=16)
+
+INDEX_DIR = Path(DATA_FILE_PATH).parent / "indexes"
+
+# Progress events of jobs and pipelines, streamed to clients over SSE
+bus = EventBus()
+
+# In-process Prometheus metrics; stage timers are fed by the progress events
+registry = Registry()
+bus.add_listener(StageMetrics(registry))
+
+JOBS_DIR = MD_ANALYSIS_DIR / "results" / "jobs"
+MD_SUMMARY_PATH = MD_ANALYSIS_DIR / "results" / "data_summary.csv"
+
+# MD_Analysis outputs, with an LRU of their recently served encodings
+result_files = ResultFiles(MD_ANALYSIS_DIR / "results")
+
+# Aggregation results, keyed on (file version, query)
+aggregate_cache = VersionedCache(maxsize=256)
+
+# Columns computed on the fly that aggregations may refer to, per dataset
+DERIVED_COLUMNS = {
+    "molecules": {"smiles_length": pl.col("SMILES").str.len_chars()},
+    "md": {},
+}
+ANALYSIS_WORKERS = int(os.environ.get("NOVA_ANALYSIS_WORKERS", "2"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Prebuilt indexes are memory-mapped once and shared by every request
+    app.state.similarity_index = None
+    app.state.lookup_index = None
+    if (INDEX_DIR / "similarity" / "meta.json").exists():
+        app.state.similarity_index = FingerprintIndex.load(INDEX_DIR / "similarity")
+    if (INDEX_DIR / "lookup" / "meta.json").exists():
+        app.state.lookup_index = LookupIndex.load(INDEX_DIR / "lookup")
+    app.state.jobs = JobManager(
+        JOBS_DIR,
+        max_workers=ANALYSIS_WORKERS,
+        on_event=lambda job_id, event: bus.publish(f"jobs/{job_id}", event),
+    )
+    app.state.ml_pipeline = PipelineRunner(on_event=lambda event: bus.publish(ML_TOPIC, event))
+    yield
+    app.state.jobs.shutdown()
+    app.state.ml_pipeline.shutdown()
+
+
+app = FastAPI(title="ML Nova API", lifespan=lifespan)
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,21 +94,354 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(HttpMetrics, registry=registry)
 
 @app.get("/")
 def root():
     return {"message": "Welcome to the ML Nova API"}
 
+def split_list(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def read_metadata() -> dict:
+    # Schema and row count come from the Arrow file's metadata, so the
+    # table itself is never materialised
+    lf = store.scan()
+    schema = lf.collect_schema()
+    return {
+        "rows": store.row_count(),
+        "columns": len(schema),
+        "schema": {name: str(dtype) for name, dtype in schema.items()},
+    }
+
 @app.get("/data")
-def get_data_info():
+def get_data_info(response: Response):
     try:
         if not Path(DATA_FILE_PATH).exists():
             return {"error": f"Data file not found at {DATA_FILE_PATH}"}
-        df = pl.read_csv(DATA_FILE_PATH)
+        start = time.perf_counter()
+        info, hit = metadata_cache.get_or_compute((store.version(), "metadata"), read_metadata)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+        response.headers["Server-Timing"] = f"metadata;dur={elapsed_ms:.2f}"
         return {
-            "rows": df.height,
-            "columns": df.width,
-            "schema": df.schema
+            **info,
+            "cache": "hit" if hit else "miss",
+            "elapsed_ms": round(elapsed_ms, 3),
         }
     except Exception as e:
         return {"error": str(e)}
+
+
+@app.get("/molecules")
+def query_molecules(
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    source: Optional[List[str]] = Query(None, description="Keep only these sources"),
+    sort: Optional[str] = None,
+    descending: bool = False,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=0, description="Maximum rows; 0 streams everything"),
+    format: Literal["ndjson", "arrow"] = "ndjson",
+    chunk_size: int = Query(10_000, ge=1, le=1_000_000),
+):
+    if not Path(DATA_FILE_PATH).exists():
+        return JSONResponse({"error": f"Data file not found at {DATA_FILE_PATH}"}, status_code=404)
+    try:
+        lf = build_query(
+            store.scan(),
+            columns=split_list(columns) or None,
+            sources=source,
+            sort=sort,
+            descending=descending,
+            offset=offset,
+            limit=limit or None,
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    chunks = iter_arrow_stream(lf, chunk_size) if format == "arrow" else iter_ndjson(lf, chunk_size)
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format])
+
+
+@app.get("/similar")
+def similar_molecules(
+    smiles: str,
+    k: int = Query(50, ge=1, le=1000),
+    threshold: float = Query(0.0, ge=0.0, le=1.0, description="Minimum Tanimoto similarity"),
+):
+    index = app.state.similarity_index
+    if index is None:
+        return JSONResponse(
+            {"error": "Similarity index not built; run python -m packages.backend.similarity <csv>"},
+            status_code=503,
+        )
+    if not index.is_current(store.version()):
+        return JSONResponse(
+            {"error": f"Similarity index in {index.index_dir} is out of date with {DATA_FILE_PATH}; rebuild it"},
+            status_code=503,
+        )
+    query = fingerprint(smiles, index.config)
+    if query is None:
+        return JSONResponse({"error": f"Invalid SMILES: {smiles}"}, status_code=400)
+
+    hits = index.search(query, k=k, threshold=threshold)
+    records = store.take([row for row, _ in hits]).to_dicts()
+    return {
+        "query": smiles,
+        "k": k,
+        "results": [
+            {**record, "similarity": round(score, 4)} for record, (_, score) in zip(records, hits)
+        ],
+    }
+
+
+class LookupRequest(BaseModel):
+    uids: List[str] = Field(default_factory=list, max_length=10_000)
+    smiles: List[str] = Field(default_factory=list, max_length=10_000)
+
+
+@app.post("/lookup")
+def lookup_molecules(request: LookupRequest):
+    index = app.state.lookup_index
+    if index is None:
+        return JSONResponse(
+            {"error": "Lookup index not built; run python -m packages.backend.lookup <csv>"},
+            status_code=503,
+        )
+    if not index.is_current(store.version()):
+        return JSONResponse(
+            {"error": f"Lookup index in {index.index_dir} is out of date with {DATA_FILE_PATH}; rebuild it"},
+            status_code=503,
+        )
+
+    requested = [kind for kind, keys in (("uid", request.uids), ("smiles", request.smiles)) if keys]
+    unindexed = [kind for kind in requested if kind not in index.kinds]
+    if unindexed:
+        return JSONResponse(
+            {"error": f"{DATA_FILE_PATH} has no column to look up {', '.join(unindexed)} keys"},
+            status_code=400,
+        )
+
+    queries = [("uid", key) for key in request.uids] + [("smiles", key) for key in request.smiles]
+    rows = []
+    for kind, keys in (("uid", request.uids), ("smiles", request.smiles)):
+        if keys:
+            rows.extend(index.lookup(kind, keys).tolist())
+
+    # One gather for the whole batch; only the matching rows are read
+    found = sorted({row for row in rows if row >= 0})
+    records = dict(zip(found, store.take(found).to_dicts()))
+
+    results = []
+    for (kind, key), row in zip(queries, rows):
+        record = records.get(row)
+        if record is not None and not index.matches(kind, key, record):
+            record = None
+        results.append({"kind": kind, "key": key, "record": record})
+    return {
+        "found": sum(r["record"] is not None for r in results),
+        "missing": sum(r["record"] is None for r in results),
+        "results": results,
+    }
+
+
+class JobRequest(BaseModel):
+    input_dir: str
+    modules: List[Literal["rmsd", "rmsf", "mmpbsa", "merge"]] = Field(default_factory=lambda: list(MODULES))
+
+    @field_validator("modules")
+    @classmethod
+    def check_dependencies(cls, modules):
+        missing = missing_dependencies(modules)
+        if missing:
+            raise ValueError("; ".join(f"'{name}' also requires {', '.join(deps)}"
+                                       for name, deps in missing.items()))
+        return modules
+
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest):
+    if not Path(request.input_dir).is_dir():
+        return JSONResponse({"error": f"Input directory not found: {request.input_dir}"}, status_code=400)
+    job, reused = app.state.jobs.submit(request.input_dir, request.modules)
+    return {**asdict(job), "reused": reused}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown job: {job_id}"}, status_code=404)
+    return asdict(job)
+
+
+@app.get("/jobs/{job_id}/results")
+def get_job_results(job_id: str):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown job: {job_id}"}, status_code=404)
+    if job.status != "done":
+        return JSONResponse({"error": f"Job {job_id} is {job.status}", "status": job.status}, status_code=409)
+    return {
+        "id": job.id,
+        "results": {
+            name: {"file": path, "records": pl.read_csv(path).to_dicts()}
+            for name, path in job.outputs.items()
+        },
+    }
+
+
+def _job_finished(event: dict) -> bool:
+    return event.get("stage") == "job" and event.get("status") in ("done", "failed")
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    jobs = app.state.jobs
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown job: {job_id}"}, status_code=404)
+    return StreamingResponse(
+        stream_sse(bus, f"jobs/{job_id}", until=_job_finished, snapshot=lambda: jobs.status_event(job)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+class PipelineRequest(BaseModel):
+    stages: List[Literal["structure", "merge", "clean"]] = Field(default_factory=lambda: list(ML_STAGES))
+
+
+@app.post("/pipelines/ml", status_code=202)
+def run_ml_pipeline(request: PipelineRequest):
+    runner = app.state.ml_pipeline
+    if not runner.submit(request.stages):
+        return JSONResponse({"error": "The ML pipeline is already running", **runner.status_event()},
+                            status_code=409)
+    return {**runner.status_event(), "events": f"/events/{ML_TOPIC}"}
+
+
+@app.get("/pipelines/ml")
+def get_ml_pipeline():
+    return app.state.ml_pipeline.status_event()
+
+
+def _pipeline_finished(event: dict) -> bool:
+    return event.get("stage") == "ml" and event.get("status") in ("done", "failed")
+
+
+@app.get("/pipelines/ml/events")
+async def stream_ml_pipeline_events():
+    runner = app.state.ml_pipeline
+    return StreamingResponse(
+        stream_sse(bus, ML_TOPIC, until=_pipeline_finished, snapshot=runner.status_event),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/events/{topic:path}")
+async def stream_events(topic: str):
+    return StreamingResponse(
+        stream_sse(bus, topic), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def open_dataset(dataset: str):
+    """Version and lazy scan of an aggregatable dataset."""
+    if dataset == "molecules":
+        if not Path(DATA_FILE_PATH).exists():
+            raise FileNotFoundError(f"Data file not found at {DATA_FILE_PATH}")
+        return store.version(), store.scan()
+    if not MD_SUMMARY_PATH.exists():
+        raise FileNotFoundError(f"MD summary not found at {MD_SUMMARY_PATH}")
+    return FileVersion.of(MD_SUMMARY_PATH), pl.scan_csv(MD_SUMMARY_PATH)
+
+
+def cached_aggregate(dataset: str, query: tuple, compute, response: Response):
+    try:
+        version, lf = open_dataset(dataset)
+    except FileNotFoundError as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+    try:
+        result, hit = aggregate_cache.get_or_compute((version, dataset, *query), lambda: compute(lf))
+    except (ValueError, pl.exceptions.PolarsError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return {"dataset": dataset, **result}
+
+
+@app.get("/aggregate/{dataset}")
+def aggregate(
+    dataset: Literal["molecules", "md"],
+    response: Response,
+    group_by: Optional[str] = Query(None, description="Comma-separated grouping columns"),
+    columns: Optional[str] = Query(None, description="Comma-separated numeric columns"),
+    stats: Optional[str] = Query(None, description="count, nulls, mean, std, min, max, median, sum, qNN"),
+):
+    keys, cols, stat_list = split_list(group_by), split_list(columns), split_list(stats) or list(DEFAULT_STATS)
+
+    def compute(lf):
+        lf = with_derived(lf, DERIVED_COLUMNS[dataset], keys + cols)
+        return {"group_by": keys, "rows": group_stats(lf, keys, cols, stat_list).to_dicts()}
+
+    return cached_aggregate(dataset, ("aggregate", tuple(keys), tuple(cols), tuple(stat_list)), compute, response)
+
+
+@app.get("/histogram/{dataset}")
+def get_histogram(
+    dataset: Literal["molecules", "md"],
+    column: str,
+    response: Response,
+    bins: int = Query(50, ge=1, le=1000),
+    lower: Optional[float] = None,
+    upper: Optional[float] = None,
+    group_by: Optional[str] = None,
+):
+    def compute(lf):
+        lf = with_derived(lf, DERIVED_COLUMNS[dataset], [column] + ([group_by] if group_by else []))
+        return histogram(lf, column, bins, lower, upper, group_by)
+
+    return cached_aggregate(dataset, ("histogram", column, bins, lower, upper, group_by), compute, response)
+
+
+@app.get("/results")
+def list_results():
+    return {"files": result_files.available()}
+
+
+@app.get("/results/{name}")
+def get_result_file(
+    name: str,
+    format: Literal["csv", "arrow"] = "csv",
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
+    try:
+        version = result_files.version(name)
+    except KeyError:
+        return JSONResponse({"error": f"Unknown result file: {name}"}, status_code=404)
+    except FileNotFoundError:
+        return JSONResponse({"error": f"{name} has not been produced yet"}, status_code=404)
+
+    encoding = negotiate_encoding(accept_encoding)
+    headers = {
+        "ETag": etag(version, format, encoding),
+        "Last-Modified": last_modified(version),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(version, headers["ETag"], if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    body, hit = result_files.body(version, format, encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["X-Cache"] = "HIT" if hit else "MISS"
+    return Response(body, media_type=RESULT_MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,232 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+STAGE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Labels, List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._series.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._register(Gauge(name, help))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class HttpMetrics:
+    """ASGI middleware recording per-route latency, in-flight requests and
+    request/response payload sizes.
+
+    Routes are labelled by their template (``/jobs/{job_id}``), not the raw
+    path, so the number of series stays bounded. Latency covers the whole
+    response, including streamed bodies.
+    """
+
+    def __init__(self, app, registry: Registry):
+        self.app = app
+        self.latency = registry.histogram(
+            "nova_http_request_duration_seconds", "HTTP request latency by route"
+        )
+        self.in_flight = registry.gauge("nova_http_requests_in_flight", "HTTP requests being served")
+        self.requests = registry.counter("nova_http_requests_total", "HTTP requests by route and status")
+        self.request_size = registry.histogram(
+            "nova_http_request_size_bytes", "HTTP request body size", SIZE_BUCKETS
+        )
+        self.response_size = registry.histogram(
+            "nova_http_response_size_bytes", "HTTP response body size", SIZE_BUCKETS
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+        received = 0
+
+        async def receive_wrapper():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            self.latency.observe(time.perf_counter() - start, method=method, route=path)
+            self.requests.inc(method=method, route=path, status=str(status))
+            self.request_size.observe(received, method=method, route=path)
+            self.response_size.observe(sent, method=method, route=path)
+
+
+class StageMetrics:
+    """Turns pipeline progress events (see ``events.py``) into stage timers
+    and file/row throughput."""
+
+    def __init__(self, registry: Registry):
+        self.duration = registry.histogram(
+            "nova_stage_duration_seconds", "Wall time of pipeline stages", STAGE_BUCKETS
+        )
+        self.files = registry.counter("nova_stage_files_total", "Files processed by pipeline stages")
+        self.rows = registry.counter("nova_stage_rows_total", "Rows emitted by pipeline stages")
+        self.files_per_second = registry.gauge(
+            "nova_stage_files_per_second", "File throughput of the last run of each stage"
+        )
+        self.rows_per_second = registry.gauge(
+            "nova_stage_rows_per_second", "Row throughput of the last run of each stage"
+        )
+        self.jobs = registry.counter("nova_jobs_total", "Analysis job status transitions")
+        self.pipelines = registry.counter("nova_pipeline_runs_total", "Pipeline run status transitions")
+        self.failures = registry.counter("nova_stage_failures_total", "Pipeline stage runs that failed")
+
+    def __call__(self, topic: str, event: dict) -> None:
+        stage = event.get("stage", "")
+        kind = event.get("event")
+        if stage == "job":
+            self.jobs.inc(status=event.get("status", ""))
+        elif kind == "status":
+            self.pipelines.inc(pipeline=stage, status=event.get("status", ""))
+        elif kind == "file":
+            self.files.inc(stage=stage, ok=str(bool(event.get("ok", True))).lower())
+        elif kind == "end":
+            # Stages report what they count: the ML cleaner has rows but no
+            # files, and the run-level 'ml' stage only has its duration
+            elapsed = float(event.get("elapsed") or 0.0)
+            self.duration.observe(elapsed, stage=stage)
+            if not event.get("ok", True):
+                self.failures.inc(stage=stage)
+            if "rows" in event:
+                rows = int(event["rows"] or 0)
+                self.rows.inc(rows, stage=stage)
+                if elapsed > 0:
+                    self.rows_per_second.set(rows / elapsed, stage=stage)
+            if "files" in event and elapsed > 0:
+                self.files_per_second.set(int(event["files"] or 0) / elapsed, stage=stage)
@@ -0,0 +1,126 @@
+import importlib.util
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List, Optional, Sequence
+
+ML_DIR = Path(__file__).resolve().parent.parent / "machine-learning"
+
+# Stage name -> module under machine-learning/src, in execution order
+ML_STAGES: Dict[str, str] = {
+    "structure": "DataStructure",
+    "merge": "MergeData",
+    "clean": "CleanData",
+}
+
+TOPIC = "pipelines/ml"
+
+
+def load_stage(name: str) -> ModuleType:
+    """Import a stage module by path: machine-learning/src is not a package,
+    and its ``src`` name would clash with MD_Analysis/src."""
+    path = ML_DIR / "src" / f"{ML_STAGES[name]}.py"
+    spec = importlib.util.spec_from_file_location(f"nova_ml_{ML_STAGES[name]}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_stage(name: str, root: str, events=None) -> None:
+    """Run one stage; executed in a fresh worker process, so the stage's
+    ``logging.basicConfig`` configures that process only.
+
+    Its progress events are forwarded to ``events`` (a managed queue shared
+    with the parent).
+    """
+    load_stage(name).main(root=Path(root), progress=events.put if events is not None else None)
+
+
+class PipelineRunner:
+    """Runs the machine-learning preprocessing stages in the background, one
+    run at a time.
+
+    ``root`` holds the stages' ``data/`` directory. A thread drives the run
+    and each stage runs in its own spawned process (the stages configure
+    the root logger, as they do when run as scripts). Their progress events
+    come back through a managed queue, together with the runner's own
+    ``ml`` stage events and status changes, and are passed to ``on_event``
+    (the EventBus) in order.
+    """
+
+    def __init__(self, root: Path = ML_DIR, on_event: Optional[Callable[[dict], None]] = None):
+        self.root = Path(root)
+        self.on_event = on_event
+        self.status = "idle"
+        self.stages: List[str] = []
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ml-pipeline")
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+
+        self._events = None
+        if on_event is not None:
+            self._manager = self._context.Manager()
+            self._events = self._manager.Queue()
+            threading.Thread(target=self._pump_events, name="ml-events", daemon=True).start()
+
+    def submit(self, stages: Sequence[str]) -> bool:
+        """Start a run of ``stages``; False if a run is already in progress."""
+        stages = [name for name in ML_STAGES if name in stages]
+        with self._lock:
+            if self.status == "running":
+                return False
+            self.status, self.stages, self.error = "running", stages, None
+            self.started_at, self.finished_at = time.time(), None
+        self._publish(self.status_event())
+        self._executor.submit(self._run, stages)
+        return True
+
+    def status_event(self) -> dict:
+        return {"stage": "ml", "event": "status", "time": time.time(), "status": self.status,
+                "stages": self.stages, "error": self.error}
+
+    def _publish(self, event: dict) -> None:
+        # Through the queue, so runner events stay behind the stages' events
+        if self._events is not None:
+            self._events.put(event)
+
+    def _pump_events(self) -> None:
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+            self.on_event(event)
+
+    def _run(self, stages: List[str]) -> None:
+        start = time.perf_counter()
+        self._publish({"stage": "ml", "event": "start", "time": time.time(), "total": len(stages)})
+        done = 0
+        try:
+            for name in stages:
+                with ProcessPoolExecutor(max_workers=1, mp_context=self._context) as pool:
+                    pool.submit(run_stage, name, str(self.root), self._events).result()
+                done += 1
+            self.status = "done"
+        except Exception as e:
+            self.status, self.error = "failed", f"{type(e).__name__}: {e}"
+            logging.error(f"PipelineRunner: stage '{stages[done]}' failed: {e}")
+        self.finished_at = time.time()
+        self._publish({"stage": "ml", "event": "end", "time": time.time(), "done": done,
+                       "elapsed": time.perf_counter() - start, "ok": self.status == "done"})
+        self._publish(self.status_event())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._events is not None:
+            self._events.put(None)
+            self._manager.shutdown()
@@ -0,0 +1,71 @@
+from typing import Iterator, List, Optional
+
+import polars as pl
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# End-of-stream marker of the Arrow IPC streaming format
+_IPC_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def build_query(
+    lf: pl.LazyFrame,
+    columns: Optional[List[str]] = None,
+    sources: Optional[List[str]] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> pl.LazyFrame:
+    """Attach projection, filters, sort and paging to a scan so polars can
+    push them down instead of materialising the table."""
+    schema = lf.collect_schema()
+    requested = set(columns or []) | {sort} - {None}
+    if sources:
+        requested.add("source")
+    missing = sorted(c for c in requested if c not in schema)
+    if missing:
+        raise ValueError(f"Unknown columns: {missing}")
+
+    if sources:
+        lf = lf.filter(pl.col("source").is_in(sources))
+    if sort:
+        lf = lf.sort(sort, descending=descending, nulls_last=True)
+    if offset or limit is not None:
+        lf = lf.slice(offset, limit)
+    if columns:
+        lf = lf.select(columns)
+    return lf
+
+
+def iter_ndjson(lf: pl.LazyFrame, chunk_size: int = 10_000) -> Iterator[bytes]:
+    for batch in lf.collect_batches(chunk_size=chunk_size):
+        yield batch.write_ndjson().encode()
+
+
+def iter_arrow_stream(lf: pl.LazyFrame, chunk_size: int = 10_000) -> Iterator[bytes]:
+    """Yield one Arrow IPC stream (schema, record batches, EOS) batch by batch.
+
+    Every batch is serialised as its own IPC stream; the schema message is
+    kept only from the first one and the per-batch EOS markers are dropped,
+    which splices them into a single valid stream.
+    """
+    first = True
+    for batch in lf.collect_batches(chunk_size=chunk_size):
+        buf = batch.write_ipc_stream(None).getvalue()
+        if first:
+            first = False
+            yield buf[: -len(_IPC_EOS)]
+            continue
+        # Schema message: continuation marker, int32 metadata length, metadata
+        schema_len = 8 + int.from_bytes(buf[4:8], "little")
+        yield buf[schema_len : -len(_IPC_EOS)]
+
+    if first:
+        # Empty result: still send the schema so clients see the columns
+        yield lf.clear().collect().write_ipc_stream(None).getvalue()
+    else:
+        yield _IPC_EOS
@@ -0,0 +1,138 @@
+import gzip
+import io
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import polars as pl
+
+from .cache import FileVersion, VersionedCache
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is only offered when installed
+    zstandard = None
+
+# Files MD_Analysis writes into results/ that may be served
+RESULT_FILES = (
+    "rmsd_summary.csv",
+    "rmsf_summary.csv",
+    "mmpbsa_summary.csv",
+    "data_summary.csv",
+    "pca_results.csv",
+)
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+# Preferred first when the client accepts several with the same weight
+ENCODINGS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content coding for an ``Accept-Encoding`` header, or
+    None for identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def etag(version: FileVersion, fmt: str, encoding: Optional[str]) -> str:
+    # One strong validator per representation of the file
+    suffix = f"-{encoding}" if encoding else ""
+    return f'"{version.mtime_ns:x}-{version.size:x}-{fmt}{suffix}"'
+
+
+def last_modified(version: FileVersion) -> str:
+    return formatdate(version.mtime_ns / 1e9, usegmt=True)
+
+
+def is_not_modified(
+    version: FileVersion,
+    tag: str,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since."""
+    if if_none_match is not None:
+        candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in candidates or tag in candidates
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(version.mtime_ns // 1_000_000_000) <= since
+    return False
+
+
+def render(path: Path, fmt: str) -> bytes:
+    if fmt == "csv":
+        return path.read_bytes()
+    buffer = io.BytesIO()
+    pl.read_csv(path).write_ipc(buffer, compression="uncompressed")
+    return buffer.getvalue()
+
+
+def encode(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return body
+
+
+class ResultFiles:
+    """Serves MD_Analysis result files as cached, pre-encoded representations.
+
+    Entries are keyed on ``(file version, format, encoding)``, so a rewritten
+    file is re-rendered on its next request and its old encodings evicted.
+    """
+
+    def __init__(self, results_dir: str | Path, maxsize: int = 32):
+        self.results_dir = Path(results_dir)
+        self.cache = VersionedCache(maxsize=maxsize)
+
+    def path(self, name: str) -> Path:
+        if name not in RESULT_FILES:
+            raise KeyError(name)
+        return self.results_dir / name
+
+    def available(self) -> Dict[str, dict]:
+        files = {}
+        for name in RESULT_FILES:
+            path = self.results_dir / name
+            if path.exists():
+                version = FileVersion.of(path)
+                files[name] = {"size": version.size, "last_modified": last_modified(version)}
+        return files
+
+    def version(self, name: str) -> FileVersion:
+        """Current version of a result file; raises KeyError for names not in
+        RESULT_FILES and FileNotFoundError when it has not been produced."""
+        return FileVersion.of(self.path(name))
+
+    def body(self, version: FileVersion, fmt: str, encoding: Optional[str]) -> Tuple[bytes, bool]:
+        """``(encoded body, cache hit)`` of one representation."""
+        return self.cache.get_or_compute(
+            (version, fmt, encoding), lambda: encode(render(Path(version.path), fmt), encoding)
+        )
@@ -2,12 +2,15 @@
 """
 Punto de entrada principal para el análisis de datos de dinámica molecular.
 Controla la ejecución de los módulos RMSD, RMSF, MMPBSA y su combinación final.
+Los tres primeros no dependen entre sí y se ejecutan a la vez; la
+combinación empieza cuando terminan.
 """
 
+import argparse
 import os
 import sys
-import pandas as pd
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 
 
 # === CONFIGURACIÓN DE RUTAS ===
@@ -23,9 +26,26 @@ if os.path.isdir(SCRIPT_DIR) and SCRIPT_DIR not in sys.path:
 
 # === FUNCIONES AUXILIARES ===
 
-def check_directory_structure() -> bool:
+# Módulos y sus dependencias, en el orden en que se listan
+MODULES = ["rmsd", "rmsf", "mmpbsa", "merge"]
+DEPENDENCIES = {"merge": ("rmsd", "rmsf", "mmpbsa")}
+
+# Resumen que escribe cada módulo en 'results' y sus opciones de escritura
+OUTPUTS = {
+    "rmsd": "rmsd_summary.csv",
+    "rmsf": "rmsf_summary.csv",
+    "mmpbsa": "mmpbsa_summary.csv",
+    "merge": "data_summary.csv",
+}
+CSV_OPTIONS = {"mmpbsa": {"float_format": "%.4f"}}
+
+
+def check_directory_structure(modules: Optional[List[str]] = None) -> bool:
     """
     Verifica que la estructura de directorios necesaria existe y contiene datos válidos.
+
+    Args:
+        modules: Módulos que se van a ejecutar; solo se comprueban sus datos
     """
     data_dir = os.path.join(BASE_DIR, "data")
     results_dir = os.path.join(BASE_DIR, "results")
@@ -38,6 +58,8 @@ def check_directory_structure() -> bool:
     }
 
     for name, path in required_dirs.items():
+        if modules is not None and name.replace("_data", "") not in modules:
+            continue
         if not os.path.isdir(path):
             print(f"Error: No se encuentra el directorio requerido: {path}")
             return False
@@ -55,9 +77,23 @@ def check_directory_structure() -> bool:
     return True
 
 
-def run_analysis_module(module_name: str) -> Optional[Dict[str, Any]]:
+def run_analysis_module(module_name: str, jobs: int = 1, threads: bool = False,
+                        equilibration: Optional[str] = None,
+                        inputs: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
     """
-    Ejecuta un módulo de análisis específico según su nombre.
+    Ejecuta un módulo de análisis específico según su nombre y devuelve su
+    resumen en memoria, sin escribirlo.
+
+    Args:
+        module_name: 'rmsd', 'rmsf', 'mmpbsa' o 'merge'
+        jobs: Archivos procesados en paralelo por los módulos por archivo
+        threads: Usar hilos en lugar de procesos
+        equilibration: Corte de equilibrado del RMSD (tiempo o 'auto')
+        inputs: Para 'merge', resultados de los módulos ya ejecutados; los
+            resúmenes que falten se leen de 'results'
+
+    Returns:
+        {"status", "file", "data"} con el DataFrame en "data", o None si falla
     """
     results_dir = os.path.join(BASE_DIR, "results")
     os.makedirs(results_dir, exist_ok=True)
@@ -65,28 +101,38 @@ def run_analysis_module(module_name: str) -> Optional[Dict[str, Any]]:
     try:
         if module_name == "rmsd":
             import script.mean_std_rmsd as mod
-            output = os.path.join(results_dir, "rmsd_summary.csv")
+            data = mod.summarize(results_dir=results_dir, jobs=jobs, threads=threads,
+                                 equilibration=mod.parse_equilibration(equilibration))
 
         elif module_name == "rmsf":
             import script.mean_std_rmsf as mod
-            output = os.path.join(results_dir, "rmsf_summary.csv")
+            data = mod.summarize(results_dir=results_dir, jobs=jobs, threads=threads)
 
         elif module_name == "mmpbsa":
             import script.mean_std_mmpbsa as mod
-            output = os.path.join(results_dir, "mmpbsa_summary.csv")
+            data = mod.summarize(results_dir=results_dir, jobs=jobs, threads=threads)
 
         elif module_name == "merge":
             import script.data_merge as mod
-            output = os.path.join(results_dir, "data_summary.csv")
+            frames = []
+            for name in DEPENDENCIES["merge"]:
+                result = (inputs or {}).get(name)
+                if result is not None:
+                    frames.append(result["data"])
+                else:
+                    frames.append(mod.load_data(os.path.join(results_dir, OUTPUTS[name])))
+            if any(df is None for df in frames):
+                print("No se pudieron cargar todos los resúmenes requeridos.")
+                return None
+            data = mod.combine(*frames)
 
         else:
             print(f"Módulo desconocido: {module_name}")
             return None
 
-        print(f"Ejecutando módulo: {module_name}")
-        mod.main()
-
-        return {"status": "success", "file": output}
+        print(f"Módulo ejecutado: {module_name}")
+        return {"status": "success", "file": os.path.join(results_dir, OUTPUTS[module_name]),
+                "data": data}
 
     except Exception as e:
         print(f"Error ejecutando módulo '{module_name}': {e}")
@@ -101,50 +147,117 @@ def validate_results(result: Optional[Dict[str, Any]]) -> bool:
         print("Error: No se devolvió información del módulo.")
         return False
 
-    file_path = result.get("file")
-    if not file_path or not os.path.exists(file_path):
-        print(f"Error: No se encontró el archivo de salida esperado: {file_path}")
+    df = result.get("data")
+    name = os.path.basename(result.get("file") or "")
+    if df is None or df.empty:
+        print(f"El resumen {name} está vacío.")
         return False
+    print(f"Resultados válidos: {name} ({len(df)} filas)")
+    return True
 
-    try:
-        df = pd.read_csv(file_path)
-        if df.empty:
-            print(f"El archivo {os.path.basename(file_path)} está vacío.")
-            return False
-        print(f"Resultados válidos: {os.path.basename(file_path)} ({len(df)} filas)")
-        return True
-    except Exception as e:
-        print(f"Error leyendo {file_path}: {e}")
-        return False
+
+def run_and_validate(module_name: str, writer=None, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Ejecuta un módulo y valida su salida; tarea del grafo de módulos. El
+    resumen se entrega a `writer` para escribirlo en segundo plano.
+
+    Raises:
+        RuntimeError: Si el módulo falla o su salida no es válida
+    """
+    result = run_analysis_module(module_name, **kwargs)
+    if not validate_results(result):
+        raise RuntimeError(f"el módulo {module_name.upper()} no produjo resultados válidos")
+    if writer is not None:
+        writer.submit(result["data"], result["file"], **CSV_OPTIONS.get(module_name, {}))
+    return result
 
 
 # === EJECUCIÓN PRINCIPAL ===
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    import parallel
+    import result_writer
+    import task_graph
+
+    parser = argparse.ArgumentParser(description="Análisis de dinámica molecular")
+    parallel.add_arguments(parser)
+    parser.add_argument(
+        "--only", default=None,
+        help=f"Módulos a ejecutar, separados por comas ({','.join(MODULES)}; por defecto, todos)",
+    )
+    parser.add_argument(
+        "--sequential", action="store_true",
+        help="Ejecutar los módulos uno tras otro en lugar de a la vez",
+    )
+    parser.add_argument(
+        "--format", default="csv",
+        help="Formatos de los resúmenes, separados por comas (csv, parquet; por defecto, csv)",
+    )
+    parser.add_argument(
+        "--equilibration", default=None,
+        help="Tiempo de inicio del análisis de RMSD, o 'auto' para detectarlo (MSER)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        writer = result_writer.BackgroundWriter(args.format.split(","))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    # Grafo de módulos: 'merge' depende de los otros tres y recibe sus
+    # resúmenes en memoria
+    tasks = [
+        task_graph.Task(name, run_and_validate, DEPENDENCIES.get(name, ()), {
+            "module_name": name, "jobs": args.jobs, "threads": args.threads,
+            "equilibration": args.equilibration, "writer": writer,
+        }, pass_inputs=name == "merge")
+        for name in MODULES
+    ]
+    try:
+        tasks = task_graph.select(tasks, args.only.split(",") if args.only else None)
+    except ValueError as e:
+        writer.close()
+        print(f"Error: {e}")
+        sys.exit(2)
+    selected = [task.name for task in tasks]
+
     print("\nIniciando análisis de dinámica molecular...\n")
 
     # Verificar estructura
-    if not check_directory_structure():
+    if not check_directory_structure(selected):
+        writer.close()
         print("Estructura de directorios incorrecta. Abortando.")
         sys.exit(1)
 
-    # Secuencia de módulos
-    modules = ["rmsd", "rmsf", "mmpbsa", "merge"]
-    results: Dict[str, Dict[str, Any]] = {}
-
-    for i, module_name in enumerate(modules, start=1):
-        print(f"\n{i}. Ejecutando módulo '{module_name.upper()}'...")
-        result = run_analysis_module(module_name)
-        if not validate_results(result):
-            print(f"Falló el módulo {module_name.upper()}. Abortando.")
-            sys.exit(1)
-        results[module_name] = result
+    print(f"Módulos: {', '.join(m.upper() for m in selected)}")
+    inicio = time.perf_counter()
+    results = task_graph.run(
+        tasks,
+        workers=1 if args.sequential else None,
+        on_done=lambda r: print(f"\nMódulo '{r.name.upper()}': {r.status} ({r.elapsed:.1f} s)"),
+    )
+    # Los resúmenes se escriben una sola vez, en segundo plano; aquí solo
+    # se espera a que termine la cola
+    written = writer.close()
+    total = time.perf_counter() - inicio
+
+    print("\nTiempo por módulo:")
+    print(task_graph.report(results, total))
+
+    failed = [r for r in results.values() if r.status != "done"]
+    for r in failed:
+        print(f"Falló el módulo {r.name.upper()}: {r.error}")
+    for path, error in written["errors"]:
+        print(f"Error al escribir {path}: {error}")
+    if failed or written["errors"]:
+        sys.exit(1)
 
     # Resumen final
     print("\nAnálisis completado exitosamente.\n")
     print("Archivos generados:")
-    for key, value in results.items():
-        print(f" - {key.upper():<8}: {value['file']}")
+    for path in written["written"]:
+        print(f" - {path}")
 
     print("\nTodos los resultados están listos en el directorio 'results'.")
 
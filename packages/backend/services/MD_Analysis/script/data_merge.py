@@ -1,12 +1,59 @@
 #!/usr/bin/env python3
 """
 Script para combinar los resultados de RMSD, RMSF y MMPBSA en un solo resumen.
+Los resúmenes se unen por (proteína, ligando) en una sola consulta perezosa
+de polars: normalizar nombres, agrupar las réplicas de cada complejo
+('ligando-proteína-r1', '-r2', ...) y unir los tres resultados.
 Autor: CIIM - Renato Valencia
 """
 
 import os
+import time
 import pandas as pd
-from typing import Optional
+import polars as pl
+import polars.selectors as cs
+from typing import Dict, List, Optional, Union
+
+import progress
+from manifest import Manifest
+
+OUTPUT_FILE = "data_summary.csv"
+
+KEYS = ["protein", "ligand"]
+
+# Sufijos de archivo que pueden quedar en los nombres y sufijo de réplica
+# al final de la proteína ('-r1', '_r2', '-rep3'); el de réplica no se
+# aplica al ligando, cuyo nombre puede acabar igual ('lig-r2')
+SUFFIX_PATTERN = r"(?:-rmsd|-rmsf|_RESULTS_MMPBSA)$"
+REPLICA_PATTERN = r"[-_]r(?:ep)?\d+$"
+
+# Nombres de columnas de versiones anteriores de los resúmenes
+RENAMES = {
+    'Media RMSD (nm)': 'RMSD_mean',
+    'Desv. Est. RMSD (nm)': 'RMSD_std',
+    'Desv. Est. (nm)': 'RMSD_std',
+    'mean_rmsf': 'RMSF_mean',
+    'std_rmsf': 'RMSF_std',
+    'Media RMSF (nm)': 'RMSF_mean',
+    'Desv. Est. RMSF (nm)': 'RMSF_std',
+    'n_rmsf': 'RMSF_n',
+}
+
+# Términos (pares '<término>_mean'/'<término>_std') que aporta cada resumen
+SOURCES = {
+    "rmsd": ["RMSD"],
+    "rmsf": ["RMSF"],
+    "mmpbsa": ["VDWAALS", "EEL", "EGB", "ESURF", "TOTAL"],
+}
+
+# Número de valores detrás de cada media (frames o residuos), que pondera
+# las réplicas, y ddof con que cada resumen calcula sus desviaciones
+COUNTS = {"rmsd": "RMSD_n", "rmsf": "RMSF_n", "mmpbsa": "MMPBSA_n"}
+DDOF = {"rmsd": 0, "rmsf": 0, "mmpbsa": 1}
+
+REQUIRED_COLUMNS = KEYS + ["replicas"] + [
+    f"{term}_{stat}" for terms in SOURCES.values() for term in terms for stat in ("mean", "std")
+]
 
 # === Funciones auxiliares ===
 
@@ -15,7 +62,7 @@ def load_data(file_path: str) -> Optional[pd.DataFrame]:
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"No se encuentra el archivo {file_path}")
-        
+
         df = pd.read_csv(file_path)
         return df
     except Exception as e:
@@ -23,91 +70,147 @@ def load_data(file_path: str) -> Optional[pd.DataFrame]:
         return None
 
 
-def clean_ligand_names(df: pd.DataFrame) -> pd.DataFrame:
-    """Normaliza los nombres de la columna 'ligand' eliminando sufijos no deseados."""
-    if "ligand" not in df.columns:
-        return df
-
-    df = df.copy()
-    df["ligand"] = (
-        df["ligand"]
-        .str.replace("-rmsd", "", regex=False)
-        .str.replace("-rmsf", "", regex=False)
-        .str.replace("_RESULTS_MMPBSA", "", regex=False)
-        .str.strip()
+def normalize(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Renombra columnas antiguas y limpia las claves: quita espacios y sufijos
+    de archivo, y el sufijo de réplica solo de la proteína. Un resumen sin
+    columna 'protein' se trata como proteína 'unknown'.
+    """
+    names = lf.collect_schema().names()
+    lf = lf.rename({old: new for old, new in RENAMES.items() if old in names and new not in names})
+    if "protein" not in names:
+        lf = lf.with_columns(pl.lit("unknown").alias("protein"))
+    key = {name: pl.col(name).cast(pl.String).str.strip_chars().str.replace(SUFFIX_PATTERN, "")
+           for name in KEYS}
+    return lf.with_columns(
+        key["protein"].str.replace(REPLICA_PATTERN, ""),
+        key["ligand"],
     )
-    return df
 
 
-def merge_data(rmsd_df: pd.DataFrame, rmsf_df: pd.DataFrame, mmpbsa_df: pd.DataFrame) -> pd.DataFrame:
-    """Fusiona los tres DataFrames en uno solo usando la columna 'ligand'."""
-    try:
-        print("Columnas originales detectadas:")
-        print(f"RMSD → {rmsd_df.columns.tolist()}")
-        print(f"RMSF → {rmsf_df.columns.tolist()}")
-        print(f"MMPBSA → {mmpbsa_df.columns.tolist()}")
-
-        # Renombrar columnas según su origen
-        rmsd_rename = {
-            'Media RMSD (nm)': 'RMSD_mean',
-            'Desv. Est. RMSD (nm)': 'RMSD_std',
-            'Desv. Est. (nm)': 'RMSD_std'
-        }
-        rmsd_df = rmsd_df.rename(columns={k: v for k, v in rmsd_rename.items() if k in rmsd_df.columns})
-
-        rmsf_rename = {
-            'mean_rmsf': 'RMSF_mean',
-            'std_rmsf': 'RMSF_std',
-            'Media RMSF (nm)': 'RMSF_mean',
-            'Desv. Est. RMSF (nm)': 'RMSF_std'
-        }
-        rmsf_df = rmsf_df.rename(columns={k: v for k, v in rmsf_rename.items() if k in rmsf_df.columns})
-
-        # Fusionar por 'ligand'
-        merged = pd.merge(rmsd_df, rmsf_df, on="ligand", how="outer")
-        merged = pd.merge(merged, mmpbsa_df, on="ligand", how="outer")
-
-        # Columnas requeridas
-        required_columns = [
-            'ligand',
-            'RMSD_mean', 'RMSD_std',
-            'RMSF_mean', 'RMSF_std',
-            'VDWAALS_mean', 'VDWAALS_std',
-            'EEL_mean', 'EEL_std',
-            'EGB_mean', 'EGB_std',
-            'ESURF_mean', 'ESURF_std',
-            'TOTAL_mean', 'TOTAL_std'
-        ]
-
-        missing = [c for c in required_columns if c not in merged.columns]
+def pool_replicas(lf: pl.LazyFrame, terms: List[str], count: str,
+                  n: Optional[str] = None, ddof: int = 1) -> pl.LazyFrame:
+    """
+    Agrupa las réplicas de cada complejo, ponderando cada una por su número
+    de valores n_i. La media combinada es M = Σ n_i·m_i / N y la varianza
+    combinada (ddof=1) es [Σ (n_i - 1)·v_i + Σ n_i·(m_i - M)²] / (N - 1),
+    con v_i la varianza de la réplica con ddof=1: las desviaciones con
+    ddof=0 se convierten antes. Las réplicas sin media (fallidas) no cuentan.
+    Sin columna de conteo (resúmenes antiguos), todas pesan lo mismo y la
+    varianza es la varianza media dentro de las réplicas más la varianza
+    entre sus medias.
+
+    Args:
+        lf: Resumen normalizado
+        terms: Términos con columnas '<término>_mean' y '<término>_std'
+        count: Nombre de la columna con el número de réplicas
+        n: Columna con el número de valores de cada réplica (None si no hay)
+        ddof: ddof de las desviaciones del resumen
+
+    Returns:
+        Una fila por (proteína, ligando)
+    """
+    weight = pl.col(n).cast(pl.Float64) if n else pl.lit(1.0)
+    exprs = [pl.len().alias(count)]
+    for term in terms:
+        mean, std = pl.col(f"{term}_mean"), pl.col(f"{term}_std")
+        valid = mean.is_not_null() & mean.is_not_nan() & (weight > 0)
+        w, m = pl.when(valid).then(weight), pl.when(valid).then(mean)
+        total = w.sum()
+        pooled = (w * m).sum() / total
+        between = (w * (m - pooled) ** 2).sum()
+        if n:
+            # Suma de cuadrados dentro de cada réplica: s²·(n - ddof)
+            within = pl.when(w > ddof).then(std ** 2 * (w - ddof)).sum()
+            variance = pl.when(total > 1).then((within + between) / (total - 1))
+        else:
+            variance = ((w * std ** 2).sum() + between) / total
+        exprs.append(pooled.alias(f"{term}_mean"))
+        exprs.append(variance.sqrt().alias(f"{term}_std"))
+    return lf.group_by(KEYS).agg(exprs)
+
+
+def merge_lazy(sources: Dict[str, pl.LazyFrame]) -> pl.LazyFrame:
+    """
+    Plan completo de la combinación: normalizar, agrupar réplicas y unir los
+    tres resúmenes por (proteína, ligando). Nada se calcula hasta collect().
+    Con el número de valores de cada réplica, las desviaciones combinadas
+    usan ddof=1 en los tres resúmenes.
+
+    Args:
+        sources: Resumen de 'rmsd', 'rmsf' y 'mmpbsa'
+
+    Returns:
+        LazyFrame con REQUIRED_COLUMNS, ordenado por proteína y ligando
+
+    Raises:
+        ValueError: Si a un resumen le falta alguna columna requerida
+    """
+    merged = None
+    for name, terms in SOURCES.items():
+        lf = normalize(sources[name])
+        names = lf.collect_schema().names()
+        missing = [f"{t}_{s}" for t in terms for s in ("mean", "std") if f"{t}_{s}" not in names]
         if missing:
-            raise ValueError(f"Faltan columnas requeridas: {missing}")
+            raise ValueError(f"Faltan columnas requeridas en {name}: {missing}")
+        n = COUNTS[name] if COUNTS[name] in names else None
+        if n is None:
+            print(f"Advertencia: {name} sin columna {COUNTS[name]}; las réplicas pesan lo mismo")
+        pooled = pool_replicas(lf, terms, f"{name}_replicas", n, DDOF[name])
+        merged = pooled if merged is None else merged.join(pooled, on=KEYS, how="full", coalesce=True)
+
+    counts = [f"{name}_replicas" for name in SOURCES]
+    return (
+        merged
+        .with_columns(pl.max_horizontal(counts).alias("replicas"))
+        .select(REQUIRED_COLUMNS)
+        .with_columns(cs.float().round(6))
+        .sort(KEYS)
+    )
 
-        merged = merged[required_columns]
-        merged = merged.sort_values(by="ligand").round(6)
 
-        return merged
+def combine(rmsd_df: Union[pd.DataFrame, pl.LazyFrame], rmsf_df: Union[pd.DataFrame, pl.LazyFrame],
+            mmpbsa_df: Union[pd.DataFrame, pl.LazyFrame]) -> pd.DataFrame:
+    """
+    Combina los tres resúmenes (en memoria o leídos con pl.scan_csv).
 
+    Returns:
+        DataFrame combinado (vacío si no se pudieron combinar)
+    """
+    progress.emit("merge", "start", total=3)
+    inicio = time.perf_counter()
+    frames = dict(zip(SOURCES, (rmsd_df, rmsf_df, mmpbsa_df)))
+    sources = {name: df if isinstance(df, pl.LazyFrame) else pl.from_pandas(df).lazy()
+               for name, df in frames.items()}
+    try:
+        merged_df = merge_lazy(sources).collect().to_pandas()
     except Exception as e:
         print(f"Error al combinar datos: {e}")
-        print(f"Columnas RMSD: {rmsd_df.columns.tolist()}")
-        print(f"Columnas RMSF: {rmsf_df.columns.tolist()}")
-        print(f"Columnas MMPBSA: {mmpbsa_df.columns.tolist()}")
-        return pd.DataFrame()
+        for name, lf in sources.items():
+            print(f"Columnas {name.upper()}: {lf.collect_schema().names()}")
+        merged_df = pd.DataFrame()
+    progress.emit("merge", "end", files=3, rows=len(merged_df),
+                  elapsed=time.perf_counter() - inicio)
+    return merged_df
 
 
 # === Función principal ===
 
-def main():
-    """Punto de entrada principal."""
+def main(results_dir: Optional[str] = None):
+    """
+    Punto de entrada principal.
+
+    Args:
+        results_dir: Directorio con los resúmenes y de salida (por defecto, 'results')
+    """
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    results_dir = os.path.join(base_dir, "results")
+    results_dir = results_dir or os.path.join(base_dir, "results")
     os.makedirs(results_dir, exist_ok=True)
 
     rmsd_file = os.path.join(results_dir, "rmsd_summary.csv")
     rmsf_file = os.path.join(results_dir, "rmsf_summary.csv")
     mmpbsa_file = os.path.join(results_dir, "mmpbsa_summary.csv")
-    output_file = os.path.join(results_dir, "data_summary.csv")
+    output_file = os.path.join(results_dir, OUTPUT_FILE)
 
     print("Combinando archivos:")
     print(f"• RMSD → {rmsd_file}")
@@ -115,34 +218,32 @@ def main():
     print(f"• MMPBSA → {mmpbsa_file}")
     print(f"• Salida → {output_file}")
 
-    rmsd_df = load_data(rmsd_file)
-    rmsf_df = load_data(rmsf_file)
-    mmpbsa_df = load_data(mmpbsa_file)
-
-    if any(df is None for df in [rmsd_df, rmsf_df, mmpbsa_df]):
-        print("No se pudieron cargar todos los archivos requeridos.")
+    # Si ni los resúmenes ni la salida cambiaron, la combinación es la misma
+    inputs = [rmsd_file, rmsf_file, mmpbsa_file, output_file]
+    manifest = Manifest(results_dir)
+    _, pending = manifest.partition("merge", inputs)
+    if not pending:
+        print("Sin cambios en los resúmenes; se conserva la combinación anterior.")
         return
 
-    # Normalizar identificadores (ligand)
-    for df in (rmsd_df, rmsf_df, mmpbsa_df):
-        df = clean_ligand_names(df)
-
-    # Asegurar consistencia
-    rmsd_df = clean_ligand_names(rmsd_df)
-    rmsf_df = clean_ligand_names(rmsf_df)
-    mmpbsa_df = clean_ligand_names(mmpbsa_df)
+    missing = [path for path in inputs[:3] if not os.path.exists(path)]
+    if missing:
+        print(f"No se pudieron cargar todos los archivos requeridos: {', '.join(missing)}")
+        return
 
-    merged_df = merge_data(rmsd_df, rmsf_df, mmpbsa_df)
+    merged_df = combine(pl.scan_csv(rmsd_file), pl.scan_csv(rmsf_file), pl.scan_csv(mmpbsa_file))
 
     if merged_df.empty:
         print("No se pudieron combinar los datos correctamente.")
         return
 
     merged_df.to_csv(output_file, index=False)
-    print(f"\Resumen de datos combinados guardado en {output_file}\n")
+    for path in inputs:
+        manifest.record("merge", path, {"rows": len(merged_df)} if path == output_file else None)
+    manifest.save()
+    print(f"\nResumen de datos combinados guardado en {output_file}\n")
     print(merged_df.head(10))
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Manifiesto de entradas ya procesadas para el análisis incremental.
+Guarda en results/manifest.json la ruta, tamaño, fecha de modificación y
+hash de contenido de cada archivo de entrada junto con sus estadísticas,
+de modo que una nueva ejecución solo recalcula los archivos nuevos o
+modificados y descarta los eliminados. Borrar el manifiesto fuerza el
+recálculo completo.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MANIFEST_FILE = "manifest.json"
+VERSION = 1
+
+# save() lee, combina y reemplaza el archivo: los módulos que se ejecutan a
+# la vez en hilos del mismo proceso lo hacen de uno en uno
+_save_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    """Hash BLAKE2b (128 bits) del contenido de un archivo."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _jsonable(value: Any) -> Any:
+    # Escalares de numpy a Python; pd.NA y similares a null
+    item = getattr(value, "item", None)
+    return item() if callable(item) else None
+
+
+class Manifest:
+    """
+    Estadísticas por archivo de cada etapa ('rmsd', 'rmsf', 'mmpbsa', 'merge').
+
+    Un archivo se reutiliza si su tamaño y fecha coinciden con los guardados
+    o, si solo cambió la fecha, si su hash de contenido coincide.
+    """
+
+    def __init__(self, results_dir: str):
+        self.path = os.path.join(results_dir, MANIFEST_FILE)
+        data = self._load()
+        self.stages: Dict[str, Dict[str, dict]] = data.get("stages", {})
+        self.params: Dict[str, Any] = data.get("params", {})
+        self._touched: set = set()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Advertencia: manifiesto ilegible ({e}); se procesará todo de nuevo")
+            return {}
+        return data if data.get("version") == VERSION else {}
+
+    def _is_current(self, path: str, entry: dict) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != entry.get("size"):
+            return False
+        if st.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        if file_hash(path) != entry.get("hash"):
+            return False
+        entry["mtime_ns"] = st.st_mtime_ns
+        return True
+
+    def partition(self, stage: str, files: List[str], params: Any = None,
+                  valid: Optional[Callable[[Any], bool]] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Separa los archivos de una etapa en reutilizables y pendientes.
+
+        Las entradas de archivos que ya no están en `files` se eliminan, y
+        todas si cambiaron los parámetros con que se calcularon (`params`).
+        Con `valid`, las entradas cuyas estadísticas no lo cumplen (archivos
+        que fallaron) se vuelven a procesar.
+
+        Returns:
+            (estadísticas guardadas por archivo, archivos a recalcular)
+        """
+        previous = self.stages.get(stage, {}) if self.params.get(stage) == params else {}
+        self.params[stage] = params
+        current: Dict[str, dict] = {}
+        cached: Dict[str, Any] = {}
+        pending: List[str] = []
+        for path in files:
+            key = os.path.abspath(path)
+            entry = previous.get(key)
+            if (entry is not None and (valid is None or valid(entry.get("stats")))
+                    and self._is_current(path, entry)):
+                current[key] = entry
+                cached[path] = entry.get("stats")
+            else:
+                pending.append(path)
+        removed = len(set(previous) - {os.path.abspath(p) for p in files})
+        self.stages[stage] = current
+        self._touched.add(stage)
+        print(f"Manifiesto ({stage}): {len(cached)} reutilizados, {len(pending)} por procesar, "
+              f"{removed} eliminados")
+        return cached, pending
+
+    def record(self, stage: str, path: str, stats: Any = None) -> None:
+        """Registra un archivo procesado con sus estadísticas."""
+        st = os.stat(path)
+        self.stages.setdefault(stage, {})[os.path.abspath(path)] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hash": file_hash(path),
+            "stats": stats,
+        }
+        self._touched.add(stage)
+
+    def save(self) -> None:
+        """Escribe el manifiesto de forma atómica, conservando las etapas
+        que otros módulos hayan guardado mientras tanto."""
+        with _save_lock:
+            data = self._load()
+            stages, params = data.get("stages", {}), data.get("params", {})
+            for stage in self._touched:
+                stages[stage] = self.stages.get(stage, {})
+                params[stage] = self.params.get(stage)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump({"version": VERSION, "stages": stages, "params": params}, f,
+                          default=_jsonable)
+            os.replace(tmp, self.path)
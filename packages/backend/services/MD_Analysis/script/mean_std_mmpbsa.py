@@ -4,115 +4,178 @@ Script para calcular la media y desviación estándar de MMPBSA de trayectorias
 Agrupa los resultados por proteína y ligando.
 """
 
+import argparse
 import os
+import time
+from functools import partial
 import pandas as pd
 import glob
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
-def process_mmpbsa_file(file_path: str) -> Dict[str, float]:
+import mmpbsa_io
+import parallel
+import progress
+from manifest import Manifest
+
+OUTPUT_FILE = 'mmpbsa_summary.csv'
+# Opciones de escritura del resumen
+CSV_OPTIONS = {'float_format': '%.4f'}
+
+# Términos que el resumen incluye siempre, en este orden
+SUMMARY_TERMS = ["VDWAALS", "EEL", "EGB", "ESURF", "TOTAL"]
+
+def parse_filename(file_path: str) -> Tuple[str, str]:
+    """Obtiene (ligando, proteína) del nombre 'ligando-proteína_RESULTS_MMPBSA.csv'."""
+    filename = os.path.basename(file_path).replace('_RESULTS_MMPBSA.csv', '')
     try:
-        start_line = -1
-        with open(file_path, 'r') as f:
-            for i, line in enumerate(f):
-                if "Delta Energy Terms" in line:
-                    start_line = i + 1
-                    break
-        
-        if start_line == -1:
-            print(f"Advertencia: 'Delta Energy Terms' no encontrado en {file_path}. Se intentará leer desde el principio.")
-            start_line = 0
+        ligand, protein = filename.split('-', 1)
+    except ValueError:
+        ligand, protein = filename, "unknown"
+    return ligand, protein
+
+def process_mmpbsa_file(file_path: str, cache_dir: Optional[str] = None) -> Dict[str, float]:
+    """
+    Calcula media y desviación estándar de cada término de energía de la
+    sección 'Delta Energy Terms' (primer modelo de solvatación del archivo).
 
-        # Leer datos
-        df = pd.read_csv(file_path, skiprows=start_line)
-        df.columns = [col.strip().replace('#', '').strip() for col in df.columns]
+    Args:
+        file_path: Ruta al archivo *_RESULTS_MMPBSA.csv
+        cache_dir: Directorio de los fotogramas ya convertidos (.npz)
 
-        if df.empty:
-            print(f"Advertencia: DataFrame vacío para {file_path}")
+    Returns:
+        Diccionario con proteína, ligando, número de fotogramas (MMPBSA_n) y
+        '<término>_mean'/'<término>_std' (ddof=1), o None si la sección no
+        tiene fotogramas
+    """
+    ligand, protein = parse_filename(file_path)
+    stats = {"protein": protein, "ligand": ligand, "MMPBSA_n": 0}
+    for term in SUMMARY_TERMS:
+        stats[f"{term}_mean"] = pd.NA
+        stats[f"{term}_std"] = pd.NA
+
+    try:
+        sections = mmpbsa_io.read_mmpbsa(file_path, cache_dir)
+        delta = mmpbsa_io.find(sections, "Delta")
+        if delta is None:
+            print(f"Advertencia: 'Delta Energy Terms' no encontrado en {file_path}")
+            return stats
+        if not len(delta.frames):
+            print(f"Advertencia: sección Delta vacía en {file_path}")
             return None
 
-        # Nombre base del archivo
-        filename = os.path.basename(file_path).replace('_RESULTS_MMPBSA.csv', '')
-
-        # Extraer ligando y proteína
-        try:
-            ligand, protein = filename.split('-', 1)
-        except ValueError:
-            ligand, protein = filename, "unknown"
-
-        return {
-            "protein": protein,
-            "ligand": ligand,
-            'VDWAALS_mean': df['VDWAALS'].mean() if 'VDWAALS' in df.columns else pd.NA,
-            'VDWAALS_std': df['VDWAALS'].std() if 'VDWAALS' in df.columns else pd.NA,
-            'EEL_mean': df['EEL'].mean() if 'EEL' in df.columns else pd.NA,
-            'EEL_std': df['EEL'].std() if 'EEL' in df.columns else pd.NA,
-            'EGB_mean': df['EGB'].mean() if 'EGB' in df.columns else pd.NA,
-            'EGB_std': df['EGB'].std() if 'EGB' in df.columns else pd.NA,
-            'ESURF_mean': df['ESURF'].mean() if 'ESURF' in df.columns else pd.NA,
-            'ESURF_std': df['ESURF'].std() if 'ESURF' in df.columns else pd.NA,
-            'TOTAL_mean': df['TOTAL'].mean() if 'TOTAL' in df.columns else pd.NA,
-            'TOTAL_std': df['TOTAL'].std() if 'TOTAL' in df.columns else pd.NA
-        }
+        stats["MMPBSA_n"] = len(delta.frames)
 
+        # Todos los términos de la sección; los nombres con espacios
+        # ('1-4 VDW') se escriben con guion bajo
+        terms = SUMMARY_TERMS + [t for t in delta.terms if t not in SUMMARY_TERMS]
+        for term in terms:
+            if term not in delta.terms:
+                continue
+            values = delta.column(term)
+            key = term.replace(' ', '_')
+            stats[f"{key}_mean"] = float(values.mean())
+            stats[f"{key}_std"] = float(values.std(ddof=1)) if len(values) > 1 else pd.NA
     except Exception as e:
         print(f"Error procesando {file_path}: {e}")
-        filename = os.path.basename(file_path).replace('_RESULTS_MMPBSA.csv', '')
-        try:
-            ligand, protein = filename.split('-', 1)
-        except ValueError:
-            ligand, protein = filename, "unknown"
-
-        return {
-            "protein": protein,
-            "ligand": ligand,
-            'VDWAALS_mean': pd.NA,
-            'VDWAALS_std': pd.NA,
-            'EEL_mean': pd.NA,
-            'EEL_std': pd.NA,
-            'EGB_mean': pd.NA,
-            'EGB_std': pd.NA,
-            'ESURF_mean': pd.NA,
-            'ESURF_std': pd.NA,
-            'TOTAL_mean': pd.NA,
-            'TOTAL_std': pd.NA
-        }
-
-def main():
-    """Función principal para procesar los archivos MMPBSA."""
+    return stats
+
+def is_valid(stats: Optional[Dict[str, float]]) -> bool:
+    """True si el archivo dio energías (no falló ni estaba vacío)."""
+    return stats is not None and not pd.isna(stats.get("TOTAL_mean"))
+
+def summarize(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+              jobs: int = 1, threads: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Calcula el resumen de MMPBSA sin escribirlo.
+
+    Args:
+        data_dir: Directorio con la subcarpeta 'mmpbsa_data' (por defecto, 'data')
+        results_dir: Directorio de salida (por defecto, 'results')
+        jobs: Archivos procesados en paralelo (0 = todos los núcleos)
+        threads: Usar hilos en lugar de procesos
+
+    Returns:
+        DataFrame ordenado por proteína y ligando, o None si no hay datos
+    """
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(base_dir, 'data', 'mmpbsa_data')
-    output_dir = os.path.join(base_dir, 'results')
-    output_file = os.path.join(output_dir, 'mmpbsa_summary.csv')
+    data_dir = os.path.join(data_dir or os.path.join(base_dir, 'data'), 'mmpbsa_data')
+    output_dir = results_dir or os.path.join(base_dir, 'results')
+    # Fotogramas ya convertidos, para cálculos posteriores sin releer el CSV
+    cache_dir = os.path.join(output_dir, 'mmpbsa_frames')
     
     files = glob.glob(os.path.join(data_dir, '*.csv'))
     
     if not files:
         print(f"No se encontraron archivos .csv en {data_dir}")
-        return
+        return None
         
-    all_stats = []
-    for file in sorted(files):
-        stats = process_mmpbsa_file(file)
+    # Solo se procesan los archivos nuevos o modificados; los resultados se
+    # guardan en el orden de la lista de archivos
+    files = sorted(files)
+    manifest = Manifest(output_dir)
+    # Las entradas anteriores a la lectura por secciones solo tienen los
+    # términos de SUMMARY_TERMS, y las más antiguas no tienen MMPBSA_n: se
+    # recalculan
+    cached, pending = manifest.partition("mmpbsa", files, params={"terms": "all", "counts": True},
+                                         valid=is_valid)
+    index = {file: i for i, file in enumerate(files)}
+    all_stats = [cached.get(file) for file in files]
+
+    inicio = time.perf_counter()
+    progress.emit("mmpbsa", "start", total=len(pending), cached=len(cached))
+    failures = []
+    for done, (_, file, stats, error) in enumerate(
+            parallel.process_files(partial(process_mmpbsa_file, cache_dir=cache_dir),
+                                   pending, jobs, threads), start=1):
+        if error:
+            failures.append((file, error))
+        elif is_valid(stats):
+            # Un archivo sin energías queda pendiente para la próxima vez
+            manifest.record("mmpbsa", file, stats)
+        progress.emit("mmpbsa", "file", file=os.path.basename(file), done=done, total=len(pending),
+                      ok=bool(stats) and not pd.isna(stats['TOTAL_mean']))
         if stats:
-            all_stats.append(stats)
+            all_stats[index[file]] = stats
             print(f"Ligando: {stats['ligand']}, Proteína: {stats['protein']}, "
                   f"Energía total media: {stats['TOTAL_mean']:.4f} kcal/mol, Desv: {stats['TOTAL_std']:.4f}")
+    manifest.save()
+    parallel.report_failures("MMPBSA", failures)
+    all_stats = [s for s in all_stats if s is not None]
 
     if not all_stats:
         print("No se pudieron procesar las estadísticas de ningún archivo.")
-        return
+        return None
 
     # Crear resumen ordenado
     summary_df = pd.DataFrame(all_stats)
     summary_df = summary_df.sort_values(['protein', 'ligand'])
     summary_df = summary_df.round(4)
+    progress.emit("mmpbsa", "end", files=len(pending), rows=len(summary_df),
+                  elapsed=time.perf_counter() - inicio)
+    return summary_df
+
+def main(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+         jobs: int = 1, threads: bool = False):
+    """
+    Función principal para procesar los archivos MMPBSA: calcula el resumen
+    y lo guarda en 'mmpbsa_summary.csv'. Los argumentos son los de summarize().
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output_dir = results_dir or os.path.join(base_dir, 'results')
+    summary_df = summarize(data_dir, output_dir, jobs, threads)
+    if summary_df is None:
+        return
 
     os.makedirs(output_dir, exist_ok=True)
     
-    summary_df.to_csv(output_file, index=False, float_format='%.4f')
+    output_file = os.path.join(output_dir, OUTPUT_FILE)
+    summary_df.to_csv(output_file, index=False, **CSV_OPTIONS)
     print(f"\nResumen de MMPBSA guardado en {output_file}")
     print(summary_df)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(jobs=args.jobs, threads=args.threads)
 
@@ -4,24 +4,70 @@ Script para calcular la media y desviación estándar de RMSD de trayectorias mo
 Lee archivos .xvg de GROMACS y genera un resumen estadístico.
 """
 
+import argparse
 import os
 import glob
+import time
+from functools import partial
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional
 
-def process_rmsd_file(file_path: str) -> Dict[str, float]:
+import parallel
+import progress
+import rmsd_convergence
+from manifest import Manifest
+import streaming_stats
+import xvg_io
+
+OUTPUT_FILE = 'rmsd_summary.csv'
+
+def parse_equilibration(value: Optional[str]) -> streaming_stats.Equilibrado:
+    """Convierte '--equilibration' en None, 'auto' o un tiempo."""
+    if value is None or value == "auto":
+        return value
+    return float(value)
+
+def process_rmsd_file(file_path: str,
+                      equilibration: streaming_stats.Equilibrado = None) -> Dict[str, float]:
+    """
+    Procesa un archivo RMSD por tramos, con memoria constante.
+
+    Args:
+        file_path: Ruta al archivo .xvg
+        equilibration: None, tiempo de inicio del análisis (unidades del eje x
+            del archivo) o 'auto' para el corte MSER
+
+    Returns:
+        Diccionario con proteína, ligando, media y desviación estándar
+        (ddof=0) del RMSD, número de frames, error estándar por bloques, tiempo de inicio del análisis y
+        columnas de convergencia de la serie completa
+    """
     try:
-        # Cargar datos, ignorando líneas de comentarios
-        data = np.loadtxt(file_path, comments=('#', '@'))
-        
-        # Calcular estadísticas directamente de la segunda columna
-        rmsd_mean = float(np.mean(data[:, 1]))
-        rmsd_std = float(np.std(data[:, 1]))
-        
+        # Tiempo (columna 0) y RMSD (columna 1) del primer conjunto. La serie
+        # completa se acumula además por bloques para la convergencia, en la
+        # misma pasada
+        reader = xvg_io.XvgReader(file_path)
+        series = streaming_stats.BlockStats()
+
+        def chunks():
+            for set_index, block in reader:
+                if set_index == 0:
+                    series.update(block[:, 1], block[:, 0])
+                    yield block[:, 0], block[:, 1]
+
+        summary = streaming_stats.summarize(chunks(), equilibration)
+        if not summary.n:
+            raise ValueError("sin datos tras el equilibrado")
+        rmsd_mean, rmsd_std, rmsd_n = summary.mean, summary.std, summary.n
+        rmsd_sem, eq_time = summary.sem, summary.eq_time
+        convergence = rmsd_convergence.analyze(series, rmsd_convergence.per_ns(reader.meta.xunit))
+
     except Exception as e:
         print(f"Error procesando {file_path}: {e}")
-        rmsd_mean, rmsd_std = np.nan, np.nan
+        rmsd_mean, rmsd_std, rmsd_sem, eq_time = np.nan, np.nan, np.nan, np.nan
+        rmsd_n = 0
+        convergence = rmsd_convergence.empty_columns()
     
     # Obtener nombre base sin extensión
     filename = os.path.basename(file_path).replace('-rmsd.xvg', '')
@@ -36,27 +82,91 @@ def process_rmsd_file(file_path: str) -> Dict[str, float]:
         "protein": protein,
         "ligand": ligand,
         "RMSD_mean": rmsd_mean,
-        "RMSD_std": rmsd_std
+        "RMSD_std": rmsd_std,
+        "RMSD_n": rmsd_n,
+        "RMSD_sem": rmsd_sem,
+        "RMSD_eq_time": eq_time,
+        **convergence,
     }
 
-def main():
-    """Función principal del script"""
+def is_valid(result: Optional[Dict[str, float]]) -> bool:
+    """True si el resultado de un archivo tiene estadísticas (no falló)."""
+    return result is not None and not pd.isna(result.get("RMSD_mean"))
+
+def summarize(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+              jobs: int = 1, threads: bool = False,
+              equilibration: streaming_stats.Equilibrado = None) -> Optional[pd.DataFrame]:
+    """
+    Calcula el resumen de RMSD sin escribirlo.
+
+    Args:
+        data_dir: Directorio con la subcarpeta 'rmsd_data' (por defecto, 'data')
+        results_dir: Directorio de salida (por defecto, 'results')
+        jobs: Archivos procesados en paralelo (0 = todos los núcleos)
+        threads: Usar hilos en lugar de procesos
+        equilibration: Corte de equilibrado: None, un tiempo o 'auto' (MSER)
+
+    Returns:
+        DataFrame ordenado por proteína y ligando, o None si no hay datos
+    """
     # Obtener rutas absolutas
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    folder_path = os.path.join(base_dir, 'data', 'rmsd_data')
+    data_dir = data_dir or os.path.join(base_dir, 'data')
+    results_dir = results_dir or os.path.join(base_dir, 'results')
+    folder_path = os.path.join(data_dir, 'rmsd_data')
     files = glob.glob(os.path.join(folder_path, '*.xvg'))
     
     if not files:
         print(f"No se encontraron archivos .xvg en {folder_path}")
-        return
+        return None
     
-    # Procesar archivos
-    results = []
-    for file in files:
-        result = process_rmsd_file(file)
-        results.append(result)
-        print(f'Ligando: {result["ligand"]}, Proteína: {result["protein"]}, '
-              f'Media RMSD: {result["RMSD_mean"]:.4f} nm, Desv. Est.: {result["RMSD_std"]:.4f} nm')
+    # Solo se procesan los archivos nuevos o modificados desde la última
+    # ejecución; los resultados se guardan en el orden de la lista para que
+    # la salida no dependa del número de procesos
+    files = sorted(files)
+    manifest = Manifest(results_dir)
+    params = {
+        "equilibration": equilibration,
+        "convergence": [rmsd_convergence.WINDOW_FRACTION, rmsd_convergence.TOLERANCE,
+                        rmsd_convergence.MAX_CONVERGENCE_FRACTION, "blocks"],
+        # Las entradas sin número de frames (RMSD_n) se recalculan
+        "counts": True,
+    }
+    cached, pending = manifest.partition("rmsd", files, params=params, valid=is_valid)
+    index = {file: i for i, file in enumerate(files)}
+    results = [cached.get(file) for file in files]
+
+    inicio = time.perf_counter()
+    progress.emit("rmsd", "start", total=len(pending), cached=len(cached))
+    failures = []
+    processed = []
+    for done, (_, file, result, error) in enumerate(
+            parallel.process_files(partial(process_rmsd_file, equilibration=equilibration),
+                                   pending, jobs, threads), start=1):
+        if error:
+            failures.append((file, error))
+        else:
+            results[index[file]] = result
+            processed.append(file)
+            # Un archivo que no se pudo leer queda pendiente para la próxima vez
+            if is_valid(result):
+                manifest.record("rmsd", file, result)
+            print(f'Ligando: {result["ligand"]}, Proteína: {result["protein"]}, '
+                  f'Media RMSD: {result["RMSD_mean"]:.4f} nm, Desv. Est.: {result["RMSD_std"]:.4f} nm, '
+                  f'Error est.: {result["RMSD_sem"]:.4f} nm')
+        progress.emit("rmsd", "file", file=os.path.basename(file), done=done, total=len(pending),
+                      ok=error is None and not np.isnan(result["RMSD_mean"]))
+
+    not_converged = [os.path.basename(f) for f in processed
+                     if results[index[f]]["RMSD_converged"] is False]
+    if not_converged:
+        print(f"\nTrayectorias sin convergencia ({len(not_converged)}): {', '.join(not_converged)}")
+    manifest.save()
+    parallel.report_failures("RMSD", failures)
+    results = [r for r in results if r is not None]
+    if not results:
+        print("No se pudo procesar ningún archivo.")
+        return None
     
     # Crear DataFrame y ordenar por proteína y ligando
     summary_df = pd.DataFrame(results)
@@ -64,16 +174,39 @@ def main():
     
     # Redondear valores numéricos
     summary_df = summary_df.round(4)
-    
+    progress.emit("rmsd", "end", files=len(pending), rows=len(summary_df),
+                  elapsed=time.perf_counter() - inicio)
+    return summary_df
+
+def main(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+         jobs: int = 1, threads: bool = False,
+         equilibration: streaming_stats.Equilibrado = None):
+    """
+    Función principal del script: calcula el resumen y lo guarda en
+    'rmsd_summary.csv'. Los argumentos son los de summarize().
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results_dir = results_dir or os.path.join(base_dir, 'results')
+    summary_df = summarize(data_dir, results_dir, jobs, threads, equilibration)
+    if summary_df is None:
+        return
+
     # Crear directorio de resultados si no existe
-    results_dir = os.path.join(base_dir, 'results')
     os.makedirs(results_dir, exist_ok=True)
     
     # Guardar archivo en el directorio de resultados
-    output_file = os.path.join(results_dir, 'rmsd_summary.csv')
+    output_file = os.path.join(results_dir, OUTPUT_FILE)
     summary_df.to_csv(output_file, index=False)
     print(f"\nResumen guardado en {output_file}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parallel.add_arguments(parser)
+    parser.add_argument(
+        "--equilibration", default=None,
+        help="Descartar los fotogramas anteriores a este tiempo, o 'auto' para detectarlo (MSER)",
+    )
+    args = parser.parse_args()
+    main(jobs=args.jobs, threads=args.threads,
+         equilibration=parse_equilibration(args.equilibration))
 
@@ -4,11 +4,41 @@ Script para calcular la media y desviación estándar de RMSF de trayectorias mo
 Lee archivos .xvg de GROMACS y genera un resumen estadístico agrupado por proteína y ligando.
 """
 
+import argparse
 import os
 import glob
+import time
 import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional, Tuple
+
+import parallel
+import progress
+from manifest import Manifest
+import xvg_io
+
+OUTPUT_FILE = 'rmsf_summary.csv'
+
+def parse_filename(file_path: str) -> Tuple[str, str]:
+    """
+    Obtiene ligando y proteína del nombre 'ligando-proteína-rmsf.xvg'.
+
+    Returns:
+        (ligando, proteína); la proteína es 'unknown' si no hay guion
+    """
+    # Obtener nombre base sin extensión
+    filename = os.path.basename(file_path).replace('.xvg', '')
+
+    # Quitar sufijo '-rmsf' si está presente
+    if filename.endswith('-rmsf'):
+        filename = filename.replace('-rmsf', '')
+
+    # Dividir nombre en ligando y proteína
+    try:
+        ligand, protein = filename.split('-', 1)
+    except ValueError:
+        ligand, protein = filename, "unknown"
+    return ligand, protein
 
 def process_rmsf_file(file_path: str) -> Dict[str, float]:
     """
@@ -19,59 +49,90 @@ def process_rmsf_file(file_path: str) -> Dict[str, float]:
         
     Returns:
         Diccionario con nombre de proteína, ligando y estadísticas RMSF
+        (media, desviación estándar con ddof=0 y número de residuos)
     """
     try:
-        # Cargar datos, ignorando líneas con # o @
-        data = np.loadtxt(file_path, comments=('#', '@'))
+        # Leer la segunda columna; las líneas '#' y '@' no se convierten
+        rmsf = xvg_io.read_column(file_path, 1)
         
         # Calcular estadísticas de la segunda columna
-        mean_rmsf = np.mean(data[:, 1])
-        std_rmsf = np.std(data[:, 1])
+        mean_rmsf = np.mean(rmsf)
+        std_rmsf = np.std(rmsf)
+        n_rmsf = len(rmsf)
         
     except Exception as e:
         print(f"Error procesando {file_path}: {e}")
-        mean_rmsf, std_rmsf = np.nan, np.nan
-
-    # Obtener nombre base sin extensión
-    filename = os.path.basename(file_path).replace('.xvg', '')
-
-    # Quitar sufijo '-rmsf' si está presente
-    if filename.endswith('-rmsf'):
-        filename = filename.replace('-rmsf', '')
+        mean_rmsf, std_rmsf, n_rmsf = np.nan, np.nan, 0
 
-    # Dividir nombre en ligando y proteína
-    try:
-        ligand, protein = filename.split('-', 1)
-    except ValueError:
-        ligand, protein = filename, "unknown"
+    ligand, protein = parse_filename(file_path)
 
     return {
         "protein": protein,
         "ligand": ligand,
         "mean_rmsf": float(mean_rmsf),
-        "std_rmsf": float(std_rmsf)
+        "std_rmsf": float(std_rmsf),
+        "n_rmsf": n_rmsf,
     }
 
-def main():
-    """Función principal del script"""
+def is_valid(result: Optional[Dict[str, float]]) -> bool:
+    """True si el resultado de un archivo tiene estadísticas (no falló)."""
+    return result is not None and not pd.isna(result.get("mean_rmsf"))
+
+def summarize(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+              jobs: int = 1, threads: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Calcula el resumen de RMSF sin escribirlo.
+
+    Args:
+        data_dir: Directorio con la subcarpeta 'rmsf_data' (por defecto, 'data')
+        results_dir: Directorio de salida (por defecto, 'results')
+        jobs: Archivos procesados en paralelo (0 = todos los núcleos)
+        threads: Usar hilos en lugar de procesos
+
+    Returns:
+        DataFrame ordenado por proteína y ligando, o None si no hay datos
+    """
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    folder_path = os.path.join(base_dir, 'data', 'rmsf_data')
+    data_dir = data_dir or os.path.join(base_dir, 'data')
+    results_dir = results_dir or os.path.join(base_dir, 'results')
+    folder_path = os.path.join(data_dir, 'rmsf_data')
     files = glob.glob(os.path.join(folder_path, '*.xvg'))
     
     if not files:
         print(f"No se encontraron archivos .xvg en {folder_path}")
-        return
+        return None
     
-    results = []
-    for file in files:
-        result = process_rmsf_file(file)
-        results.append(result)
-        try:
+    # Solo se procesan los archivos nuevos o modificados; los resultados se
+    # guardan en el orden de la lista de archivos
+    files = sorted(files)
+    manifest = Manifest(results_dir)
+    # Las entradas sin número de residuos (n_rmsf) se recalculan
+    cached, pending = manifest.partition("rmsf", files, params={"counts": True}, valid=is_valid)
+    index = {file: i for i, file in enumerate(files)}
+    results = [cached.get(file) for file in files]
+
+    inicio = time.perf_counter()
+    progress.emit("rmsf", "start", total=len(pending), cached=len(cached))
+    failures = []
+    for done, (_, file, result, error) in enumerate(
+            parallel.process_files(process_rmsf_file, pending, jobs, threads), start=1):
+        if error:
+            failures.append((file, error))
+        else:
+            results[index[file]] = result
+            # Un archivo que no se pudo leer queda pendiente para la próxima vez
+            if is_valid(result):
+                manifest.record("rmsf", file, result)
             print(f'Ligando: {result["ligand"]}, Proteína: {result["protein"]}, '
                   f'Media RMSF: {result["mean_rmsf"]:.4f} nm, Desv. Est.: {result["std_rmsf"]:.4f} nm')
-        except:
-            print(f'Ligando: {result["ligand"]}, Proteína: {result["protein"]}, '
-                  f'Media RMSF: nan nm, Desv. Est.: nan nm')
+        progress.emit("rmsf", "file", file=os.path.basename(file), done=done, total=len(pending),
+                      ok=error is None and not np.isnan(result["mean_rmsf"]))
+    manifest.save()
+    parallel.report_failures("RMSF", failures)
+    results = [r for r in results if r is not None]
+    if not results:
+        print("No se pudo procesar ningún archivo.")
+        return None
     
     # Crear DataFrame
     summary_df = pd.DataFrame(results)
@@ -81,16 +142,33 @@ def main():
     
     print("\nResumen de resultados:")
     print(summary_df)
+    progress.emit("rmsf", "end", files=len(pending), rows=len(summary_df),
+                  elapsed=time.perf_counter() - inicio)
+    return summary_df
+
+def main(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+         jobs: int = 1, threads: bool = False):
+    """
+    Función principal del script: calcula el resumen y lo guarda en
+    'rmsf_summary.csv'. Los argumentos son los de summarize().
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results_dir = results_dir or os.path.join(base_dir, 'results')
+    summary_df = summarize(data_dir, results_dir, jobs, threads)
+    if summary_df is None:
+        return
     
     # Crear directorio de resultados si no existe
-    results_dir = os.path.join(base_dir, 'results')
     os.makedirs(results_dir, exist_ok=True)
     
     # Guardar archivo CSV
-    output_file = os.path.join(results_dir, 'rmsf_summary.csv')
+    output_file = os.path.join(results_dir, OUTPUT_FILE)
     summary_df.to_csv(output_file, index=False)
     print(f"\nResumen guardado en {output_file}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(jobs=args.jobs, threads=args.threads)
 
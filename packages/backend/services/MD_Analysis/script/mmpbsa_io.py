@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Lectura de los archivos CSV por fotograma de gmx_MMPBSA.
+El archivo se recorre una sola vez y se divide en secciones (modelo de
+solvatación y Complex/Receptor/Ligand/Delta), cada una con todos sus
+términos de energía como arreglos por fotograma. Los fotogramas leídos se
+guardan en un archivo .npz auxiliar para que los cálculos posteriores no
+vuelvan a convertir el texto.
+"""
+
+import io
+import json
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+# Versión del formato del archivo auxiliar
+SIDECAR_VERSION = 1
+
+_SECTION_SUFFIX = " Energy Terms"
+
+
+@dataclass
+class Section:
+    """Una sección del archivo: términos de energía por fotograma."""
+
+    model: str
+    name: str
+    terms: List[str]
+    frames: np.ndarray
+    values: np.ndarray
+
+    def column(self, term: str) -> np.ndarray:
+        """Valores por fotograma de un término de energía."""
+        return self.values[:, self.terms.index(term)]
+
+
+def _parse_block(lines: List[str], ncols: int) -> np.ndarray:
+    if not lines:
+        return np.empty((0, ncols))
+    return np.loadtxt(io.StringIO("".join(lines)), delimiter=",", ndmin=2)
+
+
+def parse(path: str) -> List[Section]:
+    """
+    Divide un archivo de gmx_MMPBSA en secciones.
+
+    Las líneas terminadas en ':' (p. ej. 'GENERALIZED BORN:') abren un
+    modelo; las líneas 'X Energy Terms', una sección; la cabecera
+    'Frame #,...' da los términos. Si el archivo no tiene títulos de
+    sección, sus datos se tratan como la sección 'Delta'.
+
+    Returns:
+        Secciones en el orden del archivo
+    """
+    sections: List[Section] = []
+    model, name = "", None
+    header: Optional[List[str]] = None
+    rows: List[str] = []
+
+    def close():
+        if header is not None:
+            data = _parse_block(rows, len(header))
+            sections.append(Section(model, name or "Delta", header[1:],
+                                    data[:, 0].astype(np.int64), data[:, 1:]))
+
+    with open(path, "r") as f:
+        for line in f:
+            text = line.strip()
+            if not text:
+                continue
+            if text[0].isdigit() or text[0] in "-.":
+                rows.append(line)
+            elif text.startswith("Frame #") or text.startswith("#Frame"):
+                close()
+                header = [col.strip().replace("#", "").strip() for col in text.split(",")]
+                rows = []
+            elif text.endswith(_SECTION_SUFFIX):
+                close()
+                header, rows = None, []
+                name = text[: -len(_SECTION_SUFFIX)].strip()
+            elif text.endswith(":") and "," not in text:
+                close()
+                header, rows = None, []
+                model, name = text[:-1].strip(), None
+    close()
+    return sections
+
+
+def find(sections: List[Section], name: str, model: Optional[str] = None) -> Optional[Section]:
+    """Primera sección con ese nombre (y modelo, si se indica)."""
+    for section in sections:
+        if section.name == name and (model is None or section.model == model):
+            return section
+    return None
+
+
+def sidecar_path(path: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, os.path.basename(path) + ".npz")
+
+
+def save_sidecar(path: str, sections: List[Section], cache_dir: str) -> None:
+    """Guarda las secciones de `path` en su archivo .npz auxiliar."""
+    st = os.stat(path)
+    meta = {
+        "version": SIDECAR_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sections": [{"model": s.model, "name": s.name, "terms": s.terms} for s in sections],
+    }
+    arrays = {"meta": np.array(json.dumps(meta))}
+    for i, section in enumerate(sections):
+        arrays[f"frames_{i}"] = section.frames
+        arrays[f"values_{i}"] = section.values
+    os.makedirs(cache_dir, exist_ok=True)
+    target = sidecar_path(path, cache_dir)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, target)
+
+
+def load_sidecar(path: str, cache_dir: str) -> Optional[List[Section]]:
+    """Secciones guardadas de `path`, o None si no hay archivo auxiliar o
+    no corresponde a la versión actual del CSV."""
+    target = sidecar_path(path, cache_dir)
+    try:
+        st = os.stat(path)
+        with np.load(target) as npz:
+            meta = json.loads(str(npz["meta"]))
+            if (meta.get("version"), meta.get("size"), meta.get("mtime_ns")) != \
+                    (SIDECAR_VERSION, st.st_size, st.st_mtime_ns):
+                return None
+            return [
+                Section(s["model"], s["name"], s["terms"], npz[f"frames_{i}"], npz[f"values_{i}"])
+                for i, s in enumerate(meta["sections"])
+            ]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def read_mmpbsa(path: str, cache_dir: Optional[str] = None) -> List[Section]:
+    """
+    Secciones de un archivo de gmx_MMPBSA, desde el archivo auxiliar si está
+    al día o convirtiendo el CSV (y guardándolo) en otro caso.
+
+    Args:
+        path: Archivo *_RESULTS_MMPBSA.csv
+        cache_dir: Directorio de los archivos .npz; None desactiva la caché
+    """
+    if cache_dir is not None:
+        sections = load_sidecar(path, cache_dir)
+        if sections is not None:
+            return sections
+    sections = parse(path)
+    if cache_dir is not None:
+        try:
+            save_sidecar(path, sections, cache_dir)
+        except OSError as e:
+            print(f"Advertencia: no se pudo guardar la caché de {path}: {e}")
+    return sections
+
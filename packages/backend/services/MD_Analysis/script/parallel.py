@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Procesamiento de archivos en paralelo para los módulos de análisis.
+Reparte una función por archivo entre varios procesos (o hilos) y devuelve
+los resultados en el orden de entrada, sin abortar si un archivo falla.
+"""
+
+import argparse
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+# (índice en la lista de entrada, archivo, resultado, error)
+Resultado = Tuple[int, str, Any, Optional[str]]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Añade las opciones de paralelismo comunes a un script."""
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Número de procesos en paralelo (0 = todos los núcleos; por defecto, 1)",
+    )
+    parser.add_argument(
+        "--threads", action="store_true",
+        help="Usar hilos en lugar de procesos",
+    )
+
+
+def resolve_jobs(jobs: Optional[int], total: int) -> int:
+    """Número efectivo de trabajadores: 0 o None usan todos los núcleos."""
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    return max(1, min(jobs, total))
+
+
+def _error(e: BaseException) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def process_files(
+    func: Callable[[str], Any],
+    files: List[str],
+    jobs: Optional[int] = 1,
+    threads: bool = False,
+) -> Iterator[Resultado]:
+    """
+    Aplica `func` a cada archivo.
+
+    Los resultados se producen a medida que terminan; el índice permite al
+    llamador colocarlos en el orden de `files`, de modo que la salida no
+    depende del número de trabajadores. Una excepción en un archivo se
+    devuelve como error de ese archivo y el resto continúa.
+
+    Args:
+        func: Función de nivel de módulo (debe poder serializarse)
+        files: Archivos a procesar
+        jobs: Trabajadores; 1 procesa en este mismo proceso
+        threads: Usar hilos en lugar de procesos
+    """
+    workers = resolve_jobs(jobs, len(files))
+    if workers == 1:
+        for i, file in enumerate(files):
+            try:
+                yield i, file, func(file), None
+            except Exception as e:
+                yield i, file, None, _error(e)
+        return
+
+    pool: Executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=workers)
+    with pool:
+        futures = {pool.submit(func, file): i for i, file in enumerate(files)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                yield i, files[i], future.result(), None
+            except Exception as e:
+                # Incluye la caída de un proceso trabajador (BrokenProcessPool)
+                yield i, files[i], None, _error(e)
+
+
+def report_failures(stage: str, failures: List[Tuple[str, str]]) -> None:
+    """Imprime el resumen de archivos que fallaron."""
+    if not failures:
+        return
+    print(f"\n{stage}: {len(failures)} archivo(s) con errores:")
+    for file, error in failures:
+        print(f" - {os.path.basename(file)}: {error}")
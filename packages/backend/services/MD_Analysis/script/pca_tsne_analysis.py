@@ -1,106 +1,241 @@
 #!/usr/bin/env python3
-
+"""
+PCA y clustering K-means de los complejos a partir de data_summary.csv.
+Se ejecuta sin pantalla (backend Agg): guarda las coordenadas, el barrido
+de k y la figura en 'results'. Con muchas filas usa IncrementalPCA y
+MiniBatchKMeans, y el número de clusters se elige por silueta evaluando
+cada k en paralelo.
+"""
+
+import argparse
 import os
-import pandas as pd
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
-
-# Ruta del archivo con las métricas
-data_path = "../results/data_summary.csv"
-
-
-# Columnas que quieres incluir en el PCA
-features = ['RMSD_mean', 'RMSD_std', 'RMSF_mean', 'RMSF_std']
-
-# Cargar datos
-df = pd.read_csv(data_path)
-
-# Seleccionar solo las columnas que existan en el CSV
-features = [f for f in features if f in df.columns]
-
-# Matriz de datos: rellenar NaN con la media
-X = df[features].fillna(df[features].mean())
 
-# Escalar datos (muy importante para PCA)
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# PCA con 2 componentes principales
-pca = PCA(n_components=2)
-pca_result = pca.fit_transform(X_scaled)
-
-# Guardar resultados en el DataFrame
-df["PC1"], df["PC2"] = pca_result[:, 0], pca_result[:, 1]
-
-# Imprimir varianza y loadings
-print("Explained variance ratio:", pca.explained_variance_ratio_)
-loadings = pd.DataFrame(pca.components_.T, index=features, columns=["PC1","PC2"])
-print(loadings)
-def run_pca_clustering(df, features, n_clusters=3, results_dir="."):
-    # Matriz de datos: rellenar NaN con la media
-    X = df[features].fillna(df[features].mean())
-
-    # Escalar datos
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-
-    # PCA con 2 componentes principales
-    pca = PCA(n_components=2)
-    pca_result = pca.fit_transform(X_scaled)
-
-    # Guardar resultados en el DataFrame
+import parallel
+
+DYNAMICS = ['RMSD_mean', 'RMSD_std', 'RMSF_mean', 'RMSF_std']
+ENERGY = ['VDWAALS_mean', 'EEL_mean', 'EGB_mean', 'ESURF_mean', 'TOTAL_mean']
+
+# Conjuntos de columnas para el PCA (también se acepta una lista separada por comas)
+FEATURE_SETS = {
+    "dynamics": DYNAMICS,
+    "energy": ENERGY,
+    "energy_std": ENERGY + [c.replace("_mean", "_std") for c in ENERGY],
+    "all": DYNAMICS + ENERGY,
+}
+
+# A partir de estas filas se usan IncrementalPCA y MiniBatchKMeans
+LARGE_ROWS = 20000
+BATCH_SIZE = 4096
+# La silueta es O(n²): con más filas se estima sobre una muestra
+SILHOUETTE_SAMPLE = 10000
+# Etiquetas de texto en la figura solo con pocos puntos
+MAX_LABELS = 200
+SEED = 42
+
+
+def resolve_features(df: pd.DataFrame, feature_set: str) -> List[str]:
+    """
+    Columnas del conjunto pedido presentes en el CSV y con algún valor.
+
+    Raises:
+        ValueError: Si el conjunto no existe o deja menos de dos columnas
+    """
+    if feature_set in FEATURE_SETS:
+        features = FEATURE_SETS[feature_set]
+    elif "," in feature_set:
+        features = [f.strip() for f in feature_set.split(",") if f.strip()]
+    else:
+        raise ValueError(f"Conjunto desconocido: {feature_set} "
+                         f"(disponibles: {', '.join(FEATURE_SETS)})")
+    features = [f for f in features if f in df.columns and df[f].notna().any()]
+    if len(features) < 2:
+        raise ValueError(f"El conjunto '{feature_set}' deja menos de dos columnas con datos")
+    return features
+
+
+def project(X: np.ndarray, large: bool) -> Tuple[np.ndarray, object]:
+    """PCA con 2 componentes; IncrementalPCA por lotes si hay muchas filas."""
+    if large:
+        pca = IncrementalPCA(n_components=2, batch_size=BATCH_SIZE)
+    else:
+        pca = PCA(n_components=2)
+    return pca.fit_transform(X), pca
+
+
+def make_kmeans(k: int, large: bool):
+    if large:
+        return MiniBatchKMeans(n_clusters=k, batch_size=BATCH_SIZE, random_state=SEED, n_init=3)
+    return KMeans(n_clusters=k, random_state=SEED)
+
+
+def score_k(points: np.ndarray, k: int, large: bool) -> Dict[str, float]:
+    """
+    Ajusta K-means con k clusters y calcula su silueta (se ejecuta en los
+    trabajadores del barrido).
+    """
+    model = make_kmeans(k, large)
+    labels = model.fit_predict(points)
+    sample = SILHOUETTE_SAMPLE if len(points) > SILHOUETTE_SAMPLE else None
+    score = silhouette_score(points, labels, sample_size=sample, random_state=SEED)
+    return {"k": k, "silhouette": float(score), "inertia": float(model.inertia_)}
+
+
+def sweep_k(points: np.ndarray, ks: Sequence[int], large: bool,
+            jobs: Optional[int] = 1, threads: bool = False) -> pd.DataFrame:
+    """
+    Silueta e inercia de cada k, evaluando los k en paralelo.
+
+    Returns:
+        DataFrame ordenado por k
+    """
+    workers = parallel.resolve_jobs(jobs, len(ks))
+    if workers == 1:
+        rows = [score_k(points, k, large) for k in ks]
+    else:
+        pool: Executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=workers)
+        with pool:
+            rows = list(pool.map(score_k, [points] * len(ks), ks, [large] * len(ks)))
+    return pd.DataFrame(rows).sort_values("k").reset_index(drop=True)
+
+
+def plot_clusters(df: pd.DataFrame, plot_file: str, title: str) -> None:
+    """Guarda la figura PC1/PC2 coloreada por cluster."""
+    fig, ax = plt.subplots(figsize=(7, 5))
+    sc = ax.scatter(df["PC1"], df["PC2"], c=df["cluster"], cmap="tab10",
+                    alpha=0.8, s=12 if len(df) > MAX_LABELS else 36)
+    fig.colorbar(sc, ax=ax, label="Cluster")
+    if "label" in df.columns and len(df) <= MAX_LABELS:
+        for x, y, name in zip(df["PC1"], df["PC2"], df["label"]):
+            ax.text(x, y, name, fontsize=7)
+    ax.set_xlabel("PC1")
+    ax.set_ylabel("PC2")
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(plot_file, dpi=300)
+    plt.close(fig)
+
+
+def run_pca_clustering(df: pd.DataFrame, features: List[str], n_clusters: Optional[int] = None,
+                       k_range: Tuple[int, int] = (2, 8), results_dir: str = ".",
+                       jobs: Optional[int] = 1, threads: bool = False) -> pd.DataFrame:
+    """
+    PCA de las columnas elegidas y K-means en el espacio PCA.
+
+    Args:
+        df: Resumen de los complejos (data_summary.csv)
+        features: Columnas para el PCA
+        n_clusters: Número de clusters; si es None se elige por silueta en k_range
+        k_range: Intervalo de k (inclusive) para el barrido
+        results_dir: Directorio de salida
+        jobs: Trabajadores para el barrido de k
+        threads: Usar hilos en lugar de procesos
+
+    Returns:
+        df con las columnas PC1, PC2 y cluster
+    """
+    df = df.copy()
+    large = len(df) > LARGE_ROWS
+
+    # Matriz de datos: rellenar NaN con la media y escalar
+    X = df[features].fillna(df[features].mean()).to_numpy(dtype=np.float64)
+    X_scaled = StandardScaler().fit_transform(X)
+
+    pca_result, pca = project(X_scaled, large)
     df["PC1"], df["PC2"] = pca_result[:, 0], pca_result[:, 1]
 
-    # Imprimir varianza y loadings
+    print(f"{len(df)} complejos, {len(features)} variables"
+          f"{' (modo por lotes)' if large else ''}")
     print("Explained variance ratio:", pca.explained_variance_ratio_)
-    loadings = pd.DataFrame(pca.components_.T, index=features, columns=["PC1","PC2"])
+    loadings = pd.DataFrame(pca.components_.T, index=features, columns=["PC1", "PC2"])
     print(loadings)
 
     # Clustering en el espacio PCA
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df["cluster"] = kmeans.fit_predict(df[["PC1","PC2"]])
+    points = df[["PC1", "PC2"]].to_numpy()
+    if n_clusters is None:
+        ks = list(range(max(2, k_range[0]), min(k_range[1], len(df) - 1) + 1))
+        if not ks:
+            raise ValueError(f"Muy pocos complejos ({len(df)}) para elegir k por silueta")
+        sweep = sweep_k(points, ks, large, jobs, threads)
+        sweep_file = os.path.join(results_dir, "pca_k_sweep.csv")
+        sweep.to_csv(sweep_file, index=False)
+        n_clusters = int(sweep.loc[sweep["silhouette"].idxmax(), "k"])
+        print("\nBarrido de k:")
+        print(sweep.to_string(index=False))
+        print(f"k elegido por silueta: {n_clusters} (barrido guardado en {sweep_file})")
+    df["cluster"] = make_kmeans(n_clusters, large).fit_predict(points)
+
+    # Etiqueta de cada punto para la figura
+    if "dynamic" in df.columns:
+        df["label"] = df["dynamic"].astype(str)
+    elif {"ligand", "protein"} <= set(df.columns):
+        df["label"] = df["ligand"].astype(str) + "-" + df["protein"].astype(str)
 
-    # Guardar resultados
     output_file = os.path.join(results_dir, "pca_results.csv")
-    df.to_csv(output_file, index=False)
-
-    # Graficar con colores por cluster
-    plt.figure(figsize=(7,5))
-    sc = plt.scatter(df["PC1"], df["PC2"], c=df["cluster"], cmap="tab10", alpha=0.8)
-    plt.colorbar(sc, label="Cluster")
-    if "dynamic" in df.columns:
-        for i, name in enumerate(df["dynamic"]):
-            plt.text(df["PC1"][i], df["PC2"][i], name, fontsize=7)
-    plt.xlabel("PC1")
-    plt.ylabel("PC2")
-    plt.title("PCA con Clustering K-means")
-    plt.tight_layout()
+    df.drop(columns=["label"], errors="ignore").to_csv(output_file, index=False)
     plot_file = os.path.join(results_dir, "pca_clusters.png")
-    plt.savefig(plot_file, dpi=300)
-    plt.show()
-
-
-def main():
+    plot_clusters(df, plot_file, f"PCA con Clustering K-means (k = {n_clusters})")
+    print(f"\nResultados guardados en {output_file} y {plot_file}")
+    return df
+
+
+def parse_k_range(text: str) -> Tuple[int, int]:
+    """'2-8' -> (2, 8)."""
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+
+def main(results_dir: Optional[str] = None, feature_set: str = "dynamics",
+         n_clusters: Optional[int] = None, k_range: Tuple[int, int] = (2, 8),
+         jobs: Optional[int] = 1, threads: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Punto de entrada principal.
+
+    Args:
+        results_dir: Directorio con data_summary.csv y de salida (por defecto, 'results')
+        feature_set: Nombre de FEATURE_SETS o lista de columnas separadas por comas
+        n_clusters: Número de clusters fijo (None = barrido por silueta)
+        k_range: Intervalo de k del barrido
+        jobs: Trabajadores para el barrido de k
+        threads: Usar hilos en lugar de procesos
+    """
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_dir, 'results', 'data_summary.csv')
-    # files = glob.glob.join(data_path, '*.csv')
+    results_dir = results_dir or os.path.join(base_dir, 'results')
+    data_path = os.path.join(results_dir, 'data_summary.csv')
     if not os.path.exists(data_path):
         print(f"El archivo {data_path} no existe.")
-        return
-    
+        return None
 
-    # Crear directorio de resultados si no existe
-    results_dir = os.path.join(base_dir, 'results')
-    os.makedirs(results_dir, exist_ok=True)
+    df = pd.read_csv(data_path)
+    try:
+        features = resolve_features(df, feature_set)
+        return run_pca_clustering(df, features, n_clusters, k_range, results_dir, jobs, threads)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
 
-    # Guardar archivo en el directorio de resultados
-    output_file = os.path.join(results_dir, 'pca_results.csv')
-    print(f"\nResumen guardado en {output_file}")
-    
-    run_pca_clustering(df, features, n_clusters=2, results_dir=results_dir)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--features", default="dynamics",
+                        help=f"Conjunto de variables ({', '.join(FEATURE_SETS)}) o lista de "
+                             "columnas separadas por comas (por defecto, dynamics)")
+    parser.add_argument("--clusters", type=int,
+                        help="Número de clusters fijo (por defecto, se elige por silueta)")
+    parser.add_argument("--k-range", type=parse_k_range, default=(2, 8),
+                        help="Intervalo de k para el barrido, p. ej. 2-8 (por defecto)")
+    parallel.add_arguments(parser)
+    args = parser.parse_args()
+    main(feature_set=args.features, n_clusters=args.clusters, k_range=args.k_range,
+         jobs=args.jobs, threads=args.threads)
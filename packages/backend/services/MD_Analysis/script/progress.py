@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Canal de eventos de progreso de los módulos de análisis.
+Los módulos publican eventos por etapa y por archivo; quien los ejecute
+(el orquestador o el backend) se suscribe para reenviarlos.
+"""
+
+import time
+from typing import Any, Callable, Dict, List
+
+Evento = Dict[str, Any]
+
+_suscriptores: List[Callable[[Evento], None]] = []
+
+
+def subscribe(callback: Callable[[Evento], None]) -> None:
+    """Registra una función que recibirá cada evento publicado."""
+    _suscriptores.append(callback)
+
+
+def unsubscribe(callback: Callable[[Evento], None]) -> None:
+    """Elimina una suscripción previa, si existe."""
+    if callback in _suscriptores:
+        _suscriptores.remove(callback)
+
+
+def emit(stage: str, event: str, **data: Any) -> None:
+    """
+    Publica un evento de progreso.
+
+    Args:
+        stage: Etapa que lo emite ('rmsd', 'rmsf', 'mmpbsa', 'merge')
+        event: Tipo de evento ('start', 'file', 'end')
+        **data: Campos adicionales (archivo, contadores, tiempos...)
+    """
+    evento = {"stage": stage, "event": event, "time": time.time(), **data}
+    for callback in list(_suscriptores):
+        try:
+            callback(evento)
+        except Exception as e:
+            # Un suscriptor defectuoso no debe interrumpir el análisis
+            print(f"Error enviando evento de progreso: {e}")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Escritura de resultados en segundo plano.
+Los módulos entregan sus DataFrames en memoria; un hilo los escribe en
+disco (CSV y, si se pide, Parquet) mientras el análisis continúa. Cada
+archivo se escribe una sola vez y de forma atómica.
+"""
+
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Self, Sequence, Tuple
+
+import pandas as pd
+
+FORMATS = ("csv", "parquet")
+
+
+def write_frame(df: pd.DataFrame, path: str, fmt: str = "csv", **options: Any) -> str:
+    """
+    Escribe un DataFrame de forma atómica (archivo temporal y reemplazo).
+
+    Args:
+        df: Datos a escribir
+        path: Ruta del archivo .csv; con fmt='parquet' se cambia la extensión
+        fmt: 'csv' o 'parquet'
+        **options: Opciones de to_csv (p. ej. float_format)
+
+    Returns:
+        Ruta escrita
+    """
+    if fmt == "parquet":
+        path = os.path.splitext(path)[0] + ".parquet"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False, **options)
+    os.replace(tmp, path)
+    return path
+
+
+class BackgroundWriter:
+    """
+    Hilo que escribe los DataFrames encolados con submit().
+
+    close() espera a que termine la cola y devuelve los archivos escritos y
+    los errores, para que el llamador decida cómo informarlos.
+
+    Args:
+        formats: Formatos a escribir por cada resultado ('csv', 'parquet')
+    """
+
+    def __init__(self, formats: Sequence[str] = ("csv",)):
+        unknown = [fmt for fmt in formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f"Formatos desconocidos: {', '.join(unknown)}")
+        self.formats = tuple(formats)
+        self.written: List[str] = []
+        self.errors: List[Tuple[str, str]] = []
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, df: pd.DataFrame, path: str, **options: Any) -> None:
+        """Encola un DataFrame para escribirlo en `path` en cada formato."""
+        self._queue.put((df, path, options))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            df, path, options = item
+            for fmt in self.formats:
+                try:
+                    self.written.append(write_frame(df, path, fmt, **options))
+                except Exception as e:
+                    self.errors.append((path, f"{fmt}: {type(e).__name__}: {e}"))
+
+    def close(self) -> Dict[str, Any]:
+        """Termina la cola pendiente y detiene el hilo."""
+        self._queue.put(None)
+        self._thread.join()
+        return {"written": self.written, "errors": self.errors}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Análisis de convergencia de trayectorias RMSD.
+Calcula medias y desviaciones móviles, la pendiente de deriva de la segunda
+mitad y el tiempo de convergencia de cada serie a partir de los bloques
+(n, media, M2) que streaming_stats acumula al leer el archivo, de modo que
+no hace falta volver a leer la trayectoria ni guardarla en memoria. Las
+ventanas móviles avanzan de bloque en bloque (a lo sumo unos cientos por
+serie).
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from streaming_stats import BlockStats
+
+# Ventana móvil como fracción de la longitud de la trayectoria
+WINDOW_FRACTION = 0.1
+# Diferencia máxima (nm) entre la media móvil y la media de la última
+# ventana para considerar la serie convergida
+TOLERANCE = 0.02
+# La convergencia debe alcanzarse antes de esta fracción de la trayectoria
+MAX_CONVERGENCE_FRACTION = 0.5
+# Bloques mínimos para analizar una serie
+MIN_BLOCKS = 4
+
+# Factor para expresar la deriva por ns según la unidad del eje x
+_PER_NS = {"fs": 1e6, "ps": 1e3, "ns": 1.0, "us": 1e-3, "µs": 1e-3}
+
+
+def per_ns(unit: str) -> float:
+    """Factor de conversión de 'por unidad del eje x' a 'por ns' (ps si no se conoce)."""
+    return _PER_NS.get(unit, 1e3)
+
+
+def _cumsum0(x: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(x)])
+
+
+def rolling_mean_std(n: np.ndarray, mean: np.ndarray, m2: np.ndarray,
+                     window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media y desviación estándar (ddof=0) de cada ventana de `window` bloques
+    consecutivos, exactas respecto a los valores que contienen.
+
+    Args:
+        n, mean, m2: Acumuladores de cada bloque
+        window: Bloques por ventana
+
+    Returns:
+        (medias, desviaciones), una por ventana
+    """
+    # Centrar en la media global reduce la cancelación en la varianza por sumas
+    offset = (n * mean).sum() / n.sum()
+    centered = mean - offset
+    c0 = _cumsum0(n)
+    c1 = _cumsum0(n * centered)
+    c2 = _cumsum0(m2 + n * centered * centered)
+    s0 = c0[window:] - c0[:-window]
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    mu = s1 / s0
+    var = np.maximum(s2 / s0 - mu * mu, 0.0)
+    return mu + offset, np.sqrt(var)
+
+
+def drift_slope(times: np.ndarray, values: np.ndarray, weights: np.ndarray) -> float:
+    """Pendiente por mínimos cuadrados ponderados (unidades de valor por
+    unidad de tiempo)."""
+    w = weights / weights.sum()
+    dt = times - (w * times).sum()
+    dv = values - (w * values).sum()
+    denominator = (w * dt * dt).sum()
+    return float((w * dt * dv).sum() / denominator) if denominator > 0 else np.nan
+
+
+def convergence_index(rolling_mean: np.ndarray, tolerance: float) -> int:
+    """
+    Primera ventana a partir de la cual la media móvil queda siempre a menos
+    de `tolerance` de la media de la última ventana.
+    """
+    outside = np.flatnonzero(np.abs(rolling_mean - rolling_mean[-1]) > tolerance)
+    return int(outside[-1]) + 1 if len(outside) else 0
+
+
+def analyze(
+    stats: BlockStats,
+    unit_per_ns: float = 1e3,
+    window_fraction: float = WINDOW_FRACTION,
+    tolerance: float = TOLERANCE,
+    max_fraction: float = MAX_CONVERGENCE_FRACTION,
+) -> Dict[str, float]:
+    """
+    Convergencia de una serie a partir de sus bloques.
+
+    Args:
+        stats: Acumulador de la serie completa (sin corte de equilibrado)
+        unit_per_ns: Factor de per_ns() para la unidad del eje x
+        window_fraction: Tamaño de la ventana móvil
+        tolerance: Tolerancia de la media móvil (nm)
+        max_fraction: Fracción de la trayectoria en que debe converger
+
+    Returns:
+        Columnas RMSD_* de convergencia: media y desviación de la última
+        ventana, desviación móvil máxima, deriva por ns, tiempo de
+        convergencia y si la trayectoria se considera convergida
+    """
+    n, mean, m2, start = stats.blocks()
+    blocks = len(n)
+    if blocks < MIN_BLOCKS:
+        return empty_columns()
+
+    window = max(2, min(blocks, int(round(blocks * window_fraction))))
+    rolling_mean, rolling_std = rolling_mean_std(n, mean, m2, window)
+    index = convergence_index(rolling_mean, tolerance)
+
+    # Fotogramas antes de cada bloque y paso de tiempo entre fotogramas
+    before = _cumsum0(n)
+    total = before[-1]
+    dt = (start[-1] - start[0]) / before[-2]
+    # Tiempo medio de cada bloque
+    times = start + (n - 1) * dt / 2
+
+    # Deriva de la segunda mitad, sobre las medias de bloque
+    half = int(np.searchsorted(before, total // 2))
+    slope = drift_slope(times[half:], mean[half:], n[half:])
+    end = start[-1] + (n[-1] - 1) * dt
+    # Cambio total que la deriva produce en la segunda mitad
+    drift_change = abs(slope * (end - start[min(half, blocks - 1)]))
+
+    return {
+        "RMSD_final_mean": float(rolling_mean[-1]),
+        "RMSD_final_std": float(rolling_std[-1]),
+        "RMSD_max_rolling_std": float(rolling_std.max()),
+        "RMSD_drift_per_ns": slope * unit_per_ns,
+        "RMSD_conv_time": float(start[index]),
+        "RMSD_converged": bool(before[index] <= max_fraction * total and drift_change <= tolerance),
+    }
+
+
+def empty_columns(converged: Optional[bool] = None) -> Dict[str, float]:
+    """Columnas de convergencia para una trayectoria que no se pudo analizar."""
+    return {
+        "RMSD_final_mean": np.nan,
+        "RMSD_final_std": np.nan,
+        "RMSD_max_rolling_std": np.nan,
+        "RMSD_drift_per_ns": np.nan,
+        "RMSD_conv_time": np.nan,
+        "RMSD_converged": converged,
+    }
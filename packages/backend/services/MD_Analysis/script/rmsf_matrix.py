@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Matriz de RMSF por residuo (ligando x residuo) para cada proteína.
+Alinea los perfiles RMSF de todos los ligandos de una proteína por número de
+residuo en una matriz float32 y la guarda en formato .npy (mapeable en
+memoria) junto con los arreglos de índices de ligandos y residuos. Permite
+consultas vectorizadas sobre toda la campaña, como los residuos cuyo RMSF
+cambia más de un umbral respecto a la proteína sin ligando (apo).
+En sistemas con varias cadenas (p. ej. el dímero de DPP4), `gmx rmsf -res`
+reinicia la numeración en cada una: un número de residuo repetido en un
+perfil ocupa una columna propia por cadena, en orden de aparición.
+"""
+
+import argparse
+import glob
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from mean_std_rmsf import parse_filename
+import xvg_io
+
+MATRIX_DIR = "rmsf_matrix"
+
+
+@dataclass
+class RmsfMatrix:
+    """
+    Perfiles RMSF de una proteína: `values[i, j]` es el RMSF (nm) del
+    residuo `residues[j]` de la cadena `chains[j]` con el ligando
+    `ligands[i]`; NaN si ese perfil no incluye el residuo. Las cadenas se
+    numeran desde 0 por orden de aparición en el perfil.
+    """
+
+    protein: str
+    ligands: np.ndarray
+    residues: np.ndarray
+    values: np.ndarray
+    chains: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        # Matrices guardadas antes de separar cadenas: una sola cadena
+        if self.chains is None:
+            self.chains = np.zeros(len(self.residues), dtype=np.int16)
+
+    def row(self, ligand: str) -> np.ndarray:
+        """Perfil RMSF de un ligando."""
+        match = np.flatnonzero(self.ligands == ligand)
+        if not len(match):
+            raise KeyError(f"{ligand} no está en la matriz de {self.protein}")
+        return self.values[match[0]]
+
+    def delta(self, reference: str) -> np.ndarray:
+        """Diferencia de RMSF de cada ligando respecto a `reference`."""
+        return self.values - self.row(reference)[None, :]
+
+    def changes(self, reference: str, threshold: float) -> pd.DataFrame:
+        """
+        Residuos cuyo RMSF difiere más de `threshold` (en valor absoluto)
+        respecto al perfil de `reference`, para todos los ligandos a la vez.
+
+        Returns:
+            DataFrame con proteína, ligando, cadena, residuo, RMSF, RMSF de
+            referencia y diferencia
+        """
+        delta = self.delta(reference)
+        with np.errstate(invalid="ignore"):
+            rows, cols = np.nonzero(np.abs(delta) > threshold)
+        return pd.DataFrame({
+            "protein": self.protein,
+            "ligand": self.ligands[rows],
+            "chain": self.chains[cols],
+            "residue": self.residues[cols],
+            "rmsf": self.values[rows, cols],
+            "reference_rmsf": self.row(reference)[cols],
+            "delta": delta[rows, cols],
+        })
+
+
+def _paths(matrix_dir: str, protein: str) -> Dict[str, str]:
+    base = os.path.join(matrix_dir, protein)
+    return {name: f"{base}.{name}.npy" for name in ("values", "ligands", "residues", "chains")}
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    # Escritura atómica: un lector nunca ve un archivo a medias
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def chain_index(residues: np.ndarray) -> np.ndarray:
+    """
+    Cadena de cada fila de un perfil: cuántas veces apareció antes su número
+    de residuo (0 la primera vez, 1 la segunda...).
+    """
+    order = np.argsort(residues, kind="stable")
+    ordered = residues[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ordered)) + 1])
+    first = np.repeat(starts, np.diff(np.append(starts, len(ordered))))
+    chains = np.empty(len(residues), dtype=np.int16)
+    chains[order] = np.arange(len(residues)) - first
+    return chains
+
+
+def _column_key(chains: np.ndarray, residues: np.ndarray) -> np.ndarray:
+    # Clave entera ordenada por (cadena, residuo)
+    return (chains.astype(np.int64) << 32) + residues.astype(np.int64) + 2 ** 31
+
+
+def build_matrix(protein: str, files: Dict[str, str]) -> RmsfMatrix:
+    """
+    Construye la matriz de una proteína.
+
+    Args:
+        protein: Nombre de la proteína
+        files: Archivo RMSF (.xvg) de cada ligando
+
+    Returns:
+        RmsfMatrix con ligandos ordenados y la unión de (cadena, residuo)
+    """
+    profiles = {}
+    for ligand, path in sorted(files.items()):
+        try:
+            data = xvg_io.read_xvg(path).data
+            if data.size == 0:
+                raise ValueError("sin datos")
+            res = data[:, 0].astype(np.int32)
+            chains = chain_index(res)
+            if chains.any():
+                print(f"Advertencia: {path} repite números de residuo; "
+                      f"se separan en {chains.max() + 1} cadenas")
+            profiles[ligand] = (chains, res, data[:, 1])
+        except Exception as e:
+            print(f"Error procesando {path}: {e}")
+
+    ligands = np.array(list(profiles), dtype=str)
+    if profiles:
+        all_chains = np.concatenate([c for c, _, _ in profiles.values()])
+        all_residues = np.concatenate([r for _, r, _ in profiles.values()])
+        keys, first = np.unique(_column_key(all_chains, all_residues), return_index=True)
+        chains, residues = all_chains[first], all_residues[first]
+    else:
+        keys = np.empty(0, dtype=np.int64)
+        chains, residues = np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int32)
+    values = np.full((len(ligands), len(residues)), np.nan, dtype=np.float32)
+    for i, (ch, res, rmsf) in enumerate(profiles.values()):
+        values[i, np.searchsorted(keys, _column_key(ch, res))] = rmsf
+    return RmsfMatrix(protein, ligands, residues, values, chains)
+
+
+def save(matrix: RmsfMatrix, matrix_dir: str) -> None:
+    """Guarda la matriz y sus índices como archivos .npy."""
+    os.makedirs(matrix_dir, exist_ok=True)
+    paths = _paths(matrix_dir, matrix.protein)
+    _save_array(paths["ligands"], matrix.ligands)
+    _save_array(paths["residues"], matrix.residues)
+    _save_array(paths["chains"], matrix.chains)
+    _save_array(paths["values"], matrix.values)
+
+
+def load(matrix_dir: str, protein: str, mmap: bool = True) -> RmsfMatrix:
+    """
+    Carga la matriz de una proteína; con `mmap` los valores se leen del
+    disco bajo demanda en lugar de cargarse en memoria.
+    """
+    paths = _paths(matrix_dir, protein)
+    return RmsfMatrix(
+        protein,
+        np.load(paths["ligands"]),
+        np.load(paths["residues"]),
+        np.load(paths["values"], mmap_mode="r" if mmap else None),
+        np.load(paths["chains"]) if os.path.exists(paths["chains"]) else None,
+    )
+
+
+def proteins(matrix_dir: str) -> List[str]:
+    """Proteínas con matriz guardada."""
+    suffix = ".values.npy"
+    return sorted(
+        os.path.basename(p)[: -len(suffix)]
+        for p in glob.glob(os.path.join(matrix_dir, f"*{suffix}"))
+    )
+
+
+def campaign_changes(matrix_dir: str, reference: str, threshold: float) -> pd.DataFrame:
+    """
+    Residuos con cambio de RMSF mayor que `threshold` respecto a
+    `reference` en todas las proteínas que tienen ese perfil.
+    """
+    frames = []
+    for protein in proteins(matrix_dir):
+        matrix = load(matrix_dir, protein)
+        if reference not in matrix.ligands:
+            print(f"Advertencia: {protein} no tiene perfil '{reference}'; se omite")
+            continue
+        frames.append(matrix.changes(reference, threshold))
+    if not frames:
+        return pd.DataFrame(columns=["protein", "ligand", "chain", "residue", "rmsf",
+                                     "reference_rmsf", "delta"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(data_dir: Optional[str] = None, results_dir: Optional[str] = None):
+    """
+    Construye y guarda la matriz de cada proteína.
+
+    Args:
+        data_dir: Directorio con la subcarpeta 'rmsf_data' (por defecto, 'data')
+        results_dir: Directorio de salida (por defecto, 'results')
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_dir = data_dir or os.path.join(base_dir, "data")
+    results_dir = results_dir or os.path.join(base_dir, "results")
+    folder_path = os.path.join(data_dir, "rmsf_data")
+    files = sorted(glob.glob(os.path.join(folder_path, "*.xvg")))
+
+    if not files:
+        print(f"No se encontraron archivos .xvg en {folder_path}")
+        return
+
+    by_protein: Dict[str, Dict[str, str]] = defaultdict(dict)
+    for file in files:
+        ligand, protein = parse_filename(file)
+        by_protein[protein][ligand] = file
+
+    matrix_dir = os.path.join(results_dir, MATRIX_DIR)
+    for protein, ligand_files in sorted(by_protein.items()):
+        matrix = build_matrix(protein, ligand_files)
+        save(matrix, matrix_dir)
+        chains = int(matrix.chains.max()) + 1 if len(matrix.chains) else 0
+        print(f"Proteína: {protein}, {len(matrix.ligands)} ligandos x "
+              f"{len(matrix.residues)} residuos"
+              f"{f' ({chains} cadenas)' if chains > 1 else ''}")
+    print(f"\nMatrices guardadas en {matrix_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reference", help="Ligando de referencia (p. ej. la forma apo) "
+                                            "para listar los residuos que cambian")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="Cambio mínimo de RMSF en nm (por defecto, 0.05)")
+    parser.add_argument("--no-build", action="store_true",
+                        help="Consultar las matrices ya guardadas sin reconstruirlas")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results_dir = os.path.join(base_dir, "results")
+    if not args.no_build:
+        main(results_dir=results_dir)
+    if args.reference:
+        changes = campaign_changes(os.path.join(results_dir, MATRIX_DIR),
+                                   args.reference, args.threshold)
+        output_file = os.path.join(results_dir, "rmsf_changes.csv")
+        changes.to_csv(output_file, index=False)
+        print(f"\n{len(changes)} residuos con |ΔRMSF| > {args.threshold} nm "
+              f"respecto a '{args.reference}'; guardados en {output_file}")
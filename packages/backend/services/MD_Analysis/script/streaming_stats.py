@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Estadísticas de una serie temporal en una sola pasada y memoria acotada.
+Los valores se acumulan por bloques (número de valores, media y M2 según
+Welford/Chan); al superar el máximo de bloques, se fusionan por pares y el
+tamaño de bloque se duplica. Con esos bloques se obtienen la media y la
+desviación estándar exactas, el error estándar por promedio de bloques y
+el corte de equilibrado automático (MSER) sin guardar la trayectoria.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+# Corte de equilibrado: None (sin corte), un tiempo o 'auto' (MSER)
+Equilibrado = Optional[Union[float, str]]
+
+
+@dataclass
+class Summary:
+    """Resultado de la serie a partir del corte de equilibrado."""
+
+    n: int
+    mean: float
+    std: float
+    sem: float
+    eq_time: float
+    blocks: int
+
+
+def merge(
+    n_a: np.ndarray, mean_a: np.ndarray, m2_a: np.ndarray,
+    n_b: np.ndarray, mean_b: np.ndarray, m2_b: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Combina acumuladores (n, media, M2) de dos tramos (Chan et al.)."""
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, mean_a + delta * n_b / n, 0.0)
+        m2 = m2_a + m2_b + np.where(n > 0, delta * delta * n_a * n_b / n, 0.0)
+    return n, mean, m2
+
+
+class BlockStats:
+    """
+    Acumulador por bloques de tamaño uniforme con memoria constante.
+
+    Args:
+        max_blocks: Número máximo de bloques completos que se conservan
+    """
+
+    def __init__(self, max_blocks: int = 256):
+        self.max_blocks = max_blocks
+        self.block_size = 1
+        self.n = np.empty(0)
+        self.mean = np.empty(0)
+        self.m2 = np.empty(0)
+        self.start = np.empty(0)
+        # Bloque en curso: (n, media, M2, tiempo inicial)
+        self._partial = (0, 0.0, 0.0, np.nan)
+
+    def update(self, values: np.ndarray, times: Optional[np.ndarray] = None) -> None:
+        """Añade un tramo de la serie (y sus tiempos) en orden."""
+        values = np.asarray(values, dtype=np.float64)
+        times = np.full(len(values), np.nan) if times is None else np.asarray(times, dtype=np.float64)
+        while len(values):
+            n_p, mean_p, m2_p, t_p = self._partial
+            if n_p:
+                # Completar el bloque en curso
+                take = min(self.block_size - n_p, len(values))
+                head = values[:take]
+                head_mean = head.mean()
+                n, mean, m2 = merge(n_p, mean_p, m2_p, take, head_mean, ((head - head_mean) ** 2).sum())
+                values, times = values[take:], times[take:]
+                self._partial = (int(n), float(mean), float(m2), t_p)
+                if int(n) == self.block_size:
+                    self._partial = (0, 0.0, 0.0, np.nan)
+                    self._append(np.array([n]), np.array([mean]), np.array([m2]), np.array([t_p]))
+                continue
+
+            full = len(values) // self.block_size * self.block_size
+            if full:
+                # Bloques completos del tramo, vectorizados
+                blocks = values[:full].reshape(-1, self.block_size)
+                means = blocks.mean(axis=1)
+                m2s = ((blocks - means[:, None]) ** 2).sum(axis=1)
+                starts = times[:full:self.block_size]
+                values, times = values[full:], times[full:]
+                self._append(np.full(len(means), float(self.block_size)), means, m2s, starts)
+                continue
+
+            mean = values.mean()
+            self._partial = (len(values), float(mean), float(((values - mean) ** 2).sum()), float(times[0]))
+            break
+
+    def _append(self, n, mean, m2, start) -> None:
+        self.n = np.concatenate([self.n, n])
+        self.mean = np.concatenate([self.mean, mean])
+        self.m2 = np.concatenate([self.m2, m2])
+        self.start = np.concatenate([self.start, start])
+        while len(self.n) > self.max_blocks:
+            self._coarsen()
+
+    def _coarsen(self) -> None:
+        """Fusiona los bloques por pares y duplica el tamaño de bloque; un
+        bloque impar sobrante pasa a ser el inicio del bloque en curso."""
+        pairs = len(self.n) // 2 * 2
+        leftover = None
+        if pairs < len(self.n):
+            leftover = (self.n[-1], self.mean[-1], self.m2[-1], self.start[-1])
+        n, mean, m2 = merge(self.n[0:pairs:2], self.mean[0:pairs:2], self.m2[0:pairs:2],
+                            self.n[1:pairs:2], self.mean[1:pairs:2], self.m2[1:pairs:2])
+        self.n, self.mean, self.m2 = n, mean, m2
+        self.start = self.start[0:pairs:2]
+        self.block_size *= 2
+
+        if leftover is not None:
+            n_l, mean_l, m2_l, t_l = leftover
+            n_p, mean_p, m2_p, _ = self._partial
+            n, mean, m2 = merge(n_l, mean_l, m2_l, n_p, mean_p, m2_p)
+            self._partial = (int(n), float(mean), float(m2), float(t_l))
+
+    def blocks(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (n, media, M2, tiempo inicial) de cada bloque, incluido el bloque en
+        curso si tiene valores (puede ser más corto que los demás).
+        """
+        n_p, mean_p, m2_p, t_p = self._partial
+        if not n_p:
+            return self.n, self.mean, self.m2, self.start
+        return (np.append(self.n, n_p), np.append(self.mean, mean_p),
+                np.append(self.m2, m2_p), np.append(self.start, t_p))
+
+    def mser_cutoff(self) -> int:
+        """
+        Primer bloque tras el equilibrado según MSER: el corte d que minimiza
+        sum((x_i - media_d)^2) / (k - d)^2 sobre las medias de bloque,
+        buscado en la primera mitad de la serie.
+        """
+        k = len(self.mean)
+        if k < 4:
+            return 0
+        x = self.mean
+        # Sumas desde cada d hasta el final
+        s1 = np.cumsum(x[::-1])[::-1]
+        s2 = np.cumsum((x * x)[::-1])[::-1]
+        remaining = k - np.arange(k)
+        sse = s2 - s1 * s1 / remaining
+        mser = sse / remaining ** 2
+        return int(np.argmin(mser[: k // 2]))
+
+    def summary(self, auto_equilibration: bool = False) -> Summary:
+        """
+        Media, desviación estándar (ddof=0) y error estándar por bloques,
+        desde el corte MSER si `auto_equilibration` o desde el inicio.
+        """
+        first = self.mser_cutoff() if auto_equilibration else 0
+        n_p, mean_p, m2_p, t_p = self._partial
+        n = np.append(self.n[first:], n_p)
+        mean = np.append(self.mean[first:], mean_p)
+        m2 = np.append(self.m2[first:], m2_p)
+        starts = np.append(self.start[first:], t_p)
+
+        total = n.sum()
+        if not total:
+            return Summary(0, np.nan, np.nan, np.nan, np.nan, 0)
+        mu = (n * mean).sum() / total
+        sq = m2.sum() + (n * (mean - mu) ** 2).sum()
+
+        # Error estándar de la media a partir de las medias de bloques completos
+        block_means = self.mean[first:]
+        sem = np.nan
+        if len(block_means) >= 2:
+            sem = float(np.std(block_means, ddof=1) / np.sqrt(len(block_means)))
+        return Summary(int(total), float(mu), float(np.sqrt(sq / total)), sem,
+                       float(starts[n > 0][0]), len(block_means))
+
+
+def summarize(
+    chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+    equilibration: Equilibrado = None,
+    max_blocks: int = 256,
+) -> Summary:
+    """
+    Estadísticas de una serie leída por tramos (tiempos, valores).
+
+    Args:
+        chunks: Tramos consecutivos de la serie
+        equilibration: None (sin corte), tiempo desde el que se cuentan los
+            valores (mismas unidades que la serie) o 'auto' (MSER)
+        max_blocks: Bloques conservados en memoria
+    """
+    stats = BlockStats(max_blocks)
+    cutoff = None if equilibration in (None, "auto") else float(equilibration)
+    for times, values in chunks:
+        if cutoff is not None:
+            keep = times >= cutoff
+            times, values = times[keep], values[keep]
+        stats.update(values, times)
+    return stats.summary(auto_equilibration=equilibration == "auto")
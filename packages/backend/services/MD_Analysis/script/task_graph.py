@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Grafo de tareas para el orquestador de MD_Analysis.
+Cada tarea declara de qué tareas depende; las que no dependen entre sí se
+ejecutan a la vez y cada una empieza en cuanto terminan sus dependencias.
+Si una tarea falla, las que dependen de ella se omiten.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class Task:
+    """
+    Una tarea: función a ejecutar y nombres de sus dependencias. Con
+    `pass_inputs`, la función recibe además `inputs`: el valor devuelto por
+    cada dependencia que se ejecutó.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    pass_inputs: bool = False
+
+
+@dataclass
+class TaskResult:
+    """Resultado de una tarea: 'done', 'failed' o 'skipped'."""
+
+    name: str
+    status: str
+    elapsed: float = 0.0
+    value: Any = None
+    error: Optional[str] = None
+
+
+def select(tasks: Sequence[Task], only: Optional[Sequence[str]]) -> List[Task]:
+    """
+    Tareas elegidas, en el orden del grafo. Las dependencias de una tarea
+    que no se eligió se dan por satisfechas (sus resultados ya existen).
+
+    Raises:
+        ValueError: Si se pide una tarea que no existe
+    """
+    names = [task.name for task in tasks]
+    if not only:
+        return list(tasks)
+    unknown = [name for name in only if name not in names]
+    if unknown:
+        raise ValueError(f"Módulos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(names)})")
+    return [task for task in tasks if task.name in only]
+
+
+def run(
+    tasks: Sequence[Task],
+    workers: Optional[int] = None,
+    on_done: Optional[Callable[[TaskResult], None]] = None,
+) -> Dict[str, TaskResult]:
+    """
+    Ejecuta las tareas respetando sus dependencias.
+
+    Las tareas se ejecutan en hilos de este proceso, de modo que los eventos
+    de progreso llegan a sus suscriptores; el trabajo pesado de cada módulo
+    ya se reparte en procesos con su opción --jobs.
+
+    Args:
+        tasks: Tareas a ejecutar (solo cuentan las dependencias entre ellas)
+        workers: Tareas simultáneas como máximo (por defecto, todas)
+        on_done: Función llamada al terminar (u omitirse) cada tarea
+
+    Returns:
+        Resultado de cada tarea, por nombre
+    """
+    selected = {task.name: task for task in tasks}
+    deps = {task.name: [d for d in task.deps if d in selected] for task in tasks}
+    results: Dict[str, TaskResult] = {}
+    running: Dict[Future, Tuple[str, float]] = {}
+
+    def finish(result: TaskResult) -> None:
+        results[result.name] = result
+        if on_done is not None:
+            on_done(result)
+
+    workers = workers or max(1, len(selected))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(results) < len(selected):
+            launched = {name for name, _ in running.values()}
+            for name, task in selected.items():
+                if name in results or name in launched:
+                    continue
+                if len(running) >= workers:
+                    break
+                failed = [d for d in deps[name] if d in results and results[d].status != "done"]
+                if failed:
+                    finish(TaskResult(name, "skipped", error=f"falló {', '.join(failed)}"))
+                elif all(d in results for d in deps[name]):
+                    kwargs = dict(task.kwargs)
+                    if task.pass_inputs:
+                        kwargs["inputs"] = {d: results[d].value for d in deps[name]}
+                    future = pool.submit(task.func, **kwargs)
+                    running[future] = (name, time.perf_counter())
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, start = running.pop(future)
+                elapsed = time.perf_counter() - start
+                try:
+                    finish(TaskResult(name, "done", elapsed, value=future.result()))
+                except Exception as e:
+                    finish(TaskResult(name, "failed", elapsed, error=f"{type(e).__name__}: {e}"))
+    return {name: results[name] for name in selected}
+
+
+def report(results: Dict[str, TaskResult], total: float) -> str:
+    """Tabla con el estado y el tiempo de cada tarea."""
+    lines = [f"{'Módulo':<10} {'Estado':<8} {'Tiempo':>9}"]
+    for result in results.values():
+        line = f"{result.name:<10} {result.status:<8} {result.elapsed:>8.1f}s"
+        if result.error:
+            line += f"  {result.error}"
+        lines.append(line)
+    lines.append(f"{'Total':<10} {'':<8} {total:>8.1f}s")
+    return "\n".join(lines)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Archivo columnar con todas las series temporales de la campaña.
+Empaqueta las series de los .xvg (RMSD, RMSF y, si existen, SASA y puentes
+de hidrógeno) en un solo Parquet comprimido, en bloques de filas por serie,
+con un índice JSON al lado que indica qué bloques ocupa cada serie
+(proteína, ligando, réplica, observable) y qué intervalo del eje x cubren.
+Leer una serie o una ventana de tiempo solo lee esos bloques, en lugar de
+abrir y convertir cientos de archivos .xvg.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Self, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import parallel
+import progress
+from manifest import Manifest
+import xvg_io
+
+ARCHIVE_FILE = "trajectories.parquet"
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+# Filas por bloque: un bloque es la unidad mínima de lectura
+CHUNK_ROWS = 65536
+
+# Observable -> subcarpeta de data/ con sus archivos '<ligando>-<proteína>-<observable>.xvg'
+OBSERVABLES = {
+    "rmsd": "rmsd_data",
+    "rmsf": "rmsf_data",
+    "sasa": "sasa_data",
+    "hbond": "hbond_data",
+}
+
+# Sufijo de réplica al final de la proteína ('-r1', '_r2', '-rep3')
+_REPLICA = re.compile(r"^(.*?)[-_]r(?:ep)?(\d+)$")
+
+SCHEMA = pa.schema([
+    ("protein", pa.dictionary(pa.int32(), pa.string())),
+    ("ligand", pa.dictionary(pa.int32(), pa.string())),
+    ("replica", pa.int16()),
+    ("observable", pa.dictionary(pa.int32(), pa.string())),
+    ("x", pa.float64()),
+    ("y", pa.float64()),
+])
+
+
+@dataclass
+class Series:
+    """Entrada del índice: una serie y los bloques del archivo que ocupa."""
+
+    protein: str
+    ligand: str
+    replica: int
+    observable: str
+    source: str = ""
+    xlabel: str = ""
+    ylabel: str = ""
+    rows: int = 0
+    # [bloque, primer x, último x, filas] de cada bloque de la serie
+    row_groups: List[List[Any]] = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple:
+        return (self.protein, self.ligand, self.replica, self.observable)
+
+
+def index_path(archive_path: str) -> str:
+    """Ruta del índice de un archivo."""
+    return archive_path + INDEX_SUFFIX
+
+
+def parse_filename(file_path: str, observable: str) -> tuple:
+    """
+    Obtiene (ligando, proteína, réplica) del nombre
+    'ligando-proteína[-rN]-<observable>.xvg'. Sin sufijo, la réplica es 1.
+    """
+    filename = os.path.basename(file_path)
+    if filename.endswith(".xvg"):
+        filename = filename[:-4]
+    if filename.endswith(f"-{observable}"):
+        filename = filename[:-len(observable) - 1]
+    try:
+        ligand, protein = filename.split("-", 1)
+    except ValueError:
+        ligand, protein = filename, "unknown"
+    match = _REPLICA.match(protein)
+    if match:
+        return ligand, match.group(1), int(match.group(2))
+    return ligand, protein, 1
+
+
+def read_file(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Lee un .xvg para el archivo (se ejecuta en los procesos trabajadores).
+
+    Returns:
+        Diccionario con los metadatos y las columnas del primer conjunto, o
+        None si el archivo no tiene datos
+    """
+    xvg = xvg_io.read_xvg(file_path)
+    data = xvg.data
+    if data.size == 0 or data.shape[1] < 2:
+        return None
+    return {
+        "xlabel": xvg.meta.xlabel,
+        "ylabel": xvg.meta.ylabel,
+        "columns": xvg.meta.columns(data.shape[1]),
+        "data": data,
+    }
+
+
+def indexed_sources(archive_path: str) -> Optional[set]:
+    """Nombres de los .xvg que recoge el índice de un archivo, o None si no
+    existe o no se puede leer."""
+    try:
+        with open(index_path(archive_path)) as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return {entry["source"] for entry in data["series"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def discover(data_dir: str) -> Dict[str, str]:
+    """Archivo .xvg -> observable, para cada subcarpeta de OBSERVABLES que exista."""
+    files = {}
+    for observable, folder in OBSERVABLES.items():
+        for path in sorted(glob.glob(os.path.join(data_dir, folder, "*.xvg"))):
+            files[path] = observable
+    return files
+
+
+def _series_from_file(path: str, observable: str, parsed: Dict[str, Any]) -> List[tuple]:
+    """
+    Series de un archivo: una por columna y. Con varias columnas, el
+    observable lleva la leyenda de la columna ('sasa:Hydrophobic').
+    """
+    ligand, protein, replica = parse_filename(path, observable)
+    data = parsed["data"]
+    series = []
+    for j in range(1, data.shape[1]):
+        name = observable if data.shape[1] == 2 else f"{observable}:{parsed['columns'][j]}"
+        entry = Series(protein, ligand, replica, name, os.path.basename(path),
+                       parsed["xlabel"], parsed["ylabel"])
+        series.append((entry, data[:, 0], data[:, j]))
+    return series
+
+
+def _write_series(writer: pq.ParquetWriter, entry: Series, x: np.ndarray, y: np.ndarray,
+                  first_group: int, chunk_rows: int) -> int:
+    """Escribe una serie en bloques propios y devuelve cuántos bloques ocupó."""
+    n = len(x)
+    table = pa.table({
+        "protein": pa.DictionaryArray.from_arrays(np.zeros(n, dtype=np.int32), [entry.protein]),
+        "ligand": pa.DictionaryArray.from_arrays(np.zeros(n, dtype=np.int32), [entry.ligand]),
+        "replica": pa.array(np.full(n, entry.replica, dtype=np.int16)),
+        "observable": pa.DictionaryArray.from_arrays(np.zeros(n, dtype=np.int32), [entry.observable]),
+        "x": pa.array(x, type=pa.float64()),
+        "y": pa.array(y, type=pa.float64()),
+    }, schema=SCHEMA)
+    writer.write_table(table, row_group_size=chunk_rows)
+    groups = 0
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        entry.row_groups.append([first_group + groups, float(x[start]), float(x[stop - 1]),
+                                 stop - start])
+        groups += 1
+    entry.rows = n
+    return groups
+
+
+def build(files: Dict[str, str], archive_path: str, jobs: Optional[int] = 1,
+          threads: bool = False, chunk_rows: int = CHUNK_ROWS) -> Tuple[List[Series], List[str]]:
+    """
+    Escribe el archivo y su índice. Los .xvg se leen en paralelo, pero se
+    escriben en el orden de `files`, así que el resultado no depende del
+    número de trabajadores. Ambos archivos se reemplazan de forma atómica.
+
+    Args:
+        files: Archivo .xvg -> observable (ver discover)
+        archive_path: Ruta del Parquet de salida
+        jobs: Procesos para leer los .xvg
+        threads: Usar hilos en lugar de procesos
+        chunk_rows: Filas por bloque
+
+    Returns:
+        (entradas del índice, archivos que no se pudieron leer)
+    """
+    paths = list(files)
+    progress.emit("archive", "start", total=len(paths))
+    inicio = time.perf_counter()
+    os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+    tmp = f"{archive_path}.{os.getpid()}.tmp"
+
+    index: List[Series] = []
+    failures = []
+    ready: Dict[int, Any] = {}
+    next_i = 0
+    groups = 0
+    with pq.ParquetWriter(tmp, SCHEMA, compression="zstd", write_statistics=["x"]) as writer:
+        for done, (i, path, parsed, error) in enumerate(
+                parallel.process_files(read_file, paths, jobs, threads), 1):
+            if error:
+                failures.append((path, error))
+            ready[i] = parsed
+            progress.emit("archive", "file", file=os.path.basename(path), done=done,
+                          total=len(paths), error=error)
+            # Escribir en orden de entrada lo que ya esté leído
+            while next_i in ready:
+                parsed = ready.pop(next_i)
+                path = paths[next_i]
+                next_i += 1
+                if parsed is None:
+                    continue
+                for entry, x, y in _series_from_file(path, files[path], parsed):
+                    groups += _write_series(writer, entry, x, y, groups, chunk_rows)
+                    index.append(entry)
+
+    index_data = {
+        "version": INDEX_VERSION,
+        "archive": os.path.basename(archive_path),
+        "chunk_rows": chunk_rows,
+        "series": [asdict(entry) for entry in index],
+    }
+    index_tmp = f"{index_path(archive_path)}.{os.getpid()}.tmp"
+    with open(index_tmp, "w") as f:
+        json.dump(index_data, f)
+    os.replace(tmp, archive_path)
+    os.replace(index_tmp, index_path(archive_path))
+
+    parallel.report_failures("Archivo de series", failures)
+    progress.emit("archive", "end", files=len(paths), rows=sum(e.rows for e in index),
+                  elapsed=time.perf_counter() - inicio)
+    return index, [path for path, _ in failures]
+
+
+class TrajectoryArchive:
+    """
+    Lector del archivo de series. El Parquet se abre una vez (mapeado en
+    memoria) y cada lectura solo descomprime los bloques de la serie pedida
+    que cubren la ventana.
+
+    Args:
+        path: Ruta del Parquet (el índice se busca a su lado)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(index_path(path)) as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Versión de índice no compatible en {index_path(path)}")
+        self.index = [Series(**entry) for entry in data["series"]]
+        self._by_key = {entry.key: entry for entry in self.index}
+        self._file: Optional[pq.ParquetFile] = None
+
+    @property
+    def file(self) -> pq.ParquetFile:
+        if self._file is None:
+            self._file = pq.ParquetFile(self.path, memory_map=True)
+        return self._file
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def series(self, protein: Optional[str] = None, ligand: Optional[str] = None,
+               observable: Optional[str] = None, replica: Optional[int] = None) -> List[Series]:
+        """Entradas del índice que cumplen los filtros dados."""
+        return [
+            entry for entry in self.index
+            if (protein is None or entry.protein == protein)
+            and (ligand is None or entry.ligand == ligand)
+            and (observable is None or entry.observable == observable)
+            and (replica is None or entry.replica == replica)
+        ]
+
+    def find(self, protein: str, ligand: str, observable: str, replica: int = 1) -> Series:
+        """
+        Raises:
+            KeyError: Si la serie no está en el archivo
+        """
+        entry = self._by_key.get((protein, ligand, replica, observable))
+        if entry is None:
+            raise KeyError(f"{ligand}-{protein} (réplica {replica}, {observable}) "
+                           f"no está en {os.path.basename(self.path)}")
+        return entry
+
+    def read(self, protein: str, ligand: str, observable: str, replica: int = 1,
+             start: Optional[float] = None, stop: Optional[float] = None) -> np.ndarray:
+        """
+        Lee una serie, completa o en la ventana start <= x <= stop.
+
+        Returns:
+            Arreglo (filas x 2) con x e y, como las columnas de un .xvg
+        """
+        entry = self.find(protein, ligand, observable, replica)
+        lo = -np.inf if start is None else start
+        hi = np.inf if stop is None else stop
+        groups = [g for g, first, last, _ in entry.row_groups if last >= lo and first <= hi]
+        if not groups:
+            return np.empty((0, 2))
+        table = self.file.read_row_groups(groups, columns=["x", "y"])
+        data = np.column_stack([table.column("x").to_numpy(), table.column("y").to_numpy()])
+        if start is not None or stop is not None:
+            data = data[(data[:, 0] >= lo) & (data[:, 0] <= hi)]
+        return data
+
+
+def main(data_dir: Optional[str] = None, results_dir: Optional[str] = None,
+         jobs: Optional[int] = 1, threads: bool = False, force: bool = False) -> Optional[str]:
+    """
+    Construye el archivo de series si se añadió, modificó o eliminó algún .xvg.
+
+    Args:
+        data_dir: Directorio con las subcarpetas de OBSERVABLES (por defecto, 'data')
+        results_dir: Directorio de salida (por defecto, 'results')
+        jobs: Procesos para leer los .xvg
+        threads: Usar hilos en lugar de procesos
+        force: Reconstruir aunque no haya cambios
+
+    Returns:
+        Ruta del archivo, o None si no hay series
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_dir = data_dir or os.path.join(base_dir, "data")
+    results_dir = results_dir or os.path.join(base_dir, "results")
+    archive_path = os.path.join(results_dir, ARCHIVE_FILE)
+
+    files = discover(data_dir)
+    if not files:
+        print(f"No se encontraron archivos .xvg en {data_dir}")
+        return None
+
+    # El Parquet no se puede modificar en su sitio: cualquier cambio lo reconstruye
+    manifest = Manifest(results_dir)
+    _, pending = manifest.partition("archive", list(files), params={"chunk_rows": CHUNK_ROWS})
+    # Un .xvg eliminado no aparece en pending: se detecta porque el índice
+    # aún recoge series suyas (los .xvg sin datos no tienen series)
+    sources = indexed_sources(archive_path)
+    stale = sources is None or not sources <= {os.path.basename(p) for p in files}
+    if not pending and not force and not stale and os.path.exists(archive_path):
+        print("Sin cambios en los .xvg; se conserva el archivo de series.")
+        return archive_path
+
+    index, failed = build(files, archive_path, jobs, threads)
+    # Los que fallaron quedan pendientes para la próxima ejecución
+    for path in files:
+        if path not in failed:
+            manifest.record("archive", path)
+    manifest.save()
+
+    size = os.path.getsize(archive_path)
+    counts: Dict[str, int] = {}
+    for entry in index:
+        counts[entry.observable] = counts.get(entry.observable, 0) + 1
+    print(f"\n{len(index)} series ({', '.join(f'{k}: {v}' for k, v in sorted(counts.items()))}) "
+          f"de {len(files)} archivos en {archive_path} ({size / 1e6:.1f} MB)")
+    return archive_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parallel.add_arguments(parser)
+    parser.add_argument("--force", action="store_true",
+                        help="Reconstruir el archivo aunque no haya cambios")
+    parser.add_argument("--list", action="store_true",
+                        help="Listar las series del archivo sin reconstruirlo")
+    args = parser.parse_args()
+
+    if args.list:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with TrajectoryArchive(os.path.join(base_dir, "results", ARCHIVE_FILE)) as archive:
+            for entry in archive.index:
+                print(f"{entry.protein:<12} {entry.ligand:<12} r{entry.replica:<3} "
+                      f"{entry.observable:<16} {entry.rows:>9} filas  "
+                      f"{len(entry.row_groups):>3} bloques  {entry.source}")
+    else:
+        main(jobs=args.jobs, threads=args.threads, force=args.force)
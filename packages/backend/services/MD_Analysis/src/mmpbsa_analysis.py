@@ -1,28 +1,82 @@
+#!/usr/bin/env python3
+"""
+Ejecución de gmx_MMPBSA para todos los complejos de BASEDIR.
+Cada subdirectorio es un trabajo; varios trabajos se ejecutan a la vez
+repartiendo un presupuesto total de núcleos (CORES) entre ellos, con un
+número de procesos MPI por trabajo entre NP_MIN y NP_MAX según su tamaño.
+La salida de cada trabajo se guarda en su propio registro y los trabajos
+fallidos se reintentan. El estado de cada complejo se guarda en un diario
+(mmpbsa_journal.sqlite en BASEDIR) para retomar la campaña si se interrumpe.
+Con INTERVAL: auto, el intervalo de frames de cada complejo se elige a
+partir del tiempo de autocorrelación de su RMSD.
+"""
+
+import argparse
+import math
 import os
+import re
+import shlex
 import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
 import yaml
-import re 
-
-config_path = "../utils/mmpbsa_config.yaml"
-
-# with open(config_path, 'r') as f:
-#         for i in range(25):
-#             line = f.readline()
-#             if not line:
-#                 break
-#             print(line.strip())
-
-with open("config.yaml", 'r') as f:
-    config = yaml.safe_load(f)
-    
-NP = config.get("NP", 4)
-BASEDIR = config.get("BASEDIR", ".")
-INTERVAL = config.get("INTERVAL", 250)
-GROUPS = config.get("GROUPS", [1, 13])
-TPR_PREFIX = config.get("TPR_PREFIX", "sdm.tpr")
-XTC_SUFFIX = config.get("XTC_SUFFIX", "-noPBC.xtc")
-NOGUI = config.get("NOGUI", "-nogui")
-CLEAN = config.get("CLEAN", "--clean")
+
+import mmpbsa_interval
+from mmpbsa_journal import JOURNAL_FILE, Journal
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, "utils", "mmpbsa_config.yaml")
+
+# Intervalo fijo de siempre; con INTERVAL: auto se usa si falta el RMSD
+DEFAULT_INTERVAL = 250
+
+# Segundos entre comprobaciones del estado de los trabajos
+POLL_SECONDS = 2.0
+
+
+# ================================
+# Configuración
+# ================================
+
+def load_config(path: str = CONFIG_PATH) -> Dict:
+    """
+    Lee la configuración YAML y completa los valores por defecto.
+
+    Además de las claves de siempre (NP, BASEDIR, INTERVAL, GROUPS...),
+    admite EXECUTABLE y MPIRUN (órdenes a ejecutar), CORES (presupuesto
+    total de núcleos), NP_MIN/NP_MAX (procesos por trabajo), RETRIES,
+    JOURNAL (ruta del diario; por defecto, dentro de BASEDIR) y, para
+    INTERVAL: auto, TARGET_FRAMES y RMSD_XVG (nombre del RMSD de cada
+    complejo dentro de su directorio; '{name}' es el del directorio).
+    """
+    with open(path, "r") as f:
+        config = yaml.safe_load(f) or {}
+
+    np_default = config.get("NP", 4)
+    defaults = {
+        "NP": np_default,
+        "BASEDIR": ".",
+        "INTERVAL": DEFAULT_INTERVAL,
+        "GROUPS": [1, 13],
+        "TPR_PREFIX": ".tpr",
+        "XTC_SUFFIX": "-noPBC.xtc",
+        "TOP_SUFFIX": ".top",
+        "NOGUI": "-nogui",
+        "CLEAN": "--clean",
+        "EXECUTABLE": "gmx_MMPBSA",
+        "MPIRUN": "mpirun",
+        "CORES": os.cpu_count() or 1,
+        "NP_MIN": np_default,
+        "NP_MAX": np_default,
+        "RETRIES": 1,
+        "JOURNAL": None,
+        "TARGET_FRAMES": mmpbsa_interval.TARGET_FRAMES,
+        "RMSD_XVG": "{name}-rmsd.xvg",
+    }
+    return {**defaults, **config}
+
 
 # ================================
 # Funciones auxiliares
@@ -58,7 +112,7 @@ def extract_summary(compact_file, output_file):
         raise FileNotFoundError(f"El archivo {compact_file} no existe.")
     with open(compact_file, 'r') as f:
         lines = f.readlines()
-    
+
     capture = False
     dash_count = 0
     with open(output_file, 'w') as out:
@@ -76,36 +130,287 @@ def extract_summary(compact_file, output_file):
                 if dash_count == 2:
                     break
     print(f"Resumen extraído a {output_file}")
-    
+
+
+# ================================
+# Trabajos
+# ================================
+
+@dataclass
+class Job:
+    """Un complejo (subdirectorio de BASEDIR) a calcular con gmx_MMPBSA."""
+
+    name: str
+    cwd: str
+    tpr: str
+    xtc: str
+    top: str
+    size: int = 0
+    np: int = 1
+    attempts: int = 0
+    log: str = field(init=False)
+
+    def __post_init__(self):
+        self.log = os.path.join(self.cwd, f"{self.name}_gmx_MMPBSA.log")
+
+    @property
+    def inputs(self) -> List[str]:
+        """Archivos de entrada cuya modificación obliga a recalcular."""
+        return [os.path.join(self.cwd, name)
+                for name in (self.tpr, self.xtc, self.top, "mmpbsa.in")]
+
+    @property
+    def output(self) -> str:
+        return os.path.join(self.cwd, f"{self.name}_RESULTS_MMPBSA.csv")
+
+    def command(self, config: Dict, np: int) -> List[str]:
+        """Orden de gmx_MMPBSA con `np` procesos (sin mpirun si np es 1)."""
+        cmd = shlex.split(config["EXECUTABLE"]) + [
+            *shlex.split(config["NOGUI"]), "-O",
+            "-i", "mmpbsa.in",
+            "-cs", self.tpr,
+            "-ci", "index.ndx",
+            "-cg", *map(str, config["GROUPS"]),
+            "-ct", self.xtc,
+            "-o", f"{self.name}_RESULTS_MMPBSA.dat",
+            "-eo", f"{self.name}_RESULTS_MMPBSA.csv",
+            "-cp", self.top,
+            *shlex.split(config["CLEAN"]),
+        ]
+        if np > 1:
+            cmd = shlex.split(config["MPIRUN"]) + ["-np", str(np)] + cmd
+        return cmd
+
+
+def discover_jobs(config: Dict) -> List[Job]:
+    """Un trabajo por subdirectorio de BASEDIR; el tamaño del .xtc se usa
+    como estimación del coste."""
+    jobs = []
+    basedir = config["BASEDIR"]
+    for dir_name in sorted(os.listdir(basedir)):
+        dir_path = os.path.join(basedir, dir_name)
+        if not os.path.isdir(dir_path):
+            continue
+        xtc = f"sdm-{dir_name}{config['XTC_SUFFIX']}"
+        xtc_path = os.path.join(dir_path, xtc)
+        jobs.append(Job(
+            name=dir_name,
+            cwd=dir_path,
+            tpr=f"sdm-{dir_name}{config['TPR_PREFIX']}",
+            xtc=xtc,
+            top=f"{dir_name}{config['TOP_SUFFIX']}",
+            size=os.path.getsize(xtc_path) if os.path.isfile(xtc_path) else 0,
+        ))
+    return jobs
+
+
+def prepare_job(job: Job, config: Dict, interval: Optional[int] = None) -> None:
+    """Crea mmpbsa.in si no existe y fija su intervalo de frames."""
+    mmpbsa_file = os.path.join(job.cwd, "mmpbsa.in")
+    if not os.path.isfile(mmpbsa_file):
+        run_command(f"{config['EXECUTABLE']} --create_input", cwd=job.cwd)
+    edit_mmpbsa_interval(mmpbsa_file, interval or config["INTERVAL"])
+
+
+def assign_np(jobs: List[Job], np_min: int, np_max: int) -> None:
+    """Procesos por trabajo proporcionales a su tamaño, entre np_min y np_max."""
+    largest = max((job.size for job in jobs), default=0)
+    for job in jobs:
+        share = job.size / largest if largest else 1.0
+        job.np = max(np_min, min(np_max, round(np_max * share)))
+
+
+# ================================
+# Planificador
+# ================================
+
+class Scheduler:
+    """
+    Ejecuta trabajos en paralelo sin superar `cores` núcleos ocupados.
+
+    Los trabajos se lanzan de mayor a menor (los largos primero para que no
+    queden solos al final). Cada trabajo pide sus `np` procesos; si los
+    núcleos libres alcanzan para NP_MIN pero no para `np`, se lanza con los
+    libres, y cuando quedan pocos trabajos en cola se les dan los núcleos
+    sobrantes hasta NP_MAX.
+
+    Args:
+        config: Configuración (EXECUTABLE, MPIRUN, CORES, NP_MIN, NP_MAX, RETRIES)
+        poll: Segundos entre comprobaciones de los procesos (POLL_SECONDS por defecto)
+        journal: Diario donde registrar inicio y fin de cada intento
+    """
+
+    def __init__(self, config: Dict, poll: Optional[float] = None,
+                 journal: Optional[Journal] = None):
+        self.config = config
+        self.journal = journal
+        self.cores = int(config["CORES"])
+        self.np_min = max(1, min(int(config["NP_MIN"]), self.cores))
+        self.np_max = max(self.np_min, min(int(config["NP_MAX"]), self.cores))
+        self.retries = int(config["RETRIES"])
+        self.poll = POLL_SECONDS if poll is None else poll
+
+    def _cores_for(self, job: Job, free: int, queued: int) -> int:
+        # Reparto de los núcleos libres entre los trabajos que quedan
+        share = free // max(1, queued)
+        return max(self.np_min, min(max(job.np, share), self.np_max, free))
+
+    def _launch(self, job: Job, np: int) -> subprocess.Popen:
+        job.attempts += 1
+        cmd = job.command(self.config, np)
+        log = open(job.log, "a")
+        log.write(f"\n=== Intento {job.attempts}, {np} procesos: {shlex.join(cmd)}\n")
+        log.flush()
+        print(f"Iniciando {job.name} con {np} procesos (intento {job.attempts})")
+        try:
+            proc = subprocess.Popen(cmd, cwd=job.cwd, stdout=log, stderr=subprocess.STDOUT)
+        finally:
+            log.close()
+        if self.journal is not None:
+            self.journal.started(job.name, np)
+        return proc
+
+    def _finished(self, job: Job, code: int, retry: bool) -> None:
+        if self.journal is None:
+            return
+        self.journal.finished(job.name, code)
+        if retry:
+            self.journal.requeued(job.name)
+
+    def run(self, jobs: List[Job]) -> Dict[str, str]:
+        """
+        Ejecuta todos los trabajos.
+
+        Returns:
+            Estado final de cada trabajo: 'done' o 'failed'
+        """
+        assign_np(jobs, self.np_min, self.np_max)
+        queue = sorted(jobs, key=lambda job: job.size, reverse=True)
+        running: Dict[str, tuple] = {}
+        status: Dict[str, str] = {}
+        free = self.cores
+
+        while queue or running:
+            # Lanzar mientras haya núcleos para el siguiente trabajo
+            while queue and free >= self.np_min:
+                job = queue.pop(0)
+                np = self._cores_for(job, free, len(queue) + 1)
+                try:
+                    running[job.name] = (job, self._launch(job, np), np, time.perf_counter())
+                    free -= np
+                except OSError as e:
+                    print(f"Error al lanzar {job.name}: {e}")
+                    status[job.name] = "failed"
+                    self._finished(job, -1, retry=False)
+
+            time.sleep(self.poll)
+            for name, (job, proc, np, start) in list(running.items()):
+                code = proc.poll()
+                if code is None:
+                    continue
+                del running[name]
+                free += np
+                elapsed = time.perf_counter() - start
+                retry = code != 0 and job.attempts <= self.retries
+                self._finished(job, code, retry)
+                if code == 0:
+                    status[name] = "done"
+                    print(f"Completado {name} en {elapsed:.1f} s")
+                elif retry:
+                    print(f"Falló {name} (código {code}); se reintentará. Registro: {job.log}")
+                    queue.append(job)
+                else:
+                    status[name] = "failed"
+                    print(f"Falló {name} (código {code}) tras {job.attempts} intentos. "
+                          f"Registro: {job.log}")
+        return status
+
+
 # ================================
 # Script principal
 # ================================
-for dir_name in os.listdir(BASEDIR):
-    dir_path = os.path.join(BASEDIR, dir_name)
-    if not os.path.isdir(dir_path):
-        continue
-    
-    print(f"Procesando directorio: {dir_path}")
-    tpr = f"sdm-{dir_name}{TPR_PREFIX}"
-    xtc = f"sdm-{dir_name}{XTC_SUFFIX}"
-    topfile = f"{dir_name}{TOP_SUFFIX}"
-    out_dat = f"{dir_name}_RESULTS_MMPBSA.dat"
-    out_CSV = f"{dir_name}_RESULTS_MMPBSA.csv"
-    
-# Crear el input del mmpbsa    
-run_command("gmx_MMPBSA --create_inputh", cwd=dir_path)
-mmpbsa_file = os.path.join(dir_path, "mmpbsa.in")
-if not os.path.isfile(mmpbsa_file):
-    print(f"No se encontró el archivo mmpbsa.in en {dir_path}, saltando...")
-
-# Editar el intervalo en el archivo mmpbsa.in
-edit_mmpbsa_interval(mmpbsa_file, INTERVAL)
-
-cmd = f"mpirun -np {NP} gmx_MMPBSA {NOGUI} -O -i mmpbsa.in -cs {tpr} -ci index.ndx -cg {','.join(map(str, GROUPS))} -ct {xtc} -o {out_dat} -eo {dir_name}_ENERGY_MMPBSA.dat -pf {topfile} {CLEAN}"
-run_command(cmd, cwd=dir_path)
-
-
-# # Extraer resumen
-# compact_file = os.path.join(dir_path, "COMPACT_MMXSA_RESULTS.mmxsa")
-# output_txt = os.path.join(dir_path, f"{dir_name}_MMPBSA_SUMMARY.txt")
-# extract_summary(compact_file, output_txt)
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, str]:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=CONFIG_PATH, help="Archivo de configuración YAML")
+    parser.add_argument("--cores", type=int, help="Presupuesto total de núcleos (CORES)")
+    parser.add_argument("--np-min", type=int, help="Procesos mínimos por trabajo (NP_MIN)")
+    parser.add_argument("--np-max", type=int, help="Procesos máximos por trabajo (NP_MAX)")
+    parser.add_argument("--retries", type=int, help="Reintentos por trabajo fallido (RETRIES)")
+    parser.add_argument("--executable", help="Orden de gmx_MMPBSA (EXECUTABLE)")
+    parser.add_argument("--interval",
+                        help="Intervalo de frames fijo, o 'auto' para elegirlo por complejo (INTERVAL)")
+    parser.add_argument("--target-frames", type=int,
+                        help="Frames independientes buscados con --interval auto (TARGET_FRAMES)")
+    parser.add_argument("--status", action="store_true",
+                        help="Mostrar el estado de la campaña según el diario y salir")
+    parser.add_argument("--force", action="store_true",
+                        help="Recalcular también los complejos ya terminados")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    overrides = {
+        "CORES": args.cores, "NP_MIN": args.np_min, "NP_MAX": args.np_max,
+        "RETRIES": args.retries, "EXECUTABLE": args.executable,
+        "INTERVAL": args.interval, "TARGET_FRAMES": args.target_frames,
+    }
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    adaptive = str(config["INTERVAL"]).lower() == "auto"
+    if not adaptive:
+        config["INTERVAL"] = int(config["INTERVAL"])
+
+    journal = Journal(config["JOURNAL"] or os.path.join(config["BASEDIR"], JOURNAL_FILE))
+    try:
+        if args.status:
+            print(journal.report())
+            return {row["name"]: row["state"] for row in journal.rows()}
+
+        # Los complejos terminados con las mismas entradas se omiten; los
+        # fallidos, interrumpidos ('running') o con entradas nuevas se
+        # vuelven a poner en cola
+        jobs, skipped = [], 0
+        frames_fixed = frames_adaptive = 0
+        for job in discover_jobs(config):
+            choice = None
+            if adaptive:
+                signal = os.path.join(job.cwd, config["RMSD_XVG"].format(name=job.name))
+                choice = mmpbsa_interval.adaptive_interval(
+                    signal, int(config["TARGET_FRAMES"]), fallback=DEFAULT_INTERVAL)
+                if choice.frames:
+                    print(mmpbsa_interval.summary_line(job.name, choice, fixed=DEFAULT_INTERVAL))
+                frames_fixed += mmpbsa_interval.stride_total(choice.frames, DEFAULT_INTERVAL)
+                frames_adaptive += mmpbsa_interval.stride_total(choice.frames, choice.interval)
+            try:
+                prepare_job(job, config, choice.interval if choice else None)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"No se pudo preparar {job.cwd}: {e}; saltando...")
+                continue
+            inputs = journal.fingerprint(job.name, job.inputs)
+            if not args.force and os.path.isfile(job.output) and journal.is_current(job.name, inputs):
+                journal.touch(job.name, inputs)
+                skipped += 1
+            else:
+                print(f"Procesando directorio: {job.cwd}")
+                journal.pending(job.name, inputs, job.log)
+                jobs.append(job)
+            # Intervalo usado por complejo, con el τ en que se basa
+            if choice is not None:
+                tau = None if math.isnan(choice.tau) else choice.tau
+                journal.record_interval(job.name, choice.interval, tau)
+            else:
+                journal.record_interval(job.name, config["INTERVAL"], None)
+        if frames_fixed:
+            print(f"Intervalo adaptativo: {frames_adaptive} frames de MMPBSA en total, "
+                  f"frente a {frames_fixed} con interval = {DEFAULT_INTERVAL}")
+        print(f"Diario: {skipped} complejos al día, {len(jobs)} por calcular")
+
+        status = Scheduler(config, journal=journal).run(jobs)
+    finally:
+        journal.close()
+    done = sum(1 for s in status.values() if s == "done")
+    print(f"\nMMPBSA: {done} completados, {len(status) - done} fallidos")
+    return status
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Intervalo de frames adaptativo para gmx_MMPBSA.
+Estima el tiempo de autocorrelación integrado de una señal barata del
+complejo (su RMSD en .xvg) y elige el mayor intervalo que aún da el número
+objetivo de frames estadísticamente independientes. Frames más cercanos
+que 2τ están correlacionados y apenas aportan información, así que
+muestrearlos solo gasta tiempo de MPI.
+"""
+
+import math
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# xvg_io vive en script/, junto a los módulos de análisis
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "script")
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+import xvg_io
+
+# Frames independientes que se buscan por complejo
+TARGET_FRAMES = 200
+# Constante de la ventana automática de Sokal: se suma la autocorrelación
+# hasta el primer retardo M con M >= c·τ(M)
+SOKAL_C = 5.0
+
+
+@dataclass
+class IntervalChoice:
+    """Intervalo elegido para un complejo y los datos en que se basa."""
+
+    interval: int
+    tau: float
+    frames: int
+    independent: float
+    source: str
+
+
+def autocorrelation(x: np.ndarray) -> np.ndarray:
+    """Función de autocorrelación normalizada (por FFT, O(n log n))."""
+    x = np.asarray(x, dtype=np.float64) - np.mean(x)
+    n = len(x)
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(x, size)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    if acf[0] <= 0:
+        return np.zeros(n)
+    return acf / acf[0]
+
+
+def integrated_time(x: np.ndarray, c: float = SOKAL_C) -> float:
+    """
+    Tiempo de autocorrelación integrado τ = 1 + 2·Σρ(t), en frames, con la
+    ventana automática de Sokal. Una serie sin correlación da τ ≈ 1.
+    """
+    if len(x) < 4:
+        return 1.0
+    rho = autocorrelation(x)
+    taus = 2.0 * np.cumsum(rho) - 1.0
+    window = np.arange(len(taus)) >= c * taus
+    m = int(np.argmax(window)) if window.any() else len(taus) - 1
+    return max(1.0, float(taus[m]))
+
+
+def choose_interval(frames: int, tau: float, target: int = TARGET_FRAMES) -> int:
+    """
+    Mayor intervalo que da `target` frames, pero nunca menor que 2τ: si la
+    trayectoria no tiene `target` frames independientes, muestrear más
+    denso que 2τ no los aumenta.
+    """
+    return max(1, math.ceil(2.0 * tau), frames // max(1, target))
+
+
+def from_xvg(path: str, target: int = TARGET_FRAMES) -> IntervalChoice:
+    """
+    Intervalo a partir del RMSD del complejo. Se supone un valor de RMSD
+    por frame de la trayectoria que analiza gmx_MMPBSA.
+
+    Raises:
+        ValueError: Si el archivo no contiene datos
+    """
+    rmsd = xvg_io.read_column(path, 1)
+    tau = integrated_time(rmsd)
+    interval = choose_interval(len(rmsd), tau, target)
+    return IntervalChoice(interval, tau, len(rmsd), len(rmsd) / (2.0 * tau),
+                          os.path.basename(path))
+
+
+def adaptive_interval(signal_path: str, target: int = TARGET_FRAMES,
+                      fallback: int = 250) -> IntervalChoice:
+    """Intervalo adaptativo, o `fallback` si no hay señal legible."""
+    try:
+        return from_xvg(signal_path, target)
+    except (OSError, ValueError) as e:
+        print(f"Advertencia: sin señal para el intervalo adaptativo ({e}); "
+              f"se usa interval = {fallback}")
+        return IntervalChoice(fallback, math.nan, 0, math.nan, "")
+
+
+def stride_total(frames: int, interval: int) -> int:
+    """Frames que gmx_MMPBSA calculará con ese intervalo."""
+    return math.ceil(frames / interval) if frames else 0
+
+
+def summary_line(name: str, choice: IntervalChoice, fixed: Optional[int] = None) -> str:
+    """Resumen de la elección para la salida del script."""
+    line = (f"{name}: interval = {choice.interval} (τ = {choice.tau:.1f} frames, "
+            f"{choice.independent:.0f} frames independientes de {choice.frames})")
+    if fixed and choice.frames:
+        line += (f"; {stride_total(choice.frames, choice.interval)} frames frente a "
+                 f"{stride_total(choice.frames, fixed)} con interval = {fixed}")
+    return line
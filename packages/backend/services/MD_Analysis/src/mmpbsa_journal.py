@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Diario persistente de la campaña de gmx_MMPBSA.
+Guarda en SQLite el estado de cada complejo (pending, running, done,
+failed) junto con la huella de sus entradas (tpr, xtc, top y mmpbsa.in),
+de modo que al relanzar la campaña se omiten los complejos terminados cuyas
+entradas no cambiaron y solo se vuelven a poner en cola los fallidos, los
+interrumpidos y los que tienen entradas nuevas.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+JOURNAL_FILE = "mmpbsa_journal.sqlite"
+
+STATES = ("pending", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    np INTEGER,
+    exit_code INTEGER,
+    started REAL,
+    finished REAL,
+    log TEXT,
+    interval INTEGER,
+    tau REAL
+)
+"""
+
+# Columnas añadidas después de la primera versión del diario
+_MIGRATIONS = {"interval": "INTEGER", "tau": "REAL"}
+
+
+def file_hash(path: str) -> str:
+    """Hash BLAKE2b (128 bits) del contenido de un archivo."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Journal:
+    """
+    Estado de los trabajos de una campaña en una base SQLite.
+
+    Cada cambio se confirma de inmediato, así que el diario refleja el
+    último estado conocido aunque el proceso muera a mitad de la campaña.
+
+    Args:
+        path: Archivo SQLite (se crea si no existe)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute(_SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in _MIGRATIONS.items():
+            if name not in columns:
+                self.db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def get(self, name: str) -> Optional[sqlite3.Row]:
+        return self.db.execute("SELECT * FROM jobs WHERE name = ?", (name,)).fetchone()
+
+    def rows(self) -> List[sqlite3.Row]:
+        return self.db.execute("SELECT * FROM jobs ORDER BY name").fetchall()
+
+    def fingerprint(self, name: str, files: List[str]) -> Dict[str, dict]:
+        """
+        Tamaño, fecha y hash de cada archivo de entrada. El hash solo se
+        recalcula si el tamaño o la fecha difieren de los del diario.
+        """
+        row = self.get(name)
+        previous = json.loads(row["inputs"]) if row else {}
+        inputs = {}
+        for path in files:
+            key = os.path.basename(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                inputs[key] = None
+                continue
+            old = previous.get(key) or {}
+            if old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                digest = old.get("hash")
+            else:
+                digest = file_hash(path)
+            inputs[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+        return inputs
+
+    def is_current(self, name: str, inputs: Dict[str, dict]) -> bool:
+        """True si el trabajo terminó bien con estas mismas entradas."""
+        row = self.get(name)
+        if row is None or row["state"] != "done":
+            return False
+        previous = json.loads(row["inputs"])
+
+        def content(entries):
+            return {k: (v or {}).get("hash") for k, v in entries.items()}
+
+        return content(previous) == content(inputs)
+
+    def pending(self, name: str, inputs: Dict[str, dict], log: str) -> None:
+        """Pone el trabajo en cola con la huella de sus entradas."""
+        self.db.execute(
+            """INSERT INTO jobs (name, state, inputs, attempts, log) VALUES (?, 'pending', ?, 0, ?)
+               ON CONFLICT(name) DO UPDATE SET state = 'pending', inputs = excluded.inputs,
+               attempts = 0, np = NULL, exit_code = NULL, started = NULL, finished = NULL,
+               log = excluded.log""",
+            (name, json.dumps(inputs), log),
+        )
+        self.db.commit()
+
+    def touch(self, name: str, inputs: Dict[str, dict]) -> None:
+        """Actualiza la huella de un trabajo terminado (fechas nuevas, mismo contenido)."""
+        self.db.execute("UPDATE jobs SET inputs = ? WHERE name = ?", (json.dumps(inputs), name))
+        self.db.commit()
+
+    def started(self, name: str, np: int) -> None:
+        self.db.execute(
+            """UPDATE jobs SET state = 'running', attempts = attempts + 1, np = ?,
+               started = ?, finished = NULL, exit_code = NULL WHERE name = ?""",
+            (np, time.time(), name),
+        )
+        self.db.commit()
+
+    def finished(self, name: str, exit_code: int) -> None:
+        self.db.execute(
+            "UPDATE jobs SET state = ?, exit_code = ?, finished = ? WHERE name = ?",
+            ("done" if exit_code == 0 else "failed", exit_code, time.time(), name),
+        )
+        self.db.commit()
+
+    def requeued(self, name: str) -> None:
+        """Un intento fallido que se va a reintentar vuelve a 'pending'."""
+        self.db.execute("UPDATE jobs SET state = 'pending' WHERE name = ?", (name,))
+        self.db.commit()
+
+    def record_interval(self, name: str, interval: int, tau: Optional[float]) -> None:
+        """Guarda el intervalo de frames elegido y el τ en que se basa."""
+        self.db.execute("UPDATE jobs SET interval = ?, tau = ? WHERE name = ?",
+                        (interval, tau, name))
+        self.db.commit()
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATES, 0)
+        for row in self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[row[0]] = row[1]
+        return counts
+
+    def report(self) -> str:
+        """Tabla de estado de la campaña para '--status'."""
+        lines = [f"{'Complejo':<24} {'Estado':<8} {'Intentos':>8} {'NP':>4} {'Código':>6} "
+                 f"{'Duración':>10} {'Intervalo':>9} {'τ':>7}  Registro"]
+        for row in self.rows():
+            elapsed = ""
+            if row["started"] is not None:
+                end = row["finished"] if row["finished"] is not None else time.time()
+                elapsed = f"{end - row['started']:.0f} s"
+            code = "" if row["exit_code"] is None else str(row["exit_code"])
+            np = "" if row["np"] is None else str(row["np"])
+            interval = "" if row["interval"] is None else str(row["interval"])
+            tau = "" if row["tau"] is None else f"{row['tau']:.1f}"
+            lines.append(f"{row['name']:<24} {row['state']:<8} {row['attempts']:>8} {np:>4} "
+                         f"{code:>6} {elapsed:>10} {interval:>9} {tau:>7}  {row['log'] or ''}")
+        counts = self.counts()
+        lines.append("")
+        lines.append(", ".join(f"{state}: {counts[state]}" for state in STATES))
+        return "\n".join(lines)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Los módulos de src/ y script/ se importan por su nombre, como en los scripts
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("src", "script"):
+    path = os.path.join(BASE_DIR, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,157 @@
+"""
+Pruebas del planificador de gmx_MMPBSA con un gmx_MMPBSA y un mpirun
+falsos (scripts de shell). Cada trabajo falso anota en running/ los
+procesos que usa mientras se ejecuta, de modo que se puede comprobar que
+nunca se superan CORES núcleos ocupados.
+"""
+
+import os
+import stat
+
+import pytest
+import yaml
+
+import mmpbsa_analysis
+from mmpbsa_journal import JOURNAL_FILE, Journal
+
+# gmx_MMPBSA falso: crea mmpbsa.in con --create_input; si no, falla cuando
+# el directorio tiene 'fail_once' (que borra) o 'fail_always' y, si no,
+# escribe el archivo de -eo
+GMX_STUB = """#!/bin/sh
+if [ "$1" = "--create_input" ]; then
+    printf '&general\\ninterval = 1\\n/\\n' > mmpbsa.in
+    exit 0
+fi
+name=$(basename "$PWD")
+echo "$name" >> "{calls}"
+echo "$name ${{STUB_NP:-1}}" > "{running}/$name"
+cat "{running}"/* | awk '{{s += $2}} END {{print s}}' >> "{peaks}"
+sleep 0.3
+rm -f "{running}/$name"
+if [ -f fail_once ]; then rm fail_once; echo "fallo simulado"; exit 3; fi
+if [ -f fail_always ]; then echo "fallo simulado"; exit 4; fi
+prev=""
+for arg in "$@"; do
+    if [ "$prev" = "-eo" ]; then echo "Delta" > "$arg"; fi
+    prev=$arg
+done
+echo "gmx_MMPBSA falso: $name terminado"
+"""
+
+# mpirun falso: 'mpirun -np N orden...' ejecuta la orden con STUB_NP=N
+MPIRUN_STUB = """#!/bin/sh
+STUB_NP=$2
+export STUB_NP
+shift 2
+exec "$@"
+"""
+
+
+def _script(path, text):
+    path.write_text(text)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.fixture
+def campaign(tmp_path, monkeypatch):
+    """BASEDIR con cuatro complejos de distinto tamaño y su configuración."""
+    monkeypatch.setattr(mmpbsa_analysis, "POLL_SECONDS", 0.05)
+    basedir = tmp_path / "campaign"
+    for name, size in [("A", 4000), ("B", 3000), ("C", 2000), ("D", 1000)]:
+        job = basedir / name
+        job.mkdir(parents=True)
+        (job / f"sdm-{name}-noPBC.xtc").write_bytes(b"x" * size)
+        (job / f"sdm-{name}.tpr").write_text("tpr")
+        (job / f"{name}.top").write_text("top")
+
+    running = tmp_path / "running"
+    running.mkdir()
+    paths = {"calls": tmp_path / "calls.txt", "peaks": tmp_path / "peaks.txt",
+             "running": running}
+    gmx = _script(tmp_path / "gmx_MMPBSA", GMX_STUB.format(**paths))
+    mpirun = _script(tmp_path / "mpirun", MPIRUN_STUB)
+
+    config = {
+        "BASEDIR": str(basedir),
+        "EXECUTABLE": gmx,
+        "MPIRUN": mpirun,
+        "CORES": 5,
+        "NP_MIN": 1,
+        "NP_MAX": 3,
+        "RETRIES": 1,
+        "INTERVAL": 100,
+    }
+    config_file = tmp_path / "mmpbsa_config.yaml"
+    config_file.write_text(yaml.safe_dump(config))
+    return {"basedir": basedir, "config": str(config_file), **paths}
+
+
+def _lines(path):
+    return path.read_text().split() if path.exists() else []
+
+
+def test_never_exceeds_core_budget(campaign):
+    status = mmpbsa_analysis.main(["--config", campaign["config"]])
+
+    assert status == {name: "done" for name in "ABCD"}
+    peaks = [int(value) for value in _lines(campaign["peaks"])]
+    assert len(peaks) == 4
+    assert max(peaks) <= 5
+    # Los trabajos se solapan: hay más de un trabajo a la vez
+    assert max(peaks) > 3
+
+
+def test_failed_job_is_retried(campaign):
+    (campaign["basedir"] / "B" / "fail_once").write_text("")
+    (campaign["basedir"] / "C" / "fail_always").write_text("")
+
+    status = mmpbsa_analysis.main(["--config", campaign["config"]])
+
+    assert status == {"A": "done", "B": "done", "C": "failed", "D": "done"}
+    calls = _lines(campaign["calls"])
+    assert calls.count("B") == 2
+    assert calls.count("C") == 2  # intento inicial + RETRIES
+    journal = Journal(str(campaign["basedir"] / JOURNAL_FILE))
+    try:
+        assert journal.get("B")["state"] == "done"
+        assert journal.get("B")["attempts"] == 2
+        assert journal.get("C")["state"] == "failed"
+        assert journal.get("C")["exit_code"] == 4
+    finally:
+        journal.close()
+
+
+def test_each_job_writes_its_log(campaign):
+    (campaign["basedir"] / "B" / "fail_once").write_text("")
+
+    mmpbsa_analysis.main(["--config", campaign["config"]])
+
+    for name in "ABCD":
+        log = (campaign["basedir"] / name / f"{name}_gmx_MMPBSA.log").read_text()
+        assert f"gmx_MMPBSA falso: {name} terminado" in log
+        assert all(other not in log for other in
+                   (f"{o} terminado" for o in "ABCD" if o != name))
+    log_b = (campaign["basedir"] / "B" / "B_gmx_MMPBSA.log").read_text()
+    assert "=== Intento 1" in log_b and "=== Intento 2" in log_b
+    assert "fallo simulado" in log_b
+
+
+def test_journal_skips_finished_jobs(campaign):
+    (campaign["basedir"] / "C" / "fail_always").write_text("")
+    mmpbsa_analysis.main(["--config", campaign["config"]])
+    first = len(_lines(campaign["calls"]))
+
+    # Solo se vuelve a lanzar el que falló
+    status = mmpbsa_analysis.main(["--config", campaign["config"]])
+    assert status == {"C": "failed"}
+    assert _lines(campaign["calls"])[first:] == ["C", "C"]
+
+    # Con entradas nuevas, el complejo se recalcula aunque esté terminado
+    os.remove(campaign["basedir"] / "C" / "fail_always")
+    (campaign["basedir"] / "A" / "sdm-A.tpr").write_text("tpr modificado")
+    status = mmpbsa_analysis.main(["--config", campaign["config"]])
+    assert status == {"A": "done", "C": "done"}
+
+    status = mmpbsa_analysis.main(["--config", campaign["config"]])
+    assert status == {}
@@ -0,0 +1,207 @@
+import argparse
+import json
+import logging
+import math
+import os
+from functools import cache
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from rdkit import Chem, RDLogger
+from rdkit.Chem import rdFingerprintGenerator
+
+from .cache import FileVersion
+from .store import ColumnarStore
+
+RDLogger.DisableLog("rdApp.*")  # type: ignore
+
+
+@dataclass(frozen=True)
+class FingerprintConfig:
+    radius: int = 2
+    n_bits: int = 2048
+
+    @property
+    def n_words(self) -> int:
+        return self.n_bits // 64
+
+
+DEFAULT_CONFIG = FingerprintConfig()
+
+
+@cache
+def _generator(config: FingerprintConfig):
+    return rdFingerprintGenerator.GetMorganGenerator(radius=config.radius, fpSize=config.n_bits)
+
+
+def fingerprint(smiles: str, config: FingerprintConfig) -> Optional[np.ndarray]:
+    """Morgan fingerprint packed into ``n_bits / 64`` uint64 words, or None."""
+    mol = Chem.MolFromSmiles(smiles) if smiles else None
+    if mol is None:
+        return None
+    bits = _generator(config).GetFingerprintAsNumPy(mol)
+    return np.packbits(bits).view("<u8")
+
+
+class FingerprintIndex:
+    """Morgan fingerprints of a table, packed as uint64 and sorted by bit count.
+
+    Files in ``index_dir``:
+      fps.npy     (N, n_words) uint64, rows sorted by popcount
+      counts.npy  (N,) popcount of every fingerprint, ascending
+      rows.npy    (N,) row offset of every fingerprint in the source table
+      meta.json   fingerprint parameters and the source file version
+
+    Tanimoto(a, b) <= min(|a|, |b|) / max(|a|, |b|), so sorting by popcount
+    turns that bound into contiguous slices: search only scores the slices
+    whose bound can still beat the current k-th best hit.
+    """
+
+    def __init__(self, index_dir: Path, fps, counts, rows, config: FingerprintConfig, source: dict,
+                 chunk_size: int = 65_536, workers: Optional[int] = None):
+        self.index_dir = index_dir
+        self.fps = fps
+        self.counts = counts
+        self.rows = rows
+        self.config = config
+        self.source = source
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, index_dir: str | Path, **kwargs) -> "FingerprintIndex":
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / "meta.json").read_text())
+        return cls(
+            index_dir,
+            np.load(index_dir / "fps.npy", mmap_mode="r"),
+            np.load(index_dir / "counts.npy", mmap_mode="r"),
+            np.load(index_dir / "rows.npy", mmap_mode="r"),
+            FingerprintConfig(**meta["config"]),
+            meta["source"],
+            **kwargs,
+        )
+
+    @staticmethod
+    def build(smiles: Iterable[str], n_rows: int, index_dir: str | Path, source: FileVersion,
+              config: FingerprintConfig = DEFAULT_CONFIG) -> None:
+        """Fingerprint ``n_rows`` SMILES (in table order) and write the index."""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        unsorted_path = index_dir / "fps.unsorted.npy"
+        unsorted = np.lib.format.open_memmap(unsorted_path, mode="w+", dtype="<u8", shape=(n_rows, config.n_words))
+        all_counts = np.zeros(n_rows, dtype=np.int32)
+        for i, smi in enumerate(smiles):
+            fp = fingerprint(smi, config)
+            if fp is None:
+                continue
+            unsorted[i] = fp
+            all_counts[i] = np.bitwise_count(fp).sum()
+
+        # Unparseable rows (and empty fingerprints) can never score above 0
+        rows = np.flatnonzero(all_counts)
+        if len(rows) < n_rows:
+            logging.warning(f"FingerprintIndex: skipped {n_rows - len(rows)} rows without a usable fingerprint")
+        order = np.argsort(all_counts[rows], kind="stable")
+        rows = rows[order]
+        counts = all_counts[rows]
+
+        fps = np.lib.format.open_memmap(index_dir / "fps.npy", mode="w+", dtype="<u8", shape=(len(rows), config.n_words))
+        step = 65_536
+        for start in range(0, len(rows), step):
+            fps[start:start + step] = unsorted[rows[start:start + step]]
+        fps.flush()
+        del fps, unsorted
+        unsorted_path.unlink()
+
+        np.save(index_dir / "counts.npy", counts)
+        np.save(index_dir / "rows.npy", rows.astype(np.int64))
+        (index_dir / "meta.json").write_text(json.dumps({"config": asdict(config), "source": asdict(source)}))
+        logging.info(f"FingerprintIndex: indexed {len(rows)}/{n_rows} molecules into {index_dir}")
+
+    def is_current(self, source: FileVersion) -> bool:
+        return self.source == asdict(source)
+
+    def _score(self, start: int, stop: int, query: np.ndarray, query_count: int, k: int,
+               threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        common = np.bitwise_count(self.fps[start:stop] & query).sum(axis=1, dtype=np.int32)
+        scores = common / (self.counts[start:stop] + query_count - common)
+        keep = np.flatnonzero(scores >= threshold)
+        if len(keep) > k:
+            keep = keep[np.argpartition(scores[keep], -k)[-k:]]
+        return keep + start, scores[keep]
+
+    def _bound(self, start: int, stop: int, query_count: int) -> float:
+        lo, hi = int(self.counts[start]), int(self.counts[stop - 1])
+        nearest = min(max(query_count, lo), hi)
+        return min(nearest, query_count) / max(nearest, query_count)
+
+    def search(self, query: np.ndarray, k: int = 50, threshold: float = 0.0) -> List[Tuple[int, float]]:
+        """Top-k ``(row, tanimoto)`` pairs for a packed query fingerprint."""
+        query_count = int(np.bitwise_count(query).sum())
+        if query_count == 0 or len(self) == 0:
+            return []
+
+        lo_count = math.ceil(threshold * query_count)
+        hi_count = math.floor(query_count / threshold) if threshold > 0 else np.iinfo(np.int32).max
+        lo = int(np.searchsorted(self.counts, max(lo_count, 1), side="left"))
+        hi = int(np.searchsorted(self.counts, hi_count, side="right"))
+
+        chunks = [(s, min(s + self.chunk_size, hi)) for s in range(lo, hi, self.chunk_size)]
+        chunks.sort(key=lambda c: self._bound(c[0], c[1], query_count), reverse=True)
+
+        best_idx = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float64)
+        wave = self.workers
+        for i in range(0, len(chunks), wave):
+            # Everything left is bounded below the current k-th best: stop
+            if len(best_scores) == k and best_scores.min() >= self._bound(*chunks[i], query_count):
+                break
+            results = self._executor.map(
+                lambda c: self._score(c[0], c[1], query, query_count, k, threshold), chunks[i:i + wave]
+            )
+            for idx, scores in results:
+                best_idx = np.concatenate([best_idx, idx])
+                best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_idx, best_scores = best_idx[top], best_scores[top]
+
+        rows = np.asarray(self.rows[best_idx])
+        order = np.lexsort((rows, -best_scores))
+        return [(int(rows[j]), float(best_scores[j])) for j in order]
+
+
+def build_from_store(store: ColumnarStore, index_dir: str | Path,
+                     config: FingerprintConfig = DEFAULT_CONFIG, smiles_column: str = "SMILES") -> None:
+    version = store.version()
+    lf = store.scan().select(smiles_column)
+    smiles = (s for batch in lf.collect_batches() for s in batch[smiles_column])
+    FingerprintIndex.build(smiles, store.row_count(), index_dir, version, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Morgan fingerprint similarity index")
+    parser.add_argument("csv", type=Path, help="Processed CSV (merged_selected.csv)")
+    parser.add_argument("--index-dir", type=Path, default=None)
+    parser.add_argument("--radius", type=int, default=2)
+    parser.add_argument("--n-bits", type=int, default=2048)
+    args = parser.parse_args()
+
+    if args.n_bits % 64:
+        parser.error("--n-bits must be a multiple of 64")
+    index_dir = args.index_dir or args.csv.parent / "indexes" / "similarity"
+    build_from_store(ColumnarStore(args.csv), index_dir, FingerprintConfig(args.radius, args.n_bits))
+    print(f"Similarity index written to {index_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+import polars as pl
+
+from .cache import FileVersion
+
+
+class ColumnarStore:
+    """Columnar copies of a processed CSV, rebuilt whenever the CSV is newer.
+
+    The Arrow IPC file is written uncompressed so polars can memory-map it:
+    every uvicorn worker then reads the same pages from the OS page cache
+    instead of keeping its own parsed copy. The Parquet file carries
+    row-group statistics for tools that want predicate pushdown on disk.
+    """
+
+    def __init__(
+        self,
+        csv_path: str | Path,
+        ipc_path: Optional[str | Path] = None,
+        parquet_path: Optional[str | Path] = None,
+        row_group_size: int = 128_000,
+    ):
+        self.csv_path = Path(csv_path)
+        self.ipc_path = Path(ipc_path) if ipc_path else self.csv_path.with_suffix(".arrow")
+        self.parquet_path = Path(parquet_path) if parquet_path else self.csv_path.with_suffix(".parquet")
+        self.row_group_size = row_group_size
+        self._lock = threading.Lock()
+
+    def version(self) -> FileVersion:
+        """Version of the source CSV, which all derived data is keyed on."""
+        return FileVersion.of(self.csv_path)
+
+    def is_stale(self) -> bool:
+        if not self.ipc_path.exists() or not self.parquet_path.exists():
+            return True
+        csv_mtime = self.csv_path.stat().st_mtime_ns
+        return (
+            csv_mtime > self.ipc_path.stat().st_mtime_ns
+            or csv_mtime > self.parquet_path.stat().st_mtime_ns
+        )
+
+    def convert(self) -> None:
+        # Write to per-process temporary names and swap them in atomically, so
+        # concurrent workers never observe a half-written file
+        lf = pl.scan_csv(self.csv_path)
+        suffix = f".{os.getpid()}.tmp"
+
+        ipc_tmp = self.ipc_path.with_name(self.ipc_path.name + suffix)
+        lf.sink_ipc(ipc_tmp, compression="uncompressed")
+        os.replace(ipc_tmp, self.ipc_path)
+
+        parquet_tmp = self.parquet_path.with_name(self.parquet_path.name + suffix)
+        lf.sink_parquet(parquet_tmp, statistics=True, row_group_size=self.row_group_size)
+        os.replace(parquet_tmp, self.parquet_path)
+
+        logging.info(f"ColumnarStore: converted {self.csv_path} to {self.ipc_path} and {self.parquet_path}")
+
+    def ensure_fresh(self) -> Path:
+        if self.is_stale():
+            with self._lock:
+                if self.is_stale():
+                    self.convert()
+        return self.ipc_path
+
+    def scan(self) -> pl.LazyFrame:
+        # Uncompressed IPC files are memory-mapped by scan_ipc
+        return pl.scan_ipc(self.ensure_fresh())
+
+    def row_count(self) -> int:
+        return self.scan().select(pl.len()).collect().item()
+
+    def take(self, rows: Sequence[int], columns: Optional[Sequence[str]] = None) -> pl.DataFrame:
+        """Gather rows by offset; only the pages holding them are read."""
+        df = pl.read_ipc(self.ensure_fresh(), columns=list(columns) if columns else None)
+        return df[list(rows)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a processed CSV into Arrow IPC and Parquet")
+    parser.add_argument("csv", type=Path)
+    parser.add_argument("--row-group-size", type=int, default=128_000)
+    parser.add_argument("--force", action="store_true", help="Convert even if the outputs are up to date")
+    args = parser.parse_args()
+
+    store = ColumnarStore(args.csv, row_group_size=args.row_group_size)
+    if args.force or store.is_stale():
+        store.convert()
+        print(f"Converted {store.csv_path} -> {store.ipc_path}, {store.parquet_path}")
+    else:
+        print(f"{store.ipc_path} is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import threading
+
+from packages.backend.cache import FileVersion, VersionedCache
+
+
+def test_slow_fill_for_an_old_version_keeps_the_newer_entry():
+    cache = VersionedCache()
+    old = FileVersion("/data/table.csv", mtime_ns=1, size=10)
+    new = FileVersion("/data/table.csv", mtime_ns=2, size=12)
+    started, release = threading.Event(), threading.Event()
+    result = {}
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+
+    worker = threading.Thread(
+        target=lambda: result.update(old=cache.get_or_compute((old, "meta"), slow))
+    )
+    worker.start()
+    started.wait(5)
+    assert cache.get_or_compute((new, "meta"), lambda: "new") == ("new", False)
+    release.set()
+    worker.join(5)
+
+    # The late fill still answers its own caller but is not stored
+    assert result["old"] == ("old", False)
+    assert cache.get_or_compute((new, "meta"), lambda: "recomputed") == ("new", True)
+    assert cache.get_or_compute((old, "meta"), lambda: "old again") == ("old again", False)
+    assert cache.get_or_compute((new, "meta"), lambda: "recomputed") == ("new", True)
+
+
+def test_only_older_versions_are_evicted():
+    cache = VersionedCache()
+    old = FileVersion("/data/table.csv", mtime_ns=1, size=10)
+    new = FileVersion("/data/table.csv", mtime_ns=2, size=12)
+    cache.get_or_compute((old, "meta"), lambda: "old")
+    cache.get_or_compute((new, "meta"), lambda: "new")
+    assert cache.get_or_compute((old, "meta"), lambda: "old again") == ("old again", False)
+    assert cache.get_or_compute((new, "meta"), lambda: "x") == ("new", True)
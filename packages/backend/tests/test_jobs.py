@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import defaultdict
+
+from packages.backend.jobs import JobManager
+
+XVG = """# gmx rms
+@    title "RMSD"
+@    xaxis  label "Time (ps)"
+@    yaxis  label "RMSD (nm)"
+@TYPE xy
+"""
+
+
+def write_inputs(root, complexes):
+    rmsd_dir = root / "rmsd_data"
+    rmsd_dir.mkdir(parents=True)
+    for name in complexes:
+        rows = "".join(f"{t * 10.0:10.4f} {0.1 + 0.001 * (t % 7):10.6f}\n" for t in range(200))
+        (rmsd_dir / f"{name}-rmsd.xvg").write_text(XVG + rows)
+    return str(root)
+
+
+def wait_for(manager, job, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while manager.get(job.id).status not in ("done", "failed"):
+        assert time.monotonic() < deadline, f"job {job.id} did not finish"
+        time.sleep(0.1)
+
+
+def test_reused_worker_publishes_only_on_its_own_job(tmp_path):
+    received = defaultdict(list)
+    final = defaultdict(threading.Event)
+
+    def on_event(job_id, event):
+        received[job_id].append(event)
+        if event["stage"] == "job" and event["status"] in ("done", "failed"):
+            final[job_id].set()
+
+    first = write_inputs(tmp_path / "first", ["L1-P1", "L2-P1"])
+    second = write_inputs(tmp_path / "second", ["L3-P2", "L4-P2", "L5-P2"])
+    manager = JobManager(tmp_path / "jobs", max_workers=1, on_event=on_event)
+    try:
+        job1, _ = manager.submit(first, ["rmsd"])
+        wait_for(manager, job1)
+        assert final[job1.id].wait(30)
+        seen = len(received[job1.id])
+
+        # Same worker process runs the second job
+        job2, _ = manager.submit(second, ["rmsd"])
+        wait_for(manager, job2)
+        assert final[job2.id].wait(30)
+    finally:
+        manager.shutdown()
+
+    assert job1.status == job2.status == "done"
+    assert len(received[job1.id]) == seen
+
+    def files(job_id):
+        return sorted(e["file"] for e in received[job_id] if e["event"] == "file")
+
+    assert files(job1.id) == ["L1-P1-rmsd.xvg", "L2-P1-rmsd.xvg"]
+    assert files(job2.id) == ["L3-P2-rmsd.xvg", "L4-P2-rmsd.xvg", "L5-P2-rmsd.xvg"]
@@ -2,8 +2,9 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 import polars as pl
 from pathlib import Path
-from typing import Protocol, List
+from typing import Callable, List, Optional, Protocol
 import logging
+import time
 
 class DataCleaner(Protocol):
     def clean(self, df: pl.DataFrame) -> pl.DataFrame:
@@ -17,6 +18,7 @@ class CleanConfig:
     log_file: Path
     delimiter: str = ","
     encoding: str = "utf-8"
+    progress: Optional[Callable[[dict], None]] = None
 
 
 class BaseDataCleaner(ABC):
@@ -31,6 +33,10 @@ class BaseDataCleaner(ABC):
             format="%(asctime)s - %(levelname)s: %(message)s",
         )
 
+    def _emit(self, event: str, **data) -> None:
+        if self.config.progress is not None:
+            self.config.progress({"stage": "ml.clean", "event": event, "time": time.time(), **data})
+
     @abstractmethod
     def clean(self, df: pl.DataFrame) -> pl.DataFrame:
         pass
@@ -42,20 +48,24 @@ class ColumnSelectorCleaner(BaseDataCleaner):
         self.keep_columns = keep_columns
 
     def clean(self, df: pl.DataFrame) -> pl.DataFrame:
+        start = time.perf_counter()
+        self._emit("start", rows=df.height)
         existing_cols = [col for col in self.keep_columns if col in df.columns]
         missing_cols = set(self.keep_columns) - set(existing_cols)
         if missing_cols:
             logging.warning(f"ColumnSelectorCleaner: missing columns {missing_cols}")
         df = df.select(existing_cols)
         logging.info(f"ColumnSelectorCleaner: selected colummns {existing_cols}")
+        self._emit("end", rows=df.height, elapsed=time.perf_counter() - start)
         return df
 
 
-def main():
+def main(root: Path = Path("."), progress: Optional[Callable[[dict], None]] = None):
     config = CleanConfig(
-        base_dir=Path("data/merged"),
-        output_dir=Path("data/processed"),
-        log_file=Path("data/logs/cleaning.log"),
+        base_dir=root / "data/merged",
+        output_dir=root / "data/processed",
+        log_file=root / "data/logs/cleaning.log",
+        progress=progress,
     )
 
     config.output_dir.mkdir(parents=True, exist_ok=True)
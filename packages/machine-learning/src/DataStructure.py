@@ -4,8 +4,9 @@ from rdkit import Chem
 from rdkit import RDLogger
 import logging
 from dataclasses import dataclass
-from typing import Protocol, List
+from typing import Callable, List, Optional, Protocol
 from pathlib import Path
+import time
 
 class MoleculeReader(Protocol):
     def read_molecules(self) -> pd.DataFrame:
@@ -22,6 +23,7 @@ class DataConfig:
     log_file: Path
     columns: List[str]
     delimiter: str = '\t'
+    progress: Optional[Callable[[dict], None]] = None
 
 class BaseMoleculeReader(ABC):
     def __init__(self, config: DataConfig):
@@ -90,21 +92,35 @@ class MoleculeProcessor:
     def add_reader(self, reader: BaseMoleculeReader) -> None:
         self.readers.append(reader)
     
+    def _emit(self, event: str, **data) -> None:
+        if self.config.progress is not None:
+            self.config.progress({"stage": "ml.structure", "event": event, "time": time.time(), **data})
+
     def process_all(self) -> List[pd.DataFrame]:
-        return [reader.read_molecules() for reader in self.readers]
+        start = time.perf_counter()
+        self._emit("start", total=len(self.readers))
+        results = []
+        for i, reader in enumerate(self.readers, start=1):
+            df = reader.read_molecules()
+            results.append(df)
+            self._emit("file", file=type(reader).__name__, done=i, total=len(self.readers), rows=len(df), ok=True)
+        self._emit("end", files=len(self.readers), rows=sum(len(df) for df in results),
+                   elapsed=time.perf_counter() - start)
+        return results
     
     def save_results(self, dataframes: List[pd.DataFrame], filenames: List[str]) -> None:
         for df, filename in zip(dataframes, filenames):
             output_path = self.config.output_dir / filename
             df.to_csv(output_path, index=False)
 
-def main():
+def main(root: Path = Path('.'), progress: Optional[Callable[[dict], None]] = None):
     # Configuración
     config = DataConfig(
-        base_dir=Path('data/base'),
-        output_dir=Path('data/pre_processed'),
-        log_file=Path('data/logs/conversion_errors.log'),
-        columns=['SMILES', 'ID']
+        base_dir=root / 'data/base',
+        output_dir=root / 'data/pre_processed',
+        log_file=root / 'data/logs/conversion_errors.log',
+        columns=['SMILES', 'ID'],
+        progress=progress
     )
     
     # Crear directorios si no existen
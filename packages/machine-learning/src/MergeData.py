@@ -2,9 +2,10 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 import polars as pl
 from pathlib import Path
-from typing import Protocol
+from typing import Callable, Optional, Protocol
 import logging
 import hashlib
+import time
 
 class DataReader(Protocol):
     def read(self) -> pl.DataFrame:
@@ -21,6 +22,7 @@ class MergeConfig:
     log_file: Path
     delimiter: str = ','
     smiles: str = 'SMILES'
+    progress: Optional[Callable[[dict], None]] = None
     
 class BaseMergeData(ABC):
     def __init__(self, config: MergeConfig):
@@ -33,6 +35,10 @@ class BaseMergeData(ABC):
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s: %(message)s'
         )
+
+    def _emit(self, event: str, **data) -> None:
+        if self.config.progress is not None:
+            self.config.progress({"stage": "ml.merge", "event": event, "time": time.time(), **data})
         
     @abstractmethod
     def merge(self, input_paths: list[Path], output_path: Path) -> pl.DataFrame:
@@ -40,8 +46,10 @@ class BaseMergeData(ABC):
     
 class MergeData(BaseMergeData):
     def merge(self, input_paths: list[Path], output_path: Path) -> pl.DataFrame:
+        start = time.perf_counter()
+        self._emit("start", total=len(input_paths))
         dataframes = []
-        for path in input_paths:
+        for i, path in enumerate(input_paths, start=1):
             try:
                 df = pl.read_csv(path, separator=self.config.delimiter)
                 source_name = path.stem.replace('_preprocessed', '')
@@ -51,8 +59,10 @@ class MergeData(BaseMergeData):
                 df = df.with_columns(pl.lit(source_name).alias("source"))
                 dataframes.append(df)
                 logging.info(f"Loaded {len(df)} rows from {path.name}")
+                self._emit("file", file=path.name, done=i, total=len(input_paths), rows=len(df), ok=True)
             except Exception as e:
                 logging.error(f"Error reading {path}: {e}")
+                self._emit("file", file=path.name, done=i, total=len(input_paths), rows=0, ok=False)
 
         if not dataframes:
             logging.error("No valid datasets loaded.")
@@ -70,14 +80,16 @@ class MergeData(BaseMergeData):
         output_path.parent.mkdir(parents=True, exist_ok=True)
         merged.write_csv(output_path)
         logging.info(f"Merged dataset saved to {output_path} with {len(merged)} rows.")
+        self._emit("end", files=len(input_paths), rows=len(merged), elapsed=time.perf_counter() - start)
         return merged
 
-def main():
+def main(root: Path = Path('.'), progress: Optional[Callable[[dict], None]] = None):
     config = MergeConfig(
-        base_dir=Path('data/pre_processed'),
-        output_dir=Path('data/merged/'),
-        log_file=Path('data/logs/merge.log'),
-        delimiter=','
+        base_dir=root / 'data/pre_processed',
+        output_dir=root / 'data/merged/',
+        log_file=root / 'data/logs/merge.log',
+        delimiter=',',
+        progress=progress
     )
     
     config.output_dir.mkdir(parents=True, exist_ok=True)